@@ -0,0 +1,104 @@
+"""
+Benchmark DiscordExtractor.export_guild_history against a fake guild.
+
+Compares a sequential export (one fetch at a time) with the concurrent export,
+using FakeHTTP's simulated latency and rate limits instead of the real API.
+
+With `--backfill N` a third run also splits each large history into N time
+windows fetched concurrently.
+
+With `--backend rest` the export goes through the REST backend instead, over
+real HTTP to a local FakeDiscordServer with the same latency and limits.
+
+Usage:
+  $ PYTHONPATH=. python benchmarks/bench_extract.py
+  $ PYTHONPATH=. python benchmarks/bench_extract.py --backend rest
+  $ PYTHONPATH=. python benchmarks/bench_extract.py --channels 1 --largest 20000 --backfill 8
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+# DiscordExtractor reads these on init; the fake guild never uses them
+os.environ.setdefault("DARCY_KEY", "offline")
+os.environ.setdefault("TEST_SERVER_ID", "0")
+
+from benchmarks.fake_discord import FakeDiscordServer, FakeHTTP, build_guild
+from utils.extractor import DiscordExtractor
+
+
+def build(http, args):
+    return build_guild(
+        http,
+        channel_sizes=[args.largest] + [args.messages] * (args.channels - 1),
+        threads_per_channel=args.threads,
+        thread_size=args.thread_size,
+        archived_per_channel=args.archived,
+    )
+
+
+async def run_once(concurrency, backfill, args):
+    if args.backend == "rest":
+        return await run_rest(concurrency, backfill, args)
+
+    http = FakeHTTP(latency=args.latency, bucket_limit=args.bucket_limit)
+    guild = build(http, args)
+    extractor = DiscordExtractor(max_concurrency=concurrency, backfill_windows=backfill)
+
+    start = time.perf_counter()
+    await extractor.export_guild_history(guild)
+    elapsed = time.perf_counter() - start
+    return elapsed, http.requests, http.rate_limited
+
+
+async def run_rest(concurrency, backfill, args):
+    # The server applies latency and rate limits, so the guild's own HTTP
+    # layer is never used
+    guild = build(FakeHTTP(latency=0), args)
+    async with FakeDiscordServer(guild, latency=args.latency, bucket_limit=args.bucket_limit) as server:
+        os.environ["DISCORD_API_BASE"] = server.url
+        extractor = DiscordExtractor(max_concurrency=concurrency, backend="rest", backfill_windows=backfill)
+        extractor.guild_id = guild.id
+
+        start = time.perf_counter()
+        await extractor.with_guild(extractor.export_guild_history)
+        elapsed = time.perf_counter() - start
+    return elapsed, server.requests, server.rate_limited
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--channels", type=int, default=8)
+    parser.add_argument("--messages", type=int, default=500, help="messages per channel")
+    parser.add_argument("--largest", type=int, default=1500, help="messages in the largest channel")
+    parser.add_argument("--threads", type=int, default=2, help="active threads per channel")
+    parser.add_argument("--archived", type=int, default=2, help="archived threads per channel")
+    parser.add_argument("--thread-size", type=int, default=150)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--bucket-limit", type=int, default=5,
+                        help="requests per second allowed per channel/thread")
+    parser.add_argument("--backfill", type=int, default=1,
+                        help="also run with each history split into this many windows")
+    parser.add_argument("--backend", choices=("fake", "rest"), default="fake",
+                        help="fake: in-process fake guild; rest: REST backend against a local mock server")
+    args = parser.parse_args()
+
+    # Write the CSV output somewhere disposable
+    os.chdir(tempfile.mkdtemp())
+
+    runs = [(1, 1), (args.concurrency, 1)]
+    if args.backfill > 1:
+        runs.append((args.concurrency, args.backfill))
+
+    for concurrency, backfill in runs:
+        elapsed, requests, limited = asyncio.run(run_once(concurrency, backfill, args))
+        print(f"⏱️ concurrency={concurrency}, windows={backfill}: {elapsed:.2f}s, "
+              f"{requests} requests, {limited} rate-limited")
+
+
+if __name__ == "__main__":
+    main()
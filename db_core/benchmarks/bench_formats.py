@@ -0,0 +1,59 @@
+"""
+Benchmark the extractor's output formats: CSV vs Parquet vs Arrow IPC.
+
+Writes the same synthetic MessageRecords through each sink, then reads each
+file back the way BronzeIngestor does, reporting write time, file size and
+read time.
+
+Usage:
+  $ PYTHONPATH=. python benchmarks/bench_formats.py --messages 500000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.bench_records import message_source
+from utils.records import MessageRecord
+from utils.sink import open_sink
+
+
+def read_back(path):
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path, dtype_backend="numpy_nullable")
+    return pd.read_feather(path, dtype_backend="numpy_nullable")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500_000)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+
+    records = [MessageRecord(*values) for values in message_source(args.messages)]
+    out_dir = tempfile.mkdtemp()
+
+    for output_format in ("csv", "parquet", "arrow"):
+        start = time.perf_counter()
+        sink = open_sink(os.path.join(out_dir, "chat_history"), output_format, resume=False)
+        for i in range(0, len(records), args.batch):
+            sink.write_batch(records[i:i + args.batch])
+        sink.commit()
+        write_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        df = read_back(sink.path)
+        read_time = time.perf_counter() - start
+
+        print(f"📊 {output_format:>7}: write {write_time:6.2f}s, "
+              f"{os.path.getsize(sink.path) / 2**20:7.1f} MiB, "
+              f"read {read_time:6.2f}s, message_id dtype {df['message_id'].dtype}")
+
+
+if __name__ == "__main__":
+    main()
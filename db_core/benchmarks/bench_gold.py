@@ -0,0 +1,140 @@
+"""
+Benchmark bot queries against gold.all_facts as a plain view and as a
+materialized view.
+
+Builds a synthetic copy of silver.user and silver.fact in a scratch schema
+(bench_gold, dropped afterwards), defines all_facts over it both ways, and
+times the queries bots run: the newest facts overall and the newest facts
+for one user. Also times REFRESH MATERIALIZED VIEW CONCURRENTLY after a
+small change to the source tables.
+
+Needs a PostgreSQL DATABASE_URL.
+
+Usage:
+  $ PYTHONPATH=. python benchmarks/bench_gold.py --users 5000 --facts 500000
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from sqlalchemy import text
+
+from config.db_config import engine
+
+SCHEMA = "bench_gold"
+
+QUERIES = {
+    "newest 20 facts": "SELECT * FROM {view} ORDER BY created_at DESC LIMIT 20",
+    "newest 20 facts of a user": (
+        "SELECT * FROM {view} WHERE discord_id = :discord_id ORDER BY created_at DESC LIMIT 20"
+    ),
+}
+
+
+def prepare(users, facts):
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text(f"""
+            CREATE TABLE {SCHEMA}.user (
+                id SERIAL PRIMARY KEY, name TEXT, role TEXT, notion_id TEXT, discord_id TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        conn.execute(text(f"""
+            CREATE TABLE {SCHEMA}.fact (
+                fact_id SERIAL PRIMARY KEY,
+                user_id INT REFERENCES {SCHEMA}.user(id) ON DELETE CASCADE,
+                fact_text TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        conn.execute(text(f"""
+            INSERT INTO {SCHEMA}.user (name, role, discord_id)
+            SELECT 'user-' || i, 'member', (100000000000000000 + i)::TEXT
+            FROM generate_series(1, :users) AS i
+        """), {"users": users})
+        conn.execute(text(f"""
+            INSERT INTO {SCHEMA}.fact (user_id, fact_text, created_at)
+            SELECT 1 + (random() * (:users - 1))::INT, 'fact number ' || i || ' ' || md5(i::TEXT),
+                   now() - random() * INTERVAL '365 days'
+            FROM generate_series(1, :facts) AS i
+        """), {"users": users, "facts": facts})
+
+        definition = f"""
+            SELECT f.fact_id, u.name AS user_name, u.discord_id AS discord_id, f.fact_text, f.created_at
+            FROM {SCHEMA}.fact f
+            JOIN {SCHEMA}.user u ON f.user_id = u.id
+            ORDER BY f.created_at DESC
+        """
+        conn.execute(text(f"CREATE VIEW {SCHEMA}.all_facts_view AS {definition}"))
+        conn.execute(text(f"CREATE MATERIALIZED VIEW {SCHEMA}.all_facts AS {definition}"))
+        # The same indexes as gold/views/gold_all_facts.sql
+        conn.execute(text(f"CREATE UNIQUE INDEX ON {SCHEMA}.all_facts (fact_id)"))
+        conn.execute(text(f"CREATE INDEX ON {SCHEMA}.all_facts (created_at DESC)"))
+        conn.execute(text(f"CREATE INDEX ON {SCHEMA}.all_facts (discord_id, created_at DESC)"))
+        conn.execute(text(f"ANALYZE {SCHEMA}.user"))
+        conn.execute(text(f"ANALYZE {SCHEMA}.fact"))
+        conn.execute(text(f"ANALYZE {SCHEMA}.all_facts"))
+
+
+def drop():
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+
+def time_query(sql, users, repeat):
+    latencies = []
+    with engine.connect() as conn:
+        for _ in range(repeat):
+            params = {"discord_id": str(100000000000000000 + random.randint(1, users))}
+            start = time.perf_counter()
+            conn.execute(text(sql), params).fetchall()
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def time_refresh(facts):
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            INSERT INTO {SCHEMA}.fact (user_id, fact_text)
+            SELECT 1, 'new fact ' || i FROM generate_series(1, :new) AS i
+        """), {"new": max(facts // 1000, 1)})
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {SCHEMA}.all_facts"))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--facts", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=50, help="runs of each query")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        sys.exit("❌ bench_gold.py needs a PostgreSQL DATABASE_URL (materialized views)")
+
+    print(f"🔄 Building {args.users} users and {args.facts} facts in {SCHEMA}...")
+    prepare(args.users, args.facts)
+    try:
+        for label, sql in QUERIES.items():
+            for kind, view in (("view", "all_facts_view"), ("materialized", "all_facts")):
+                latencies = time_query(sql.format(view=f"{SCHEMA}.{view}"), args.users, args.repeat)
+                print(f"📊 {label:<28} {kind:<12} p50 {percentile(latencies, 0.5) * 1000:8.2f}ms  "
+                      f"p99 {percentile(latencies, 0.99) * 1000:8.2f}ms")
+        print(f"📊 REFRESH MATERIALIZED VIEW CONCURRENTLY after a 0.1% change: {time_refresh(args.facts):.2f}s")
+    finally:
+        drop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark MultiGuildExtractor exporting several fake guilds.
+
+Compares exporting the guilds one after another (max_guilds=1) with exporting
+them concurrently. All guilds go through one FakeHTTP, like one bot token, so
+its global limit is shared while each channel keeps its own bucket.
+
+Usage:
+  $ PYTHONPATH=. python benchmarks/bench_guilds.py
+  $ PYTHONPATH=. python benchmarks/bench_guilds.py --guilds 8 --global-limit 50
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+# DiscordExtractor reads these on init; the fake guilds never use them
+os.environ.setdefault("DARCY_KEY", "offline")
+os.environ.setdefault("TEST_SERVER_ID", "0")
+os.environ.setdefault("METRICS_LOG", "")
+
+from benchmarks.fake_discord import FakeHTTP, build_guild
+from utils.multi_guild import MultiGuildExtractor
+
+
+def build_guilds(http, args):
+    # A different start per guild gives every guild its own snowflakes
+    now = datetime.now(timezone.utc)
+    guilds = [
+        build_guild(
+            http,
+            channel_sizes=[args.messages] * args.channels,
+            threads_per_channel=args.threads,
+            thread_size=args.thread_size,
+            start=now - timedelta(days=365 + g),
+        )
+        for g in range(args.guilds)
+    ]
+    return {guild.id: guild for guild in guilds}
+
+
+async def run_once(max_guilds, args):
+    http = FakeHTTP(latency=args.latency, bucket_limit=args.bucket_limit, global_limit=args.global_limit)
+    guilds = build_guilds(http, args)
+    extractor = MultiGuildExtractor(list(guilds), max_guilds=max_guilds, max_concurrency=args.concurrency,
+                                    incremental=False, output_format="csv", backend="gateway")
+
+    start = time.perf_counter()
+    results = await extractor.export_guilds(guilds)
+    elapsed = time.perf_counter() - start
+    assert all(results.values()), "a guild failed to export"
+    return elapsed, http.requests, http.rate_limited
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--guilds", type=int, default=4)
+    parser.add_argument("--channels", type=int, default=4, help="channels per guild")
+    parser.add_argument("--messages", type=int, default=500, help="messages per channel")
+    parser.add_argument("--threads", type=int, default=1, help="active threads per channel")
+    parser.add_argument("--thread-size", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=8, help="fetches in flight per guild")
+    parser.add_argument("--bucket-limit", type=int, default=5,
+                        help="requests per second allowed per channel/thread")
+    parser.add_argument("--global-limit", type=int, default=50,
+                        help="requests per second allowed across all guilds")
+    args = parser.parse_args()
+
+    # Write the CSV output somewhere disposable
+    os.chdir(tempfile.mkdtemp())
+
+    for max_guilds in (1, args.guilds):
+        elapsed, requests, limited = asyncio.run(run_once(max_guilds, args))
+        print(f"⏱️ guilds={args.guilds}, at once={max_guilds}: {elapsed:.2f}s, "
+              f"{requests} requests ({requests / elapsed:.1f}/s), {limited} rate-limited")
+
+
+if __name__ == "__main__":
+    main()
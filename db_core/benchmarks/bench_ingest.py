@@ -0,0 +1,96 @@
+"""
+Benchmark BronzeIngestor's load paths: to_sql INSERTs vs COPY FROM STDIN.
+
+With a PostgreSQL DATABASE_URL both paths load into a scratch table
+(bronze.bench_chat_raw, dropped afterwards). Without one, to_sql runs against
+an in-memory SQLite database and the COPY path runs against a stand-in cursor
+that records the COPY payloads, which measures everything on our side of the
+connection.
+
+Usage:
+  $ PYTHONPATH=. python benchmarks/bench_ingest.py --messages 200000
+"""
+
+import argparse
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import text
+
+from benchmarks.bench_records import message_source
+from config.db_config import engine
+from utils.ingestor import BronzeIngestor
+from utils.records import MessageRecord
+
+TABLE = "bench_chat_raw"
+
+
+class RecordingCursor:
+    """Stands in for a psycopg2 cursor, keeping what COPY would have sent."""
+
+    def __init__(self):
+        self.statements = []
+        self.bytes_sent = 0
+
+    def copy_expert(self, sql, buffer):
+        self.statements.append(sql)
+        self.bytes_sent += len(buffer.read().encode("utf-8"))
+
+    def close(self):
+        pass
+
+
+def prepare_target():
+    with engine.begin() as connection:
+        if engine.dialect.name == "sqlite":
+            connection.execute(text("ATTACH DATABASE ':memory:' AS bronze"))
+        connection.execute(text(f"DROP TABLE IF EXISTS bronze.{TABLE}"))
+        connection.execute(text(f"""
+            CREATE TABLE bronze.{TABLE} (
+                guild_id BIGINT, channel_name TEXT, channel_id BIGINT, thread_name TEXT, thread_id BIGINT,
+                message_id BIGINT, reply_to_id BIGINT, author TEXT, chat_text TEXT, created_at TEXT
+            )
+        """))
+
+
+def drop_target():
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS bronze.{TABLE}"))
+
+
+def timed(label, rows, load):
+    start = time.perf_counter()
+    load()
+    elapsed = time.perf_counter() - start
+    print(f"📊 {label:>26}: {elapsed:6.2f}s, {rows / elapsed:10,.0f} rows/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    args = parser.parse_args()
+
+    records = [MessageRecord(*values) for values in message_source(args.messages)]
+    prepare_target()
+
+    ingestor = BronzeIngestor(csv_path=None, table_name=TABLE, truncate=False, chunksize=args.chunksize)
+    ingestor.load_records(records)
+
+    ingestor.method = "insert"
+    timed(f"to_sql ({engine.dialect.name})", len(records), ingestor.insert_into_table)
+
+    if engine.dialect.name == "postgresql":
+        ingestor.method = "copy"
+        timed("COPY (postgresql)", len(records), ingestor.insert_into_table)
+        drop_target()
+    else:
+        cursor = RecordingCursor()
+        timed("COPY (recording stand-in)", len(records), lambda: ingestor.copy_chunks(cursor))
+        print(f"📦 COPY sent {len(cursor.statements)} chunks, {cursor.bytes_sent / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Memory benchmark: per-message dicts vs MessageRecord.
+
+Builds the same synthetic messages both ways and measures the memory they
+hold with tracemalloc.
+
+Usage:
+  $ PYTHONPATH=. python benchmarks/bench_records.py --messages 200000
+"""
+
+import argparse
+import gc
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.fake_discord import make_snowflake
+from utils.records import MessageRecord, snowflake_time
+
+
+def message_source(count, channels=20, authors=200):
+    """Yield the raw values of `count` messages, as the extractor would see them."""
+    start = datetime.now(timezone.utc) - timedelta(days=365)
+    for i in range(count):
+        c = i % channels
+        in_thread = i % 4 == 0
+        # Build names fresh each time, like discord.py objects per message
+        yield (
+            "".join(["channel-", str(c)]),
+            make_snowflake(start, c),
+            "".join(["thread-", str(c)]) if in_thread else None,
+            make_snowflake(start, 1000 + c) if in_thread else None,
+            make_snowflake(start + timedelta(seconds=i), i),
+            "".join(["user_", str(i % authors)]),
+            f"message {i} lorem ipsum dolor sit amet",
+        )
+
+
+def as_dict(values):
+    channel_name, channel_id, thread_name, thread_id, message_id, author, content = values
+    return {
+        "channel_name": channel_name,
+        "channel_id": channel_id,
+        "thread_name": thread_name,
+        "thread_id": thread_id,
+        "message_id": message_id,
+        "author": author,
+        "chat_text": content,
+        "created_at": snowflake_time(message_id).isoformat(),
+    }
+
+
+def as_record(values):
+    return MessageRecord(*values)
+
+
+def measure(build, count):
+    gc.collect()
+    tracemalloc.start()
+    items = [build(values) for values in message_source(count)]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del items
+    return current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200_000)
+    args = parser.parse_args()
+
+    results = {}
+    for name, build in (("dict", as_dict), ("MessageRecord", as_record)):
+        current, peak = measure(build, args.messages)
+        results[name] = current
+        print(f"📊 {name:>13}: {current / 2**20:8.1f} MiB held, "
+              f"{current / args.messages:6.0f} bytes/message (peak {peak / 2**20:.1f} MiB)")
+
+    print(f"✅ MessageRecord uses {results['MessageRecord'] / results['dict']:.0%} of the dict layout")
+
+
+if __name__ == "__main__":
+    main()
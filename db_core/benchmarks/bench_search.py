@@ -0,0 +1,83 @@
+"""
+Benchmark the local similarity index (database/search.py) as chat grows.
+
+Indexes synthetic messages in batches, the way ChatSearch.sync() adds what
+each silver load changed, and after every `--step` messages times:
+- adding one more batch (incremental update)
+- single queries (p50/p99) and a batch of queries
+
+Everything runs in memory, CPU-only; no database is needed.
+
+Usage:
+  $ PYTHONPATH=. python benchmarks/bench_search.py --messages 1000000 --step 250000
+"""
+
+import argparse
+import random
+import time
+
+from database.search import HashedTfidfIndex
+
+WORDS = (
+    "deploy pipeline bot discord channel thread message export bronze silver gold "
+    "schema index query latency cache postgres vector search meeting event budget "
+    "sponsor workshop hackathon design review merge release bug fix test docs "
+    "python sql aws lambda cron schedule retry backoff stream batch window"
+).split()
+
+
+def messages(start, count, vocabulary):
+    """Synthetic chat: a few common words plus rarer ones drawn from a long tail."""
+    rng = random.Random(start)
+    for i in range(start, start + count):
+        words = rng.choices(WORDS, k=rng.randint(3, 12))
+        words += [f"w{int(rng.paretovariate(1.2)) % vocabulary}" for _ in range(rng.randint(0, 4))]
+        yield i, " ".join(words)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--step", type=int, default=250_000, help="report every N messages")
+    parser.add_argument("--batch", type=int, default=50_000, help="messages per incremental add")
+    parser.add_argument("--vocabulary", type=int, default=200_000, help="size of the rare-word tail")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    index = HashedTfidfIndex()
+    rng = random.Random(0)
+    queries = [" ".join(rng.choices(WORDS, k=2) + [f"w{rng.randint(0, 500)}"]) for _ in range(args.queries)]
+
+    indexed = 0
+    while indexed < args.messages:
+        target = min(indexed + args.step, args.messages)
+        add_times = []
+        while indexed < target:
+            count = min(args.batch, target - indexed)
+            ids, texts = zip(*messages(indexed, count, args.vocabulary))
+            start = time.perf_counter()
+            index.add(ids, texts)
+            add_times.append((time.perf_counter() - start) / count)
+            indexed += count
+
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, k=10)
+            latencies.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        index.search_many(queries[:32], k=10)
+        batch_time = time.perf_counter() - start
+
+        print(f"📊 {indexed:>9,} messages: add {sum(add_times) / len(add_times) * 1e6:6.1f}µs/message, "
+              f"query p50 {percentile(latencies, 0.5) * 1000:6.2f}ms p99 {percentile(latencies, 0.99) * 1000:6.2f}ms, "
+              f"32 queries batched {batch_time * 1000:6.1f}ms, {len(index.segments)} segments")
+
+
+if __name__ == "__main__":
+    main()
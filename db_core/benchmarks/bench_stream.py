@@ -0,0 +1,176 @@
+"""
+Benchmark StreamIngestor with simulated gateway events.
+
+A generator submits message creates, edits and deletes at a fixed rate,
+the way the gateway event handlers in scripts/stream_chat.py do. By default
+they're written by a stand-in writer that sleeps like a database round trip
+(a fixed cost per batch plus a cost per event); `--outage` makes it fail
+for a while part-way, to exercise backoff and the on-disk spill.
+
+With a PostgreSQL DATABASE_URL and `--db`, events are written to a scratch
+copy of bronze.chat_raw (bronze.bench_chat_raw, dropped afterwards) by the
+real BronzeChatWriter.
+
+Reports throughput, end-to-end latency (event received -> committed),
+batch count, peak queue depth and spilled events.
+
+Usage:
+  $ PYTHONPATH=. python benchmarks/bench_stream.py --rate 5000 --seconds 10
+  $ PYTHONPATH=. python benchmarks/bench_stream.py --rate 5000 --outage 3 --max-queue 2000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from benchmarks.bench_records import message_source
+from utils.records import MessageRecord
+from utils.stream_ingestor import ChatEvent, StreamIngestor
+
+TABLE = "bench_chat_raw"
+
+
+class SimulatedWriter:
+    """Sleeps like a database write and records when each event was committed."""
+
+    def __init__(self, batch_cost, event_cost, outage=(0.0, 0.0)):
+        self.batch_cost = batch_cost
+        self.event_cost = event_cost
+        self.outage = outage
+        self.latencies = []
+
+    def __call__(self, events):
+        start, end = self.outage
+        if start <= time.time() < end:
+            time.sleep(self.batch_cost)
+            raise ConnectionError("simulated database outage")
+        time.sleep(self.batch_cost + self.event_cost * len(events))
+        now = time.time()
+        self.latencies.extend(now - event.received_at for event in events)
+
+
+class TimedWriter:
+    """Wraps the real BronzeChatWriter, recording commit latency."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.latencies = []
+
+    def __call__(self, events):
+        self.writer(events)
+        now = time.time()
+        self.latencies.extend(now - event.received_at for event in events)
+
+
+def prepare_target():
+    from sqlalchemy import text
+    from config.db_config import engine
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS bronze.{TABLE}"))
+        connection.execute(text(f"CREATE TABLE bronze.{TABLE} (LIKE bronze.chat_raw INCLUDING ALL)"))
+
+
+def drop_target():
+    from sqlalchemy import text
+    from config.db_config import engine
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS bronze.{TABLE}"))
+        connection.execute(text(f"DROP TABLE IF EXISTS bronze.{TABLE}_stage"))
+
+
+async def generate(ingestor, rate, seconds, edit_share, delete_share):
+    """Submit events at `rate` per second, in 10ms ticks, like bursts of gateway traffic."""
+    total = int(rate * seconds)
+    source = message_source(total)
+    created = []
+    per_tick = max(int(rate * 0.01), 1)
+    start = time.perf_counter()
+    sent = 0
+
+    while sent < total:
+        for _ in range(min(per_tick, total - sent)):
+            roll = random.random()
+            if created and roll < delete_share:
+                ingestor.submit(ChatEvent("delete", random.choice(created).message_id))
+            elif created and roll < delete_share + edit_share:
+                old = random.choice(created)
+                record = MessageRecord(old.channel_name, old.channel_id, old.thread_name, old.thread_id,
+                                       old.message_id, old.author, f"{old.chat_text} (edited)")
+                ingestor.submit(ChatEvent("edit", record.message_id, record))
+            else:
+                record = MessageRecord(*next(source))
+                created.append(record)
+                ingestor.submit(ChatEvent("create", record.message_id, record))
+            sent += 1
+        # Sleep until the next tick is due, so the rate holds however long submit() took
+        await asyncio.sleep(max(start + sent / rate - time.perf_counter(), 0))
+    return time.perf_counter() - start
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+
+async def run(args):
+    if args.db:
+        from utils.stream_ingestor import BronzeChatWriter
+        prepare_target()
+        writer = TimedWriter(BronzeChatWriter(table_name=TABLE))
+    else:
+        outage_start = time.time() + args.seconds / 3
+        writer = SimulatedWriter(
+            args.batch_cost / 1000, args.event_cost / 1000,
+            outage=(outage_start, outage_start + args.outage) if args.outage else (0.0, 0.0),
+        )
+
+    ingestor = StreamIngestor(
+        writer=writer,
+        max_queue=args.max_queue,
+        batch_size=args.batch_size,
+        flush_interval=args.flush_interval,
+        spill_path=os.path.join(tempfile.mkdtemp(), "stream_spill.jsonl"),
+        max_backoff=1.0,
+        report_interval=float("inf"),
+    )
+    await ingestor.start()
+    generate_time = await generate(ingestor, args.rate, args.seconds, args.edits, args.deletes)
+    start = time.perf_counter()
+    await ingestor.stop(timeout=300)
+    drain_time = time.perf_counter() - start
+
+    if args.db:
+        drop_target()
+
+    written = ingestor.stats["written"]
+    print(f"📊 {written} events in {generate_time + drain_time:.2f}s "
+          f"({written / (generate_time + drain_time):,.0f} events/sec, {drain_time:.2f}s to drain)")
+    print(f"📊 latency p50 {percentile(writer.latencies, 0.5) * 1000:.0f}ms, "
+          f"p99 {percentile(writer.latencies, 0.99) * 1000:.0f}ms, "
+          f"max {max(writer.latencies, default=0) * 1000:.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=int, default=2000, help="events per second")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--edits", type=float, default=0.1, help="share of events that are edits")
+    parser.add_argument("--deletes", type=float, default=0.02, help="share of events that are deletes")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--flush-interval", type=float, default=1.0)
+    parser.add_argument("--max-queue", type=int, default=10_000)
+    parser.add_argument("--batch-cost", type=float, default=20, help="simulated ms per write")
+    parser.add_argument("--event-cost", type=float, default=0.05, help="simulated ms per event")
+    parser.add_argument("--outage", type=float, default=0, help="seconds of simulated database outage")
+    parser.add_argument("--db", action="store_true", help="write to PostgreSQL instead of the simulated writer")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+End-to-end offline benchmark: extract, transform and load a synthetic guild.
+
+Builds a guild with FakeDiscord (channels, active and archived threads, and
+message lengths drawn from a realistic long-tailed distribution), then runs
+each phase of the pipeline against it:
+- extract: DiscordExtractor.export_guild_history to CSV, through FakeHTTP's
+  simulated latency and rate limits (`--backend fake`), or through the REST
+  backend against a local FakeDiscordServer (`--backend rest`)
+- transform: reading the export back into typed frames, chunk by chunk, and
+  deriving the enriched columns (utils.transform.enrich_messages), as
+  BronzeIngestor does before loading chat
+- load: BronzeIngestor streaming the export into a scratch bronze table,
+  in-memory SQLite by default, or PostgreSQL when DATABASE_URL points at one
+
+Each phase is timed on its own, then run again under tracemalloc for its
+peak memory, so the timings aren't slowed down by tracing (`--no-memory`
+skips the second run). Results are appended as one JSON line per run to
+`--results`, together with the parameters and git commit, and compared with
+the last earlier run that used the same parameters.
+
+Usage:
+  $ PYTHONPATH=. python benchmarks/bench_suite.py
+  $ PYTHONPATH=. python benchmarks/bench_suite.py --channels 20 --messages 20000 --backend rest
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+# DiscordExtractor reads these on init; the fake guild never uses them
+os.environ.setdefault("DARCY_KEY", "offline")
+os.environ.setdefault("TEST_SERVER_ID", "0")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+# Keep the suite's spans out of the pipeline's metrics log
+os.environ.setdefault("METRICS_LOG", "")
+
+from sqlalchemy import text
+
+from benchmarks.bench_ingest import TABLE, drop_target, prepare_target
+from benchmarks.fake_discord import FakeDiscordServer, FakeHTTP, build_guild
+from config.db_config import engine
+from utils.extractor import DiscordExtractor
+from utils.ingestor import BronzeIngestor
+from utils.transform import enrich_messages
+
+RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.jsonl")
+
+
+def build(http, args):
+    return build_guild(
+        http,
+        channel_sizes=[args.largest] + [args.messages] * (args.channels - 1),
+        threads_per_channel=args.threads,
+        thread_size=args.thread_size,
+        archived_per_channel=args.archived,
+        content_size=args.content_size,
+        content_spread=args.content_spread,
+    )
+
+
+async def extract(args):
+    """Export the fake guild; returns (path, messages, requests, rate-limited requests)."""
+    if args.backend == "fake":
+        http = FakeHTTP(latency=args.latency, bucket_limit=args.bucket_limit)
+        extractor = DiscordExtractor(max_concurrency=args.concurrency, incremental=False,
+                                     output_format="csv", backend="gateway")
+        path = await extractor.export_guild_history(build(http, args))
+        requests, limited = http.requests, http.rate_limited
+    else:
+        # The server applies latency and rate limits, so the guild's own HTTP
+        # layer is never used
+        guild = build(FakeHTTP(latency=0), args)
+        async with FakeDiscordServer(guild, latency=args.latency, bucket_limit=args.bucket_limit) as server:
+            os.environ["DISCORD_API_BASE"] = server.url
+            extractor = DiscordExtractor(max_concurrency=args.concurrency, incremental=False,
+                                         output_format="csv", backend="rest")
+            extractor.guild_id = guild.id
+            path = await extractor.with_guild(extractor.export_guild_history)
+        requests, limited = server.requests, server.rate_limited
+    with open(path, "rb") as f:
+        messages = sum(1 for _ in f) - 1
+    return path, messages, requests, limited
+
+
+def transform(path, chunksize):
+    """Parse the export into typed chunks and enrich them; returns the number of rows."""
+    ingestor = BronzeIngestor(path, TABLE, chunksize=chunksize, quiet=True, transform=enrich_messages)
+    return sum(len(ingestor.transform_frame(chunk)) for chunk in ingestor.read_csv_chunks())
+
+
+def load(path, chunksize):
+    """Stream the export into the (emptied) scratch bronze table; returns the number of rows."""
+    with engine.begin() as connection:
+        connection.execute(text(f"DELETE FROM bronze.{TABLE}"))
+    BronzeIngestor(path, TABLE, truncate=False, chunksize=chunksize, stream=True, quiet=True).run()
+    with engine.connect() as connection:
+        return connection.execute(text(f"SELECT COUNT(*) FROM bronze.{TABLE}")).scalar()
+
+
+def measure(run, memory):
+    """Return (seconds, result) for run(), and its peak traced memory in MiB when `memory` is set."""
+    gc.collect()
+    start = time.perf_counter()
+    result = run()
+    seconds = time.perf_counter() - start
+
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return seconds, result, peak
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_result(path, params):
+    """The last result recorded with the same parameters, if any."""
+    if not os.path.exists(path):
+        return None
+    previous = None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            result = json.loads(line)
+            if result["params"] == params:
+                previous = result
+    return previous
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--channels", type=int, default=8)
+    parser.add_argument("--messages", type=int, default=5000, help="messages per channel")
+    parser.add_argument("--largest", type=int, default=20000, help="messages in the largest channel")
+    parser.add_argument("--threads", type=int, default=4, help="active threads per channel")
+    parser.add_argument("--archived", type=int, default=8, help="archived threads per channel")
+    parser.add_argument("--thread-size", type=int, default=200)
+    parser.add_argument("--content-size", type=int, default=60, help="median message length")
+    parser.add_argument("--content-spread", type=float, default=1.0,
+                        help="sigma of the log-normal message length distribution (0: fixed length)")
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds per simulated API request")
+    parser.add_argument("--bucket-limit", type=int, default=50,
+                        help="requests per second allowed per channel/thread")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--chunksize", type=int, default=50_000, help="rows per transform/load chunk")
+    parser.add_argument("--backend", choices=("fake", "rest"), default="fake",
+                        help="fake: in-process fake guild; rest: REST backend against a local mock server")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run of each phase")
+    parser.add_argument("--results", default=RESULTS, help="JSON lines file results are appended to")
+    args = parser.parse_args()
+
+    params = {key: value for key, value in vars(args).items() if key not in ("no_memory", "results")}
+    params["target"] = engine.dialect.name
+    results_path = os.path.abspath(args.results)
+    memory = not args.no_memory
+
+    # Write the export somewhere disposable
+    os.chdir(tempfile.mkdtemp())
+    phases = {}
+
+    seconds, (path, messages, requests, limited), peak = measure(lambda: asyncio.run(extract(args)), memory)
+    phases["extract"] = {"seconds": seconds, "rows": messages, "peak_mib": peak,
+                         "requests": requests, "rate_limited": limited,
+                         "file_mib": os.path.getsize(path) / 2**20}
+
+    seconds, rows, peak = measure(lambda: transform(path, args.chunksize), memory)
+    phases["transform"] = {"seconds": seconds, "rows": rows, "peak_mib": peak}
+
+    prepare_target()
+    try:
+        seconds, rows, peak = measure(lambda: load(path, args.chunksize), memory)
+        phases["load"] = {"seconds": seconds, "rows": rows, "peak_mib": peak}
+    finally:
+        drop_target()
+
+    for phase in phases.values():
+        phase["rows_per_second"] = phase["rows"] / phase["seconds"] if phase["seconds"] else None
+
+    result = {
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "params": params,
+        "phases": phases,
+    }
+    previous = previous_result(results_path, params)
+
+    print(f"📊 {messages:,} messages ({phases['extract']['file_mib']:.1f} MiB CSV), "
+          f"{requests} requests, {limited} rate-limited, target {params['target']}:")
+    for name, phase in phases.items():
+        peak = f"{phase['peak_mib']:8.1f} MiB peak" if phase["peak_mib"] is not None else ""
+        change = ""
+        if previous and name in previous["phases"]:
+            before = previous["phases"][name]["seconds"]
+            change = f"  {(phase['seconds'] - before) / before:+7.1%} vs {previous['commit'] or 'previous run'}"
+        print(f"   {name:>9}: {phase['seconds']:7.2f}s  {phase['rows_per_second']:12,.0f} rows/sec  {peak}{change}")
+
+    os.makedirs(os.path.dirname(results_path) or ".", exist_ok=True)
+    with open(results_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result) + "\n")
+    print(f"✅ Appended results to {results_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark utils.transform.enrich_messages, the transform applied to each
+chunk on its way into bronze.
+
+Builds a frame of synthetic messages: chat text of log-normal length with
+user mentions, links and emoji sprinkled in at realistic rates, some of them
+thread messages or replies. Then enriches it chunk by chunk, as BronzeIngestor does, and
+compares that with deriving the same columns one message at a time with
+Python's re module. Costs are reported per million messages.
+
+Usage:
+  $ PYTHONPATH=. python benchmarks/bench_transform.py
+  $ PYTHONPATH=. python benchmarks/bench_transform.py --messages 1000000 --chunksize 50000
+"""
+
+import argparse
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.transform import DISCRIMINATOR, EMOJI, URL, USER_MENTION, USER_MENTION_ID, enrich_messages
+
+WORDS = np.array("the a to is it and i you that of in for on this lol ok yeah no what".split())
+
+
+def build_messages(count, seed=0):
+    rng = np.random.default_rng(seed)
+    lengths = np.minimum(rng.lognormal(np.log(8), 0.9, count).astype(int) + 1, 300)
+    words = WORDS[rng.integers(0, len(WORDS), lengths.sum())]
+    texts = [" ".join(chunk) for chunk in np.split(words, np.cumsum(lengths)[:-1])]
+
+    # About 10% mention someone (mostly up front), 3% link, 8% use emoji
+    users = rng.integers(10**17, 10**18, count)
+    for i in np.flatnonzero(rng.random(count) < 0.10):
+        texts[i] = f"<@{users[i]}> {texts[i]}" if i % 3 else f"{texts[i]} <@!{users[i]}>"
+    for i in np.flatnonzero(rng.random(count) < 0.03):
+        texts[i] += f" https://example.com/{i}"
+    for i in np.flatnonzero(rng.random(count) < 0.08):
+        texts[i] += " 💀" if i % 2 else " <:pog:1234567890>"
+
+    authors = np.array([f"User_{n}" + ("#0" if n % 4 == 0 else "") for n in range(500)])
+    thread_ids = pd.array(np.where(rng.random(count) < 0.2, rng.integers(1, 1000, count), 0), dtype="Int64")
+    thread_ids[thread_ids == 0] = pd.NA
+    # About 15% reply to another message
+    reply_to_ids = pd.array(np.where(rng.random(count) < 0.15, rng.integers(10**17, 10**18, count), 0),
+                            dtype="Int64")
+    reply_to_ids[reply_to_ids == 0] = pd.NA
+    return pd.DataFrame({
+        "author": authors[rng.integers(0, len(authors), count)],
+        "chat_text": texts,
+        "thread_id": thread_ids,
+        "reply_to_id": reply_to_ids,
+    })
+
+
+def enrich_per_row(df):
+    """The same columns, derived one message at a time."""
+    mention, mention_id = re.compile(USER_MENTION), re.compile(USER_MENTION_ID)
+    url, emoji, discriminator = re.compile(URL), re.compile(EMOJI), re.compile(DISCRIMINATOR)
+    rows = []
+    for author, text, thread_id, reply_to_id in zip(df["author"], df["chat_text"], df["thread_id"],
+                                                    df["reply_to_id"]):
+        text = text if isinstance(text, str) else ""
+        ids = list(dict.fromkeys(mention_id.findall(text)))
+        rows.append((
+            discriminator.sub("", author.strip().lower()),
+            len(text),
+            "{" + ",".join(ids) + "}" if ids else None,
+            len(mention.findall(text)),
+            len(url.findall(text)),
+            len(emoji.findall(text)),
+            thread_id is not pd.NA,
+            reply_to_id is not pd.NA,
+        ))
+    return pd.DataFrame(rows, columns=["author_normalized", "message_length", "mentioned_user_ids", "mention_count",
+                                       "link_count", "emoji_count", "is_thread", "is_reply"])
+
+
+def timed(run):
+    start = time.perf_counter()
+    result = run()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--chunksize", type=int, default=50_000, help="rows per chunk, as in BronzeIngestor")
+    args = parser.parse_args()
+
+    df = build_messages(args.messages)
+    per_million = 1_000_000 / args.messages
+
+    chunks = [df.iloc[start:start + args.chunksize].copy() for start in range(0, len(df), args.chunksize)]
+    vectorized, enriched = timed(lambda: pd.concat([enrich_messages(chunk) for chunk in chunks]))
+    per_row, expected = timed(lambda: enrich_per_row(df))
+
+    # Both derive the same values
+    def values(column):
+        return column.astype(object).where(column.notna(), None).tolist()
+    for column in expected.columns:
+        assert values(enriched[column]) == values(expected[column]), f"{column} differs"
+
+    for name, seconds in (("vectorized", vectorized), ("per row", per_row)):
+        print(f"⏱️ {name:>10}: {seconds:6.2f}s for {args.messages:,} messages, "
+              f"{seconds * per_million:6.2f}s per million ({args.messages / seconds:,.0f} messages/sec)")
+    print(f"📊 vectorized is {per_row / vectorized:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""
+Offline stand-in for the parts of the Discord API used by DiscordExtractor.
+
+The fake objects expose the same attributes and async iterators as discord.py
+(`guild.text_channels`, `channel.threads`, `channel.archived_threads()`,
+`history(limit=None)`), and every page request goes through FakeHTTP, which
+simulates request latency and Discord's rate limits:
+- Per-route buckets: message history is limited per channel/thread
+- A global limit shared by every request made with the bot token
+
+FakeDiscordServer serves the same fake guild over HTTP, with Discord's JSON
+shapes, rate-limit headers and 429 responses, for the REST backend
+(utils.rest_client) to run against.
+"""
+
+import asyncio
+import math
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+# Discord's epoch (2015-01-01) in milliseconds, used to build snowflake IDs
+DISCORD_EPOCH = 1420070400000
+PAGE_SIZE = 100
+# Discord's message type for replies
+REPLY_MESSAGE_TYPE = 19
+
+
+def make_snowflake(dt: datetime, sequence: int = 0) -> int:
+    """Build a Discord snowflake ID for a timestamp."""
+    ms = int(dt.timestamp() * 1000) - DISCORD_EPOCH
+    return (ms << 22) | (sequence & 0x3FFFFF)
+
+
+class FakeHTTP:
+    """
+    Simulated Discord HTTP layer with per-bucket and global rate limits.
+
+    Args:
+        latency: Seconds each request takes to "travel" to Discord and back.
+        bucket_limit: Requests allowed per bucket per `bucket_window` seconds.
+        bucket_window: Length of a bucket's rate-limit window in seconds.
+        global_limit: Requests allowed per second across all buckets.
+    """
+
+    def __init__(self, latency=0.05, bucket_limit=5, bucket_window=1.0, global_limit=50):
+        self.latency = latency
+        self.bucket_limit = bucket_limit
+        self.bucket_window = bucket_window
+        self.global_limit = global_limit
+        self.requests = 0
+        self.rate_limited = 0
+        self._buckets: Dict[str, List[float]] = {}
+        self._global: List[float] = []
+        self._lock = asyncio.Lock()
+
+    async def request(self, bucket: str) -> None:
+        """Wait for a free slot in `bucket`, then simulate one round trip."""
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                calls = [t for t in self._buckets.get(bucket, []) if now - t < self.bucket_window]
+                self._buckets[bucket] = calls
+                self._global = [t for t in self._global if now - t < 1.0]
+
+                if len(calls) < self.bucket_limit and len(self._global) < self.global_limit:
+                    calls.append(now)
+                    self._global.append(now)
+                    self.requests += 1
+                    break
+
+                # Like discord.py, sleep until the oldest call leaves the window
+                self.rate_limited += 1
+                oldest = calls[0] if len(calls) >= self.bucket_limit else self._global[0]
+                window = self.bucket_window if len(calls) >= self.bucket_limit else 1.0
+                wait = window - (now - oldest)
+            await asyncio.sleep(max(wait, 0.001))
+
+        await asyncio.sleep(self.latency)
+
+
+class FakeUser:
+    def __init__(self, user_id: int, name: str):
+        self.id = user_id
+        self.name = name
+
+
+class FakeMessageReference:
+    def __init__(self, message_id: int):
+        self.message_id = message_id
+
+
+class FakeMessage:
+    def __init__(self, message_id: int, author: FakeUser, content: str, created_at: datetime,
+                 reply_to: Optional[int] = None):
+        self.id = message_id
+        self.author = author
+        self.content = content
+        self.created_at = created_at
+        # Like discord.py, a reply has the reply type and a reference to the message replied to
+        self.type = REPLY_MESSAGE_TYPE if reply_to is not None else 0
+        self.reference = FakeMessageReference(reply_to) if reply_to is not None else None
+
+
+class FakeMessageable:
+    """Shared history() implementation for fake channels and threads."""
+
+    def __init__(self, http: FakeHTTP, channel_id: int, name: str, messages: List[FakeMessage]):
+        self._http = http
+        self.id = channel_id
+        self.name = name
+        # Stored oldest first, like the snowflake order Discord uses
+        self._messages = sorted(messages, key=lambda m: m.id)
+
+    @property
+    def last_message_id(self) -> Optional[int]:
+        return self._messages[-1].id if self._messages else None
+
+    async def history(self, limit: Optional[int] = 100, before=None, after=None, oldest_first=None):
+        """
+        Yield messages page by page, one simulated request per 100 messages.
+
+        Follows discord.py: newest first by default, oldest first when
+        `after` is given, with `before`/`after` taking objects with an `id`.
+        """
+        if oldest_first is None:
+            oldest_first = after is not None
+
+        messages = self._messages
+        if after is not None:
+            messages = [m for m in messages if m.id > after.id]
+        if before is not None:
+            messages = [m for m in messages if m.id < before.id]
+        if not oldest_first:
+            messages = list(reversed(messages))
+        if limit is not None:
+            messages = messages[:limit]
+
+        # Always make at least one request, even for an empty channel
+        for start in range(0, max(len(messages), 1), PAGE_SIZE):
+            await self._http.request(f"GET /channels/{self.id}/messages")
+            for msg in messages[start:start + PAGE_SIZE]:
+                yield msg
+
+
+class FakeThread(FakeMessageable):
+    def __init__(self, http, thread_id, name, messages, parent_id, archived=False, archive_timestamp=None):
+        super().__init__(http, thread_id, name, messages)
+        self.parent_id = parent_id
+        self.archived = archived
+        self.archive_timestamp = archive_timestamp
+
+
+class FakeTextChannel(FakeMessageable):
+    def __init__(self, http, channel_id, name, messages):
+        super().__init__(http, channel_id, name, messages)
+        self.threads: List[FakeThread] = []
+        self.archived: List[FakeThread] = []
+        self.guild = None
+
+    async def archived_threads(self, limit: Optional[int] = 100, before=None):
+        """Yield archived threads, most recently archived first."""
+        threads = sorted(self.archived, key=lambda t: t.archive_timestamp, reverse=True)
+        if before is not None:
+            threads = [t for t in threads if t.archive_timestamp < before]
+        if limit is not None:
+            threads = threads[:limit]
+        for start in range(0, max(len(threads), 1), PAGE_SIZE):
+            await self._http.request(f"GET /channels/{self.id}/threads/archived/public")
+            for thread in threads[start:start + PAGE_SIZE]:
+                yield thread
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, name: str, text_channels: List[FakeTextChannel]):
+        self.id = guild_id
+        self.name = name
+        self.text_channels = text_channels
+        for channel in text_channels:
+            channel.guild = self
+
+    def get_channel(self, channel_id: int):
+        for channel in self.text_channels:
+            if channel.id == channel_id:
+                return channel
+        return None
+
+
+# Discord's limit on a message's length
+MAX_CONTENT = 2000
+
+
+def build_guild(http: FakeHTTP, channel_sizes: List[int], threads_per_channel: int = 0,
+                thread_size: int = 0, archived_per_channel: int = 0,
+                content_size: int = 80, start: Optional[datetime] = None,
+                content_spread: float = 0.0, seed: int = 0) -> FakeGuild:
+    """
+    Build a synthetic guild.
+
+    Args:
+        http: The simulated HTTP layer every request goes through.
+        channel_sizes: Number of messages in each text channel.
+        threads_per_channel: Active threads created in every channel.
+        thread_size: Number of messages in each thread.
+        archived_per_channel: Archived threads created in every channel.
+        content_size: Approximate length of each message's text (the median
+            length with `content_spread`).
+        start: Timestamp of the first message (defaults to one year ago).
+        content_spread: With a value above 0, message lengths are drawn from
+            a log-normal distribution with this sigma, up to Discord's 2000
+            characters: mostly short messages with a long tail, like real chat.
+            1.0 is a reasonable choice.
+        seed: Seeds the message lengths, so a guild can be rebuilt exactly.
+    """
+    start = start or datetime.now(timezone.utc) - timedelta(days=365)
+    authors = [FakeUser(make_snowflake(start, i), f"user_{i}") for i in range(50)]
+    longest = MAX_CONTENT if content_spread > 0 else content_size
+    filler = ("lorem ipsum dolor sit amet " * (longest // 27 + 1))[:longest]
+    rng = random.Random(seed)
+    sequence = 0
+
+    def content_length():
+        if content_spread <= 0:
+            return content_size
+        return min(int(rng.lognormvariate(math.log(max(content_size, 1)), content_spread)), MAX_CONTENT)
+
+    def messages(count):
+        nonlocal sequence
+        out = []
+        for _ in range(count):
+            sequence += 1
+            created_at = start + timedelta(seconds=sequence)
+            out.append(FakeMessage(
+                make_snowflake(created_at, sequence),
+                authors[sequence % len(authors)],
+                f"{sequence} {filler[:content_length()]}",
+                created_at,
+                # Every tenth message replies to the one before it
+                reply_to=out[-1].id if out and sequence % 10 == 0 else None,
+            ))
+        return out
+
+    channels = []
+    for c, size in enumerate(channel_sizes):
+        channel_id = make_snowflake(start, 10_000 + c)
+        channel = FakeTextChannel(http, channel_id, f"channel-{c}", messages(size))
+        for t in range(threads_per_channel + archived_per_channel):
+            archived = t >= threads_per_channel
+            thread = FakeThread(
+                http, make_snowflake(start, 20_000 + c * 1000 + t), f"channel-{c}-thread-{t}",
+                messages(thread_size), channel_id, archived=archived,
+                archive_timestamp=start + timedelta(days=1, seconds=t) if archived else None,
+            )
+            (channel.archived if archived else channel.threads).append(thread)
+        channels.append(channel)
+
+    return FakeGuild(make_snowflake(start, 1), "fake-guild", channels)
+
+
+class FakeDiscordServer:
+    """
+    A local HTTP server exposing a FakeGuild through Discord's REST endpoints.
+
+    Serves the endpoints used by utils.rest_client:
+    - GET /guilds/{id}, /guilds/{id}/channels, /guilds/{id}/threads/active
+    - GET /channels/{id}/messages (limit, before, after; newest first)
+    - GET /channels/{id}/threads/archived/public (limit, before)
+
+    Every route (path) gets `bucket_limit` requests per `bucket_window`
+    seconds, and all routes share `global_limit` requests per second. Like
+    Discord, responses carry X-RateLimit-* headers and requests over a limit
+    get a 429 with `retry_after`.
+
+    Use it as an async context manager; `url` is the API base URL:
+
+        async with FakeDiscordServer(guild) as server:
+            os.environ["DISCORD_API_BASE"] = server.url
+    """
+
+    def __init__(self, guild: FakeGuild, latency=0.05, bucket_limit=5, bucket_window=1.0, global_limit=50):
+        self.guild = guild
+        self.latency = latency
+        self.bucket_limit = bucket_limit
+        self.bucket_window = bucket_window
+        self.global_limit = global_limit
+        self.requests = 0
+        self.rate_limited = 0
+        self.url = None
+        self._buckets: Dict[str, List[float]] = {}
+        self._global: List[float] = []
+        self._runner = None
+
+        self._channels = {channel.id: channel for channel in guild.text_channels}
+        self._threads = {
+            thread.id: thread
+            for channel in guild.text_channels
+            for thread in channel.threads + channel.archived
+        }
+
+    async def __aenter__(self) -> "FakeDiscordServer":
+        app = web.Application(middlewares=[self._rate_limit])
+        app.add_routes([
+            web.get("/api/v10/guilds/{guild_id}", self._guild),
+            web.get("/api/v10/guilds/{guild_id}/channels", self._guild_channels),
+            web.get("/api/v10/guilds/{guild_id}/threads/active", self._active_threads),
+            web.get("/api/v10/channels/{channel_id}/messages", self._messages),
+            web.get("/api/v10/channels/{channel_id}/threads/archived/public", self._archived_threads),
+        ])
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}/api/v10"
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._runner.cleanup()
+
+    @web.middleware
+    async def _rate_limit(self, request, handler):
+        bucket = request.path
+        now = time.monotonic()
+        calls = [t for t in self._buckets.get(bucket, []) if now - t < self.bucket_window]
+        self._buckets[bucket] = calls
+        self._global = [t for t in self._global if now - t < 1.0]
+
+        if len(self._global) >= self.global_limit:
+            self.rate_limited += 1
+            retry_after = 1.0 - (now - self._global[0])
+            return web.json_response(
+                {"message": "You are being rate limited.", "retry_after": retry_after, "global": True},
+                status=429, headers={"X-RateLimit-Global": "true", "Retry-After": f"{retry_after:.3f}"},
+            )
+        if len(calls) >= self.bucket_limit:
+            self.rate_limited += 1
+            retry_after = self.bucket_window - (now - calls[0])
+            return web.json_response(
+                {"message": "You are being rate limited.", "retry_after": retry_after, "global": False},
+                status=429, headers=self._limit_headers(calls, now),
+            )
+
+        calls.append(now)
+        self._global.append(now)
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        response = await handler(request)
+        response.headers.update(self._limit_headers(calls, now))
+        return response
+
+    def _limit_headers(self, calls: List[float], now: float) -> Dict[str, str]:
+        return {
+            "X-RateLimit-Limit": str(self.bucket_limit),
+            "X-RateLimit-Remaining": str(max(self.bucket_limit - len(calls), 0)),
+            "X-RateLimit-Reset-After": f"{self.bucket_window - (now - calls[0]):.3f}",
+        }
+
+    def _check_guild(self, request) -> None:
+        if int(request.match_info["guild_id"]) != self.guild.id:
+            raise web.HTTPNotFound(text='{"message": "Unknown Guild", "code": 10004}',
+                                   content_type="application/json")
+
+    def _source(self, request) -> FakeMessageable:
+        channel_id = int(request.match_info["channel_id"])
+        source = self._channels.get(channel_id) or self._threads.get(channel_id)
+        if source is None:
+            raise web.HTTPNotFound(text='{"message": "Unknown Channel", "code": 10003}',
+                                   content_type="application/json")
+        return source
+
+    @staticmethod
+    def _channel_json(channel: FakeTextChannel, position: int) -> dict:
+        return {"id": str(channel.id), "type": 0, "name": channel.name, "position": position,
+                "last_message_id": str(channel.last_message_id) if channel.last_message_id else None}
+
+    @staticmethod
+    def _thread_json(thread: FakeThread) -> dict:
+        return {
+            "id": str(thread.id),
+            "type": 11,
+            "name": thread.name,
+            "parent_id": str(thread.parent_id),
+            "last_message_id": str(thread.last_message_id) if thread.last_message_id else None,
+            "thread_metadata": {
+                "archived": thread.archived,
+                "archive_timestamp": thread.archive_timestamp.isoformat() if thread.archive_timestamp else None,
+            },
+        }
+
+    async def _guild(self, request):
+        self._check_guild(request)
+        return web.json_response({"id": str(self.guild.id), "name": self.guild.name})
+
+    async def _guild_channels(self, request):
+        self._check_guild(request)
+        return web.json_response([
+            self._channel_json(channel, position) for position, channel in enumerate(self.guild.text_channels)
+        ])
+
+    async def _active_threads(self, request):
+        self._check_guild(request)
+        threads = [thread for channel in self.guild.text_channels for thread in channel.threads]
+        return web.json_response({"threads": [self._thread_json(t) for t in threads], "members": []})
+
+    async def _messages(self, request):
+        messages = self._source(request)._messages
+        limit = min(int(request.query.get("limit", 50)), PAGE_SIZE)
+
+        # Like Discord: `after` returns the messages right after the cursor,
+        # otherwise the newest ones before it; pages are always newest first
+        if "after" in request.query:
+            after = int(request.query["after"])
+            page = [m for m in messages if m.id > after][:limit]
+        else:
+            before = int(request.query["before"]) if "before" in request.query else None
+            page = [m for m in messages if before is None or m.id < before][-limit:]
+
+        return web.json_response([
+            {
+                "id": str(m.id),
+                "type": m.type,
+                "author": {"id": str(m.author.id), "username": m.author.name},
+                "content": m.content,
+                "timestamp": m.created_at.isoformat(),
+                **({"message_reference": {"message_id": str(m.reference.message_id)}} if m.reference else {}),
+            }
+            for m in reversed(page)
+        ])
+
+    async def _archived_threads(self, request):
+        channel = self._source(request)
+        limit = min(int(request.query.get("limit", 50)), PAGE_SIZE)
+        threads = sorted(channel.archived, key=lambda t: t.archive_timestamp, reverse=True)
+        if "before" in request.query:
+            before = datetime.fromisoformat(request.query["before"])
+            threads = [t for t in threads if t.archive_timestamp < before]
+        return web.json_response({
+            "threads": [self._thread_json(t) for t in threads[:limit]],
+            "members": [],
+            "has_more": len(threads) > limit,
+        })
@@ -1,11 +1,57 @@
 CREATE TABLE IF NOT EXISTS bronze.chat_raw (
     id SERIAL PRIMARY KEY,
     channel_name TEXT,
-    channel_id INT,
+    channel_id BIGINT,
+    thread_name TEXT,
+    thread_id BIGINT,
+    message_id BIGINT,
+    author TEXT,
     chat_text TEXT,
+    created_at TIMESTAMPTZ,
     ingestion_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Bring tables created before the extractor's full message layout up to date
+ALTER TABLE bronze.chat_raw ALTER COLUMN channel_id TYPE BIGINT;
+ALTER TABLE bronze.chat_raw ADD COLUMN IF NOT EXISTS thread_name TEXT;
+ALTER TABLE bronze.chat_raw ADD COLUMN IF NOT EXISTS thread_id BIGINT;
+ALTER TABLE bronze.chat_raw ADD COLUMN IF NOT EXISTS message_id BIGINT;
+ALTER TABLE bronze.chat_raw ADD COLUMN IF NOT EXISTS author TEXT;
+ALTER TABLE bronze.chat_raw ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ;
 
+-- Merge key for BronzeIngestor(merge_key="message_id")
+CREATE UNIQUE INDEX IF NOT EXISTS chat_raw_message_id_key ON bronze.chat_raw (message_id);
 
+-- Lets silver loads pick up only rows ingested since their watermark
+CREATE INDEX IF NOT EXISTS chat_raw_ingestion_timestamp_idx ON bronze.chat_raw (ingestion_timestamp);
 
+-- Set by the streaming ingester when a message is deleted on Discord
+ALTER TABLE bronze.chat_raw ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ;
+
+-- ID of the transaction that last wrote each row. Silver loads select rows by
+-- it rather than by ingestion_timestamp, which is when the writing transaction
+-- started, not when it committed (see silver/ddl/create_load_watermark.sql)
+ALTER TABLE bronze.chat_raw ADD COLUMN IF NOT EXISTS ingest_xid xid8 DEFAULT pg_current_xact_id();
+CREATE INDEX IF NOT EXISTS chat_raw_ingest_xid_idx ON bronze.chat_raw (ingest_xid);
+
+-- Derived from each message by utils.transform.enrich_messages at load time
+ALTER TABLE bronze.chat_raw ADD COLUMN IF NOT EXISTS author_normalized TEXT;
+ALTER TABLE bronze.chat_raw ADD COLUMN IF NOT EXISTS message_length INT;
+ALTER TABLE bronze.chat_raw ADD COLUMN IF NOT EXISTS mentioned_user_ids BIGINT[];
+ALTER TABLE bronze.chat_raw ADD COLUMN IF NOT EXISTS mention_count INT;
+ALTER TABLE bronze.chat_raw ADD COLUMN IF NOT EXISTS link_count INT;
+ALTER TABLE bronze.chat_raw ADD COLUMN IF NOT EXISTS emoji_count INT;
+ALTER TABLE bronze.chat_raw ADD COLUMN IF NOT EXISTS is_thread BOOLEAN;
+ALTER TABLE bronze.chat_raw ADD COLUMN IF NOT EXISTS is_reply BOOLEAN;
+
+-- Guild the message was posted in, so several guilds can share the table;
+-- NULL for rows exported before it was recorded
+ALTER TABLE bronze.chat_raw ADD COLUMN IF NOT EXISTS guild_id BIGINT;
+
+-- The message this one replies to (is_reply is derived from it)
+ALTER TABLE bronze.chat_raw ADD COLUMN IF NOT EXISTS reply_to_id BIGINT;
+
+-- BronzeIngestor's merge stage is created LIKE this table on first use and
+-- kept; drop it whenever this script changes the columns, so it's recreated
+-- with them
+DROP TABLE IF EXISTS bronze.chat_raw_stage;
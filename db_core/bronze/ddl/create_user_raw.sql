@@ -6,3 +6,20 @@ CREATE TABLE IF NOT EXISTS bronze.user_raw (
     discord_id TEXT,
     ingestion_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+
+-- Merge key for BronzeIngestor(merge_key="discord_id")
+CREATE UNIQUE INDEX IF NOT EXISTS user_raw_discord_id_key ON bronze.user_raw (discord_id);
+
+-- Lets silver loads pick up only rows ingested since their watermark
+CREATE INDEX IF NOT EXISTS user_raw_ingestion_timestamp_idx ON bronze.user_raw (ingestion_timestamp);
+
+-- ID of the transaction that last wrote each row. Silver loads select rows by
+-- it rather than by ingestion_timestamp, which is when the writing transaction
+-- started, not when it committed (see silver/ddl/create_load_watermark.sql)
+ALTER TABLE bronze.user_raw ADD COLUMN IF NOT EXISTS ingest_xid xid8 DEFAULT pg_current_xact_id();
+CREATE INDEX IF NOT EXISTS user_raw_ingest_xid_idx ON bronze.user_raw (ingest_xid);
+
+-- BronzeIngestor's merge stage is created LIKE this table on first use and
+-- kept; drop it whenever this script changes the columns, so it's recreated
+-- with them
+DROP TABLE IF EXISTS bronze.user_raw_stage;
@@ -10,4 +10,26 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL is not set. Please check your .env file.")
 
-engine = create_engine(DATABASE_URL)
+def pool_options(url):
+    """
+    Connection pool settings for the process-wide engine.
+
+    - DB_POOL_SIZE / DB_MAX_OVERFLOW: connections kept open / extra under load
+    - DB_POOL_TIMEOUT: seconds to wait for a free connection
+    - DB_POOL_RECYCLE: seconds before a connection is replaced, so idle ones
+      aren't dropped by RDS or a proxy mid-query
+    - Connections are pinged before use, so a restarted database costs one
+      reconnect instead of a failed bot query
+    SQLite (used by the offline benchmarks) keeps SQLAlchemy's defaults.
+    """
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
@@ -0,0 +1,290 @@
+import os
+import re
+import time
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import text
+
+# Bind parameters (`:name`) in a statement, skipping `::type` casts
+PARAM = re.compile(r"(?<![:\w]):(\w+)")
+
+class Statement:
+    """
+    A named query, run as a server-side prepared statement on PostgreSQL.
+
+    The first time a pooled connection runs it, the query is PREPAREd on that
+    connection, which keeps it for its lifetime; later runs only send
+    EXECUTE with the parameters, so PostgreSQL skips parsing and planning.
+    Other databases (and DB_PREPARED_STATEMENTS=0, for poolers such as
+    PgBouncer in transaction mode) run the query as plain text.
+    """
+
+    def __init__(self, name: str, sql: str):
+        self.name = name
+        self.sql = sql
+        self.params: List[str] = list(dict.fromkeys(PARAM.findall(sql)))
+        positions = {param: i + 1 for i, param in enumerate(self.params)}
+        self.prepare_sql = f"PREPARE {name} AS " + PARAM.sub(lambda m: f"${positions[m.group(1)]}", sql)
+        self.execute_sql = f"EXECUTE {name}(" + ", ".join(f"%({p})s" for p in self.params) + ")"
+
+    def run(self, conn, params: Dict[str, Any], prepare: bool = True):
+        if not prepare or conn.dialect.name != "postgresql":
+            return conn.execute(text(self.sql), params)
+        # `info` belongs to the DBAPI connection, so a recycled connection prepares again
+        prepared = conn.info.setdefault("prepared_statements", set())
+        if self.name not in prepared:
+            conn.exec_driver_sql(self.prepare_sql)
+            prepared.add(self.name)
+        return conn.exec_driver_sql(self.execute_sql, params)
+
+GET_USER = Statement("db_get_user", """
+    SELECT id, name, role, notion_id, discord_id, created_at, updated_at
+    FROM silver.user
+    WHERE discord_id = CAST(:discord_id AS TEXT)
+""")
+
+GET_USER_FACT = Statement("db_get_user_fact", """
+    SELECT f.fact_id, f.fact_text, f.created_at
+    FROM silver.fact f
+    JOIN silver.user u ON f.user_id = u.id
+    WHERE u.discord_id = CAST(:discord_id AS TEXT)
+      AND f.created_at >= CURRENT_TIMESTAMP - make_interval(days => CAST(:days_back AS INT))
+    ORDER BY f.created_at DESC
+""")
+
+SET_USER_FACT = Statement("db_set_user_fact", """
+    INSERT INTO silver.fact (user_id, fact_text)
+    SELECT id, CAST(:fact_text AS TEXT)
+    FROM silver.user
+    WHERE discord_id = CAST(:discord_id AS TEXT)
+    RETURNING fact_id, created_at
+""")
+
+class TTLCache:
+    """
+    A thread-safe read-through cache: least recently used entries are evicted
+    beyond `maxsize`, and every entry expires `ttl` seconds after it was stored.
+    """
+
+    MISSING = object()
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: "OrderedDict[Any, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Bumped by invalidate(), so a load that started before an
+        # invalidation can't store what it read
+        self.generation = 0
+
+    def get(self, key: Any) -> Any:
+        """Return the cached value, or TTLCache.MISSING."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return self.MISSING
+
+    def set(self, key: Any, value: Any, generation: Optional[int] = None) -> None:
+        """Store a value, unless the cache was invalidated since `generation` was read."""
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, predicate: Callable[[Any], bool]) -> int:
+        """Drop every entry whose key matches; returns how many were dropped."""
+        with self.lock:
+            self.generation += 1
+            keys = [key for key in self.entries if predicate(key)]
+            for key in keys:
+                del self.entries[key]
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self.entries),
+            }
+
+class QueryMetrics:
+    """Calls, errors and latency (total, max and recent percentiles) per query."""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.lock = threading.Lock()
+        self.queries: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, name: str, seconds: float, error: bool = False) -> None:
+        with self.lock:
+            query = self.queries.setdefault(name, {
+                "calls": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0,
+                "recent": deque(maxlen=self.window),
+            })
+            query["calls"] += 1
+            query["errors"] += int(error)
+            query["total_seconds"] += seconds
+            query["max_seconds"] = max(query["max_seconds"], seconds)
+            query["recent"].append(seconds)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            stats = {}
+            for name, query in self.queries.items():
+                recent = sorted(query["recent"])
+                stats[name] = {
+                    "calls": query["calls"],
+                    "errors": query["errors"],
+                    "avg_ms": query["total_seconds"] / query["calls"] * 1000,
+                    "p50_ms": recent[len(recent) // 2] * 1000,
+                    "p99_ms": recent[min(int(len(recent) * 0.99), len(recent) - 1)] * 1000,
+                    "max_ms": query["max_seconds"] * 1000,
+                }
+            return stats
+
+def _copy(value: Any) -> Any:
+    """Copy cached rows, so callers can't change what other callers get."""
+    if isinstance(value, list):
+        return [dict(row) for row in value]
+    return dict(value) if isinstance(value, dict) else value
+
+class Database:
+    """
+    The bots' interface to the memory layer (Repository Pattern).
+
+    Queries run on the process-wide pooled engine from `config.db_config` as
+    prepared statements. User and fact lookups go through a TTL/LRU cache;
+    `set_user_fact` drops the cached entries of the user it writes for.
+    `metrics()` reports the cache hit rate and per-query latency.
+
+    Args:
+        engine: SQLAlchemy engine (default: config.db_config.engine).
+        cache_size: Cached lookups kept (DB_CACHE_SIZE, default 1024; 0 disables).
+        cache_ttl: Seconds a lookup stays cached (DB_CACHE_TTL, default 60).
+        prepare: Use server-side prepared statements (DB_PREPARED_STATEMENTS, default on).
+    """
+
+    def __init__(self, engine=None, cache_size: Optional[int] = None, cache_ttl: Optional[float] = None,
+                 prepare: Optional[bool] = None):
+        if engine is None:
+            from config.db_config import engine
+        self.engine = engine
+        if cache_size is None:
+            cache_size = int(os.getenv("DB_CACHE_SIZE", "1024"))
+        if cache_ttl is None:
+            cache_ttl = float(os.getenv("DB_CACHE_TTL", "60"))
+        if prepare is None:
+            prepare = os.getenv("DB_PREPARED_STATEMENTS", "1").lower() not in ("0", "false", "no")
+        self.prepare = prepare
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self.query_metrics = QueryMetrics()
+
+    def _run(self, statement: Statement, params: Dict[str, Any], write: bool = False) -> List[Dict[str, Any]]:
+        start = time.perf_counter()
+        try:
+            with (self.engine.begin() if write else self.engine.connect()) as conn:
+                rows = [dict(row._mapping) for row in statement.run(conn, params, self.prepare)]
+        except Exception:
+            self.query_metrics.record(statement.name, time.perf_counter() - start, error=True)
+            raise
+        self.query_metrics.record(statement.name, time.perf_counter() - start)
+        return rows
+
+    def _cached(self, key: tuple, load: Callable[[], Any]) -> Any:
+        generation = self.cache.generation
+        value = self.cache.get(key)
+        if value is TTLCache.MISSING:
+            value = load()
+            self.cache.set(key, value, generation)
+        return _copy(value)
+
+    def _load_user(self, discord_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._run(GET_USER, {"discord_id": discord_id})
+        return rows[0] if rows else None
+
+    def _load_user_fact(self, discord_id: str, days_back: int) -> List[Dict[str, Any]]:
+        return self._run(GET_USER_FACT, {"discord_id": discord_id, "days_back": days_back})
+
+    def get_user(self, discord_id: str) -> Optional[Dict[str, Any]]:
+        """Return the silver.user row for a Discord user, or None if there isn't one."""
+        discord_id = str(discord_id)
+        return self._cached(("get_user", discord_id), lambda: self._load_user(discord_id))
+
+    def get_user_fact(self, discord_id: str, days_back: int = 30) -> List[Dict[str, Any]]:
+        """Return a user's facts from the last `days_back` days, newest first."""
+        discord_id, days_back = str(discord_id), int(days_back)
+        return self._cached(("get_user_fact", discord_id, days_back),
+                            lambda: self._load_user_fact(discord_id, days_back))
+
+    def set_user_fact(self, discord_id: str, fact_text: str) -> Dict[str, Any]:
+        """
+        Store a new fact about a user.
+
+        Returns:
+            The new fact's fact_id and created_at.
+        Raises:
+            ValueError: If there is no user with that Discord ID.
+        """
+        discord_id = str(discord_id)
+        rows = self._run(SET_USER_FACT, {"discord_id": discord_id, "fact_text": fact_text}, write=True)
+        self.cache.invalidate(lambda key: key[1] == discord_id)
+        if not rows:
+            raise ValueError(f"No user with discord_id {discord_id}")
+        return rows[0]
+
+    def metrics(self) -> Dict[str, Any]:
+        """Cache hit rate and per-query latency since the Database was created."""
+        return {"cache": self.cache.stats(), "queries": self.query_metrics.stats()}
+
+class AsyncDatabase:
+    """
+    Database for the discord.py event loop.
+
+    Cache hits are answered directly; queries run in a worker thread
+    (asyncio.to_thread), so a slow query never blocks the bot's event loop.
+    """
+
+    def __init__(self, db: Optional[Database] = None, **kwargs):
+        self.db = db or Database(**kwargs)
+
+    async def _cached(self, key: tuple, load: Callable[[], Any]) -> Any:
+        cache = self.db.cache
+        generation = cache.generation
+        value = cache.get(key)
+        if value is TTLCache.MISSING:
+            value = await asyncio.to_thread(load)
+            cache.set(key, value, generation)
+        return _copy(value)
+
+    async def get_user(self, discord_id: str) -> Optional[Dict[str, Any]]:
+        discord_id = str(discord_id)
+        return await self._cached(("get_user", discord_id), lambda: self.db._load_user(discord_id))
+
+    async def get_user_fact(self, discord_id: str, days_back: int = 30) -> List[Dict[str, Any]]:
+        discord_id, days_back = str(discord_id), int(days_back)
+        return await self._cached(("get_user_fact", discord_id, days_back),
+                                  lambda: self.db._load_user_fact(discord_id, days_back))
+
+    async def set_user_fact(self, discord_id: str, fact_text: str) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.db.set_user_fact, discord_id, fact_text)
+
+    def metrics(self) -> Dict[str, Any]:
+        return self.db.metrics()
@@ -0,0 +1,308 @@
+import os
+import re
+import zlib
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import text
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(chat_text: Optional[str]) -> List[str]:
+    return TOKEN.findall(chat_text.lower()) if chat_text else []
+
+@lru_cache(maxsize=1 << 20)
+def _hash(token: str) -> int:
+    # crc32 rather than hash(), which is salted per process and would break saved indexes
+    return zlib.crc32(token.encode("utf-8"))
+
+class _Segment:
+    """Postings added together: (bucket, row, weight), sorted by bucket."""
+
+    __slots__ = ("keys", "starts", "rows", "weights")
+
+    def __init__(self, buckets: np.ndarray, rows: np.ndarray, weights: np.ndarray):
+        order = np.argsort(buckets, kind="stable")
+        buckets = buckets[order]
+        self.rows = rows[order]
+        self.weights = weights[order]
+        self.keys, first = np.unique(buckets, return_index=True)
+        self.starts = np.append(first, len(buckets)).astype(np.int64)
+
+    def postings(self, bucket: int) -> Tuple[np.ndarray, np.ndarray]:
+        i = np.searchsorted(self.keys, bucket)
+        if i == len(self.keys) or self.keys[i] != bucket:
+            return self.rows[:0], self.weights[:0]
+        return self.rows[self.starts[i]:self.starts[i + 1]], self.weights[self.starts[i]:self.starts[i + 1]]
+
+    def buckets(self) -> np.ndarray:
+        return np.repeat(self.keys, np.diff(self.starts))
+
+class HashedTfidfIndex:
+    """
+    An incremental, CPU-only TF-IDF index over hashed terms, in NumPy.
+
+    Terms are hashed into `dims` buckets, so there's no vocabulary to keep
+    in sync. Documents are weighted with log term frequency and cosine
+    normalised when added; inverse document frequency is applied to the
+    query (the classic lnc.ltc scheme), so adding documents never requires
+    re-weighting the ones already indexed.
+
+    Postings live in segments sorted by bucket: every `add()` appends one,
+    and they're merged into one once there are more than `max_segments`.
+    A query only touches the postings of its own terms, scatter-adds them
+    into one score per document and picks the top k with argpartition, so
+    its cost grows with how common its terms are, not with the index size.
+    Re-adding a document ID replaces it; removed documents are dropped from
+    the postings when segments are merged.
+    """
+
+    def __init__(self, dims: int = 1 << 20, max_segments: int = 8):
+        self.dims = dims
+        self.max_segments = max_segments
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.df = np.zeros(dims, dtype=np.int32)
+        self.segments: List[_Segment] = []
+
+    def __len__(self) -> int:
+        return int(self.alive.sum())
+
+    def _buckets(self, chat_text: Optional[str]) -> List[int]:
+        dims = self.dims
+        return [_hash(token) % dims for token in tokenize(chat_text)]
+
+    def remove(self, ids: Iterable[int]) -> None:
+        ids = np.fromiter(ids, dtype=np.int64)
+        if len(ids) and len(self.ids):
+            self.alive &= ~np.isin(self.ids, ids)
+
+    def add(self, ids: Sequence[int], texts: Sequence[Optional[str]]) -> None:
+        """Index documents, replacing any already indexed under the same ID."""
+        if not len(ids):
+            return
+        ids = np.asarray(ids, dtype=np.int64)
+        self.remove(ids)
+
+        # One (document, bucket) pair per token, in plain Python lists;
+        # everything after is vectorised
+        doc_of, bucket_of = [], []
+        for i, chat_text in enumerate(texts):
+            buckets = self._buckets(chat_text)
+            doc_of.extend([i] * len(buckets))
+            bucket_of.extend(buckets)
+
+        base = len(self.ids)
+        self.ids = np.concatenate([self.ids, ids])
+        self.alive = np.concatenate([self.alive, np.ones(len(ids), dtype=bool)])
+        if not bucket_of:
+            return
+
+        pairs = np.asarray(doc_of, dtype=np.int64) * self.dims + np.asarray(bucket_of, dtype=np.int64)
+        pairs, tf = np.unique(pairs, return_counts=True)
+        docs = pairs // self.dims
+        buckets = (pairs % self.dims).astype(np.int32)
+        weights = 1.0 + np.log(tf)
+        norms = np.sqrt(np.bincount(docs, weights=weights * weights, minlength=len(ids)))
+        weights = (weights / norms[docs]).astype(np.float32)
+
+        self.df += np.bincount(buckets, minlength=self.dims).astype(np.int32)
+        self.segments.append(_Segment(buckets, (docs + base).astype(np.int32), weights))
+        if len(self.segments) > self.max_segments:
+            self.merge()
+
+    def merge(self) -> None:
+        """Merge every segment into one, dropping removed documents and their rows."""
+        keep = self.alive
+        new_row = np.cumsum(keep, dtype=np.int64) - 1
+        buckets, rows, weights = [], [], []
+        for segment in self.segments:
+            live = keep[segment.rows]
+            buckets.append(segment.buckets()[live])
+            rows.append(new_row[segment.rows[live]].astype(np.int32))
+            weights.append(segment.weights[live])
+        self.ids = self.ids[keep]
+        self.alive = np.ones(len(self.ids), dtype=bool)
+        self.segments = []
+        if buckets and sum(len(b) for b in buckets):
+            buckets = np.concatenate(buckets)
+            self.df = np.bincount(buckets, minlength=self.dims).astype(np.int32)
+            self.segments = [_Segment(buckets, np.concatenate(rows), np.concatenate(weights))]
+        else:
+            self.df = np.zeros(self.dims, dtype=np.int32)
+
+    def search_many(self, queries: Sequence[str], k: int = 10) -> List[List[Tuple[int, float]]]:
+        """
+        Return the top `k` (document ID, cosine score) per query, best first.
+
+        Scores for all queries are accumulated in one (queries x documents)
+        matrix (allocated lazily by the OS, so untouched rows cost nothing),
+        and each query's top k is picked among the documents its terms hit.
+        """
+        results: List[List[Tuple[int, float]]] = []
+        if not len(self.ids):
+            return [[] for _ in queries]
+        scores = np.zeros((len(queries), len(self.ids)), dtype=np.float32)
+        n_docs = max(len(self), 1)
+        for q, query in enumerate(queries):
+            buckets, qtf = np.unique(np.asarray(self._buckets(query), dtype=np.int64), return_counts=True)
+            if not len(buckets):
+                results.append([])
+                continue
+            idf = np.log((1 + n_docs) / (1 + self.df[buckets])) + 1.0
+            query_weights = (1.0 + np.log(qtf)) * idf
+            query_weights /= np.linalg.norm(query_weights)
+
+            row, hit = scores[q], []
+            for bucket, weight in zip(buckets.tolist(), query_weights.tolist()):
+                for segment in self.segments:
+                    rows, weights = segment.postings(bucket)
+                    # A document appears at most once per bucket in a segment
+                    row[rows] += weight * weights
+                    hit.append(rows)
+            candidates = np.unique(np.concatenate(hit)) if hit else np.zeros(0, dtype=np.int32)
+            candidates = candidates[self.alive[candidates]]
+            if len(candidates) > k:
+                candidates = candidates[np.argpartition(-row[candidates], k - 1)[:k]]
+            candidates = candidates[np.argsort(-row[candidates], kind="stable")]
+            results.append([(int(self.ids[r]), float(row[r])) for r in candidates])
+        return results
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        return self.search_many([query], k)[0]
+
+    def save(self, path: str, **meta: Any) -> None:
+        """Write the index (merged) and `meta` values atomically to an .npz file."""
+        self.merge()
+        segment = self.segments[0] if self.segments else _Segment(*(np.zeros(0, dtype=t) for t in
+                                                                   (np.int32, np.int32, np.float32)))
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, dims=self.dims, ids=self.ids, buckets=segment.buckets(), rows=segment.rows,
+                     weights=segment.weights, **{f"meta_{key}": np.asarray(value) for key, value in meta.items()})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Tuple["HashedTfidfIndex", Dict[str, Any]]:
+        with np.load(path) as data:
+            index = cls(dims=int(data["dims"]))
+            index.ids = data["ids"]
+            index.alive = np.ones(len(index.ids), dtype=bool)
+            if len(data["buckets"]):
+                index.segments = [_Segment(data["buckets"], data["rows"], data["weights"])]
+                index.df = np.bincount(data["buckets"], minlength=index.dims).astype(np.int32)
+            meta = {key[len("meta_"):]: data[key].item() for key in data.files if key.startswith("meta_")}
+        return index, meta
+
+FULL_TEXT = """
+    SELECT message_id, channel_id, channel_name, thread_id, author_id, chat_text, created_at
+    FROM silver.chat
+    WHERE search_vector @@ websearch_to_tsquery('english', :query)
+      AND deleted_at IS NULL
+      {channel_filter}
+    ORDER BY created_at DESC
+    LIMIT :limit
+"""
+
+# Every transaction below this has finished, so no change below it can still appear
+SYNC_BOUND = text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text")
+
+CHANGED_MESSAGES = text("""
+    SELECT message_id, chat_text, deleted_at IS NOT NULL AS deleted, change_xid::text AS change_xid
+    FROM silver.chat
+    WHERE (change_xid, message_id) > (CAST(:change_xid AS xid8), :message_id)
+      AND change_xid < CAST(:before_xid AS xid8)
+    ORDER BY change_xid, message_id
+    LIMIT :limit
+""")
+
+MESSAGES_BY_ID = text("""
+    SELECT message_id, channel_id, channel_name, thread_id, author_id, chat_text, created_at
+    FROM silver.chat
+    WHERE message_id = ANY(:ids)
+""")
+
+class ChatSearch:
+    """
+    Search over silver.chat for the bots.
+
+    - `full_text()` uses PostgreSQL full-text search: the `search_vector`
+      column and its GIN index (silver/ddl/create_chat_search.sql)
+    - `similar()` ranks messages by cosine similarity on a local
+      HashedTfidfIndex, so it finds messages that share words with the
+      query without an exact match, CPU-only and offline
+
+    The local index is kept in `index_path` and brought up to date by
+    `sync()`, which only reads messages added, edited or deleted since the
+    last sync: keyset paging on silver.chat's change_xid, up to the oldest
+    transaction still running, so changes still being committed are picked
+    up by the next sync rather than skipped.
+    """
+
+    def __init__(self, engine=None, index_path: str = os.path.join("state", "search_index.npz"),
+                 dims: int = 1 << 20):
+        if engine is None:
+            from config.db_config import engine
+        self.engine = engine
+        self.index_path = index_path
+        # Changes from transactions at or after this ID haven't been indexed
+        self.synced_xid = "0"
+        if os.path.exists(index_path):
+            self.index, meta = HashedTfidfIndex.load(index_path)
+            # Indexes saved with an updated_at watermark are re-synced in full
+            self.synced_xid = str(meta.get("synced_xid", "0"))
+        else:
+            self.index = HashedTfidfIndex(dims=dims)
+
+    def sync(self, batch_size: int = 50_000) -> int:
+        """Index the messages changed since the last sync and save the index; returns how many."""
+        start = time.perf_counter()
+        changed = 0
+        with self.engine.connect() as conn:
+            before_xid = conn.execute(SYNC_BOUND).scalar()
+        position = (self.synced_xid, 0)
+        while True:
+            with self.engine.connect() as conn:
+                rows = conn.execute(CHANGED_MESSAGES, {
+                    "change_xid": position[0], "message_id": position[1],
+                    "before_xid": before_xid, "limit": batch_size,
+                }).all()
+            if not rows:
+                break
+            self.index.remove(row.message_id for row in rows if row.deleted)
+            live = [row for row in rows if not row.deleted]
+            self.index.add([row.message_id for row in live], [row.chat_text for row in live])
+            position = (rows[-1].change_xid, rows[-1].message_id)
+            changed += len(rows)
+
+        # Without changes there's nothing new to save; the next sync just
+        # rescans an empty range
+        self.synced_xid = before_xid
+        if changed:
+            self.index.save(self.index_path, synced_xid=self.synced_xid)
+        print(f"✅ Search index: {changed} changed messages indexed, {len(self.index)} total "
+              f"({time.perf_counter() - start:.2f}s)")
+        return changed
+
+    def full_text(self, query: str, limit: int = 20, channel_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Newest messages matching a web-search style query ("quoted phrases", -exclusions, or)."""
+        params = {"query": query, "limit": limit}
+        channel_filter = ""
+        if channel_id is not None:
+            channel_filter = "AND channel_id = :channel_id"
+            params["channel_id"] = channel_id
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(FULL_TEXT.format(channel_filter=channel_filter)), params)
+            return [dict(row._mapping) for row in rows]
+
+    def similar(self, query: str, k: int = 10) -> List[Dict[str, Any]]:
+        """The `k` messages most similar to `query`, best first, each with its `score`."""
+        hits = self.index.search(query, k)
+        if not hits:
+            return []
+        with self.engine.connect() as conn:
+            rows = {row.message_id: dict(row._mapping)
+                    for row in conn.execute(MESSAGES_BY_ID, {"ids": [message_id for message_id, _ in hits]})}
+        return [dict(rows[message_id], score=score) for message_id, score in hits if message_id in rows]
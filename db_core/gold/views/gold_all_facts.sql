@@ -1,4 +1,17 @@
-CREATE OR REPLACE VIEW gold.all_facts AS
+-- Replaces the plain view of the same name (or an older definition), so bot
+-- queries no longer re-join and sort silver.fact and silver.user every time;
+-- created empty and populated after the deploy, then refreshed after deploys
+-- whose silver loads changed either table
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_views WHERE schemaname = 'gold' AND viewname = 'all_facts') THEN
+        DROP VIEW gold.all_facts;
+    END IF;
+END $$;
+
+DROP MATERIALIZED VIEW IF EXISTS gold.all_facts;
+
+CREATE MATERIALIZED VIEW gold.all_facts AS
 SELECT
     f.fact_id,
     u.name AS user_name,
@@ -7,4 +20,12 @@ SELECT
     f.created_at
 FROM silver.fact f
 JOIN silver.user u ON f.user_id = u.id
-ORDER BY f.created_at DESC;
+ORDER BY f.created_at DESC
+WITH NO DATA;
+
+-- Required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX all_facts_fact_id_key ON gold.all_facts (fact_id);
+
+-- Newest facts first, overall and per user
+CREATE INDEX all_facts_created_at_idx ON gold.all_facts (created_at DESC);
+CREATE INDEX all_facts_discord_id_created_at_idx ON gold.all_facts (discord_id, created_at DESC);
@@ -1,6 +1,18 @@
 CREATE SCHEMA IF NOT EXISTS gold;
 
-CREATE OR REPLACE VIEW gold.users_base AS
+-- Replaces the plain view of the same name (or an older definition); created
+-- empty and populated after the deploy, then refreshed after deploys whose
+-- silver loads changed silver.user (see manifests/gold_order.yml)
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_views WHERE schemaname = 'gold' AND viewname = 'users_base') THEN
+        DROP VIEW gold.users_base;
+    END IF;
+END $$;
+
+DROP MATERIALIZED VIEW IF EXISTS gold.users_base;
+
+CREATE MATERIALIZED VIEW gold.users_base AS
 SELECT
     id AS user_id,
     name,
@@ -9,4 +21,10 @@ SELECT
     discord_id,
     created_at,
     updated_at
-FROM silver.user;
+FROM silver.user
+WITH NO DATA;
+
+-- Required by REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX users_base_user_id_key ON gold.users_base (user_id);
+
+CREATE INDEX users_base_discord_id_idx ON gold.users_base (discord_id);
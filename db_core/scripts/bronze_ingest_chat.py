@@ -0,0 +1,13 @@
+from utils.ingestor import BronzeIngestor
+from utils.transform import enrich_messages
+
+if __name__ == "__main__":
+    ingestor = BronzeIngestor(
+        csv_path="csv_files/chat_history.csv",
+        table_name="chat_raw",
+        schema="bronze",
+        stream=True,                # read and load the CSV in chunks
+        merge_key="message_id",     # upsert instead of truncate + reload
+        transform=enrich_messages   # add mention, link and emoji columns per chunk
+    )
+    ingestor.run()
@@ -1,13 +1,27 @@
-from utils.deploy import deploy_layer
+import argparse
+from utils.deploy import deploy_layers
+from utils.metrics import metrics
 
 def main():
+    parser = argparse.ArgumentParser(description="Deploy the Bronze, Silver and Gold layers.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="scripts run in parallel (default: DEPLOY_WORKERS or 4)")
+    parser.add_argument("--force", action="store_true",
+                        help="run every script, even those unchanged since the last deploy")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="print which scripts would run or be skipped, without running them")
+    args = parser.parse_args()
+
     print("Starting full deployment (Bronze -> Silver -> Gold)...\n")
     
-    deploy_layer("bronze")
-    deploy_layer("silver")
-    deploy_layer("gold")
+    try:
+        deploy_layers(["bronze", "silver", "gold"], max_workers=args.workers,
+                      force=args.force, dry_run=args.dry_run)
+    finally:
+        metrics.flush()
 
-    print("🎉 All layers deployed successfully.")
+    if not args.dry_run:
+        print("🎉 All layers deployed successfully.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,35 @@
+import asyncio
+import argparse
+from utils.ingestor import BronzeIngestor
+from utils.multi_guild import MultiGuildExtractor, guild_ids_from_env
+from utils.transform import enrich_messages
+
+async def main():
+    """Export several guilds' chat history concurrently, optionally loading each into bronze."""
+    parser = argparse.ArgumentParser(description="Export the chat history of several guilds at once.")
+    parser.add_argument("--guilds", type=lambda value: [int(g) for g in value.split(",") if g],
+                        help="comma separated guild IDs (default: EXTRACT_GUILD_IDS, or TEST_SERVER_ID)")
+    parser.add_argument("--max-guilds", type=int,
+                        help="guilds exported at the same time (default: EXTRACT_GUILD_CONCURRENCY, or all)")
+    parser.add_argument("--backend", choices=("gateway", "rest"),
+                        help="how to reach Discord (default: EXTRACT_BACKEND, or gateway)")
+    parser.add_argument("--ingest", action="store_true",
+                        help="merge each exported guild into bronze.chat_raw afterwards")
+    args = parser.parse_args()
+
+    extractor = MultiGuildExtractor(args.guilds or guild_ids_from_env(), max_guilds=args.max_guilds,
+                                    backend=args.backend)
+    results = await extractor.run()
+
+    if args.ingest:
+        # Message IDs are unique across guilds and every row carries its guild_id,
+        # so every guild merges into the same table
+        for guild_id, path in results.items():
+            if path is None:
+                continue
+            print(f"📥 Loading guild {guild_id} from {path}")
+            BronzeIngestor(path, "chat_raw", stream=True, merge_key="message_id",
+                           transform=enrich_messages).run()
+
+if __name__ == "__main__":
+    asyncio.run(main())
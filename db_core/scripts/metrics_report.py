@@ -0,0 +1,52 @@
+import os
+import json
+import argparse
+
+def load_summaries(path):
+    """Return every run's summary event in the metrics log, oldest first."""
+    summaries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("type") == "event" and record.get("name") == "summary":
+                summaries.append(record)
+    return summaries
+
+def series(entry, value_keys):
+    """The name and labels that identify a counter or timing across runs."""
+    labels = ", ".join(f"{key}={value}" for key, value in entry.items() if key not in value_keys and key != "name")
+    return f"{entry['name']}{{{labels}}}" if labels else entry["name"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the last pipeline run's metrics with the run before it.")
+    parser.add_argument("--log", default=os.getenv("METRICS_LOG", os.path.join("state", "metrics.jsonl")),
+                        help="metrics log (default: METRICS_LOG or state/metrics.jsonl)")
+    parser.add_argument("--top", type=int, default=15, help="timings to show, slowest first")
+    args = parser.parse_args()
+
+    summaries = load_summaries(args.log)
+    if not summaries:
+        print(f"❌ No runs recorded in {args.log}")
+        return
+    current, previous = summaries[-1], summaries[-2] if len(summaries) > 1 else None
+
+    timing_keys = {"count", "seconds", "max_seconds"}
+    before = {series(t, timing_keys): t["seconds"] for t in previous["timings"]} if previous else {}
+    print(f"⏱️ Slowest timings of run {current['trace_id']}" + (" (vs previous run)" if previous else "") + ":")
+    for timing in sorted(current["timings"], key=lambda t: t["seconds"], reverse=True)[:args.top]:
+        name = series(timing, timing_keys)
+        change = ""
+        if before.get(name):
+            change = f"  {(timing['seconds'] - before[name]) / before[name]:+7.1%}"
+        print(f"   {timing['seconds']:9.2f}s  x{timing['count']:<6} max {timing['max_seconds']:7.2f}s{change}  {name}")
+
+    counter_keys = {"value"}
+    before = {series(c, counter_keys): c["value"] for c in previous["counters"]} if previous else {}
+    print("📊 Counters:")
+    for counter in current["counters"]:
+        name = series(counter, counter_keys)
+        change = f"  (was {before[name]:g})" if name in before and before[name] != counter["value"] else ""
+        print(f"   {counter['value']:>12g}  {name}{change}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import asyncio
+import argparse
+from utils.extractor import DiscordExtractor
+from utils.pipeline import Pipeline, ChannelDiscoveryStage, HistoryExportStage, default_stages
+
+async def main():
+    """Run the whole weekly pipeline in this process."""
+    parser = argparse.ArgumentParser(description="Run the Discord -> Bronze -> Silver -> Gold pipeline.")
+    parser.add_argument("--extract-only", action="store_true",
+                        help="only discover channels and export history (no database stages)")
+    parser.add_argument("--backend", choices=("gateway", "rest"),
+                        help="how to reach Discord (default: EXTRACT_BACKEND, or gateway)")
+    args = parser.parse_args()
+
+    stages = [ChannelDiscoveryStage(), HistoryExportStage()] if args.extract_only else default_stages()
+    try:
+        await Pipeline(stages, DiscordExtractor(backend=args.backend)).run()
+    except Exception as e:
+        print(f"❌ Error running pipeline: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,7 @@
+#!/bin/bash
+
+# Get the absolute path of the project root
+PROJECT_ROOT=$(cd "$(dirname "$0")/.." && pwd)
+
+# Run the whole pipeline in one process with the correct Python path
+cd "$PROJECT_ROOT" && PYTHONPATH="$PROJECT_ROOT" uv run scripts/run_pipeline.py "$@"
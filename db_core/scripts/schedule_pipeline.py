@@ -0,0 +1,23 @@
+import asyncio
+import argparse
+from utils.extractor import DiscordExtractor
+from utils.scheduler import Scheduler
+
+async def main():
+    """Sync each channel on its own cadence, one pipeline run at a time."""
+    parser = argparse.ArgumentParser(description="Run the pipeline whenever channels fall due for a sync.")
+    parser.add_argument("--once", action="store_true",
+                        help="sync the channels due now, then exit (e.g. from cron)")
+    parser.add_argument("--backend", choices=("gateway", "rest"),
+                        help="how to reach Discord (default: EXTRACT_BACKEND, or gateway)")
+    args = parser.parse_args()
+
+    # Per-channel cadences only make sense if each sync picks up where the last one stopped
+    scheduler = Scheduler(lambda: DiscordExtractor(backend=args.backend, incremental=True))
+    if args.once:
+        await scheduler.run_once()
+    else:
+        await scheduler.serve()
+
+if __name__ == "__main__":
+    asyncio.run(main())
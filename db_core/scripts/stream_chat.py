@@ -0,0 +1,108 @@
+import asyncio
+import argparse
+import discord
+from utils.extractor import DiscordExtractor
+from utils.records import MessageRecord, REPLY_MESSAGE_TYPE
+from utils.stream_ingestor import ChatEvent, StreamIngestor
+
+async def edit_event(client, payload):
+    """
+    Build an edit event from a raw edit payload, or None if the text didn't change.
+
+    Raw events fire even for messages that aren't in discord.py's cache, but
+    only carry the API's message data, so names are looked up from the
+    client's channel cache, fetching channels (usually threads) it doesn't
+    hold. If that fetch fails the names are left NULL, and the bronze merge
+    keeps the ones already stored (see BronzeChatWriter).
+    """
+    data = payload.data
+    if "content" not in data or "author" not in data:
+        # Embed-only updates don't include the message text
+        return None
+
+    channel, thread = client.get_channel(payload.channel_id), None
+    if channel is None:
+        try:
+            channel = await client.fetch_channel(payload.channel_id)
+        except discord.HTTPException as e:
+            print(f"⚠️ Couldn't fetch channel {payload.channel_id} for an edit: {e}")
+    if getattr(channel, "parent_id", None) is not None:
+        # A thread, whose parent may be missing from the cache too
+        channel, thread = channel.parent, channel
+    reference = data.get("message_reference") if data.get("type") == REPLY_MESSAGE_TYPE else None
+    record = MessageRecord(
+        channel.name if channel else None,
+        channel.id if channel else thread.parent_id if thread else payload.channel_id,
+        thread.name if thread else None,
+        thread.id if thread else None,
+        payload.message_id,
+        data["author"]["username"],
+        data["content"],
+        payload.guild_id,
+        int(reference["message_id"]) if reference and reference.get("message_id") else None,
+    )
+    return ChatEvent("edit", payload.message_id, record)
+
+async def main():
+    """Stream the guild's message creates, edits and deletes into bronze.chat_raw until stopped."""
+    parser = argparse.ArgumentParser(description="Stream Discord chat events into bronze.chat_raw.")
+    parser.add_argument("--batch-size", type=int, default=500, help="events per database write")
+    parser.add_argument("--flush-interval", type=float, default=1.0,
+                        help="seconds to wait for a batch to fill before writing it")
+    parser.add_argument("--max-queue", type=int, default=10_000,
+                        help="events held in memory before spilling to disk")
+    args = parser.parse_args()
+
+    extractor = DiscordExtractor()
+    client = extractor.create_client()
+    ingestor = StreamIngestor(
+        batch_size=args.batch_size,
+        flush_interval=args.flush_interval,
+        max_queue=args.max_queue
+    )
+
+    def in_guild(guild_id):
+        return guild_id == extractor.guild_id
+
+    @client.event
+    async def on_ready():
+        await ingestor.start()
+        print(f"✅ Streaming chat events from guild {extractor.guild_id} as {client.user}")
+
+    @client.event
+    async def on_message(message):
+        if message.guild is None or not in_guild(message.guild.id):
+            return
+        ingestor.submit(ChatEvent.from_message("create", message))
+
+    @client.event
+    async def on_raw_message_edit(payload):
+        if not in_guild(payload.guild_id):
+            return
+        event = await edit_event(client, payload)
+        if event is not None:
+            ingestor.submit(event)
+
+    @client.event
+    async def on_raw_message_delete(payload):
+        if in_guild(payload.guild_id):
+            ingestor.submit(ChatEvent("delete", payload.message_id))
+
+    @client.event
+    async def on_raw_bulk_message_delete(payload):
+        if in_guild(payload.guild_id):
+            for message_id in payload.message_ids:
+                ingestor.submit(ChatEvent("delete", message_id))
+
+    try:
+        await client.start(extractor.token)
+    finally:
+        # Write (or spill) whatever is still queued before exiting
+        await ingestor.stop()
+        await client.close()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("👋 Stopped streaming")
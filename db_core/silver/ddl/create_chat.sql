@@ -1,11 +1,86 @@
+-- Tables from before silver.chat tracked message IDs only held placeholder
+-- rows (with INT channel IDs, which overflow on snowflakes); keep them aside
+-- as silver.chat_legacy so the new model can take the name
+DO $$
+BEGIN
+    IF to_regclass('silver.chat') IS NOT NULL AND NOT EXISTS (
+        SELECT 1
+        FROM information_schema.columns
+        WHERE table_schema = 'silver' AND table_name = 'chat' AND column_name = 'message_id'
+    ) THEN
+        ALTER TABLE silver.chat RENAME TO chat_legacy;
+        ALTER TABLE silver.chat_legacy RENAME CONSTRAINT chat_pkey TO chat_legacy_pkey;
+    END IF;
+END $$;
+
+-- One row per message author, keyed by their Discord username
+CREATE TABLE IF NOT EXISTS silver.chat_author (
+    author_id SERIAL PRIMARY KEY,
+    author_name TEXT NOT NULL,
+    first_seen_at TIMESTAMPTZ,
+    last_seen_at TIMESTAMPTZ,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS chat_author_name_key ON silver.chat_author (author_name);
+
+-- One row per thread, with the channel it was started in
+CREATE TABLE IF NOT EXISTS silver.chat_thread (
+    thread_id BIGINT PRIMARY KEY,
+    channel_id BIGINT NOT NULL,
+    thread_name TEXT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS chat_thread_channel_id_idx ON silver.chat_thread (channel_id);
+
+-- One row per Discord message. Thread messages carry their parent channel's
+-- channel_id as well as their thread_id. Deleted messages are kept, with
+-- deleted_at set.
 CREATE TABLE IF NOT EXISTS silver.chat (
-    id SERIAL PRIMARY KEY,
+    message_id BIGINT PRIMARY KEY,
+    channel_id BIGINT NOT NULL,
     channel_name TEXT,
-    channel_id INT,
-    thread_name TEXT, 
-    thread_id INT, 
+    thread_id BIGINT REFERENCES silver.chat_thread (thread_id),
+    author_id INT REFERENCES silver.chat_author (author_id),
     chat_text TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMPTZ NOT NULL,
+    deleted_at TIMESTAMPTZ,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- "Last N messages in channel X" (and time ranges within a channel)
+CREATE INDEX IF NOT EXISTS chat_channel_created_at_idx ON silver.chat (channel_id, created_at);
+
+-- The same within a thread
+CREATE INDEX IF NOT EXISTS chat_thread_created_at_idx ON silver.chat (thread_id, created_at)
+    WHERE thread_id IS NOT NULL;
+
+-- Messages by author
+CREATE INDEX IF NOT EXISTS chat_author_id_idx ON silver.chat (author_id);
+
+-- ID of the transaction that last changed each message, so readers like
+-- ChatSearch.sync() can follow changes in commit order (updated_at is when
+-- the changing transaction started, not when it committed)
+ALTER TABLE silver.chat ADD COLUMN IF NOT EXISTS change_xid xid8 DEFAULT pg_current_xact_id();
+
+-- Derived at bronze load (utils.transform); NULL for messages loaded before
+ALTER TABLE silver.chat ADD COLUMN IF NOT EXISTS message_length INT;
+ALTER TABLE silver.chat ADD COLUMN IF NOT EXISTS mentioned_user_ids BIGINT[];
+ALTER TABLE silver.chat ADD COLUMN IF NOT EXISTS mention_count INT;
+ALTER TABLE silver.chat ADD COLUMN IF NOT EXISTS link_count INT;
+ALTER TABLE silver.chat ADD COLUMN IF NOT EXISTS emoji_count INT;
+ALTER TABLE silver.chat ADD COLUMN IF NOT EXISTS is_reply BOOLEAN;
+
+-- Messages mentioning a user: WHERE mentioned_user_ids @> ARRAY[<user id>]::BIGINT[]
+CREATE INDEX IF NOT EXISTS chat_mentioned_user_ids_idx ON silver.chat USING GIN (mentioned_user_ids);
+
+-- Guild the message was posted in (NULL for messages exported before it was
+-- recorded), and "last N messages in guild X"
+ALTER TABLE silver.chat ADD COLUMN IF NOT EXISTS guild_id BIGINT;
+CREATE INDEX IF NOT EXISTS chat_guild_created_at_idx ON silver.chat (guild_id, created_at);
+
+-- The message this one replies to; no foreign key, since the original may
+-- predate the export or be in a channel that isn't exported
+ALTER TABLE silver.chat ADD COLUMN IF NOT EXISTS reply_to_id BIGINT;
+CREATE INDEX IF NOT EXISTS chat_reply_to_id_idx ON silver.chat (reply_to_id) WHERE reply_to_id IS NOT NULL;
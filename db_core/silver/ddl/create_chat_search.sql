@@ -0,0 +1,13 @@
+-- Full-text search over message text, for ChatSearch.full_text()
+-- (database/search.py). The vector is a generated column, so every insert
+-- and edit keeps it current without a trigger.
+ALTER TABLE silver.chat ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector('english', COALESCE(chat_text, ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS chat_search_vector_idx ON silver.chat USING GIN (search_vector)
+    WHERE deleted_at IS NULL;
+
+-- Messages changed since the local similarity index's watermark, read by
+-- ChatSearch.sync() with keyset paging in commit order
+DROP INDEX IF EXISTS silver.chat_updated_at_idx;
+CREATE INDEX IF NOT EXISTS chat_change_xid_idx ON silver.chat (change_xid, message_id);
@@ -0,0 +1,21 @@
+-- How far each silver transformation has read its bronze source, so every
+-- load only reads bronze rows that are new or changed since the last run
+CREATE TABLE IF NOT EXISTS silver.load_watermark (
+    source TEXT PRIMARY KEY,
+    loaded_through TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Loads are watermarked by transaction ID, in commit order. A timestamp
+-- watermark loses rows: ingestion_timestamp is when the writing transaction
+-- started, so a streamed bronze load still open while a silver load runs
+-- commits rows older than the watermark that load advanced to.
+--
+-- Instead each load reads the bronze rows whose ingest_xid is in
+-- [loaded_from_xid, xmin), where xmin is pg_snapshot_xmin() of its snapshot:
+-- every transaction below xmin has finished, so no row in that range can
+-- still appear later. The next load starts at that xmin. Rows written by
+-- transactions still open are left for the next load, never skipped.
+-- loaded_through is kept as the newest ingestion_timestamp loaded, to see
+-- how far behind silver is.
+ALTER TABLE silver.load_watermark ADD COLUMN IF NOT EXISTS loaded_from_xid xid8;
@@ -6,4 +6,7 @@ CREATE TABLE IF NOT EXISTS silver.user (
     discord_id TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+);
+
+-- Upsert key for load_user_from_bronze.sql
+CREATE UNIQUE INDEX IF NOT EXISTS user_discord_id_key ON silver.user (discord_id);
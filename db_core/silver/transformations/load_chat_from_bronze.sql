@@ -0,0 +1,119 @@
+-- Merge messages ingested, edited or deleted since the last run into the
+-- silver chat model; the latest bronze row per message_id wins. Rows are
+-- picked by the transaction that wrote them, up to the oldest transaction
+-- still running, so a stream batch or bronze load that is still open is
+-- loaded next time instead of skipped (see silver/ddl/create_load_watermark.sql)
+CREATE TEMP TABLE chat_load_bounds ON COMMIT DROP AS
+SELECT
+    COALESCE(
+        (SELECT loaded_from_xid FROM silver.load_watermark WHERE source = 'bronze.chat_raw'),
+        '0'::xid8
+    ) AS loaded_from_xid,
+    pg_snapshot_xmin(pg_current_snapshot()) AS loaded_before_xid;
+
+CREATE TEMP TABLE chat_changes ON COMMIT DROP AS
+SELECT DISTINCT ON (message_id)
+    message_id,
+    guild_id,
+    channel_id,
+    channel_name,
+    thread_id,
+    thread_name,
+    author,
+    chat_text,
+    -- Rows ingested before bronze had created_at: derive it from the snowflake
+    COALESCE(created_at, to_timestamp(((message_id >> 22) + 1420070400000) / 1000.0)) AS created_at,
+    deleted_at,
+    message_length,
+    mentioned_user_ids,
+    mention_count,
+    link_count,
+    emoji_count,
+    is_reply,
+    reply_to_id,
+    ingestion_timestamp
+FROM bronze.chat_raw, chat_load_bounds b
+WHERE message_id IS NOT NULL
+  AND channel_id IS NOT NULL
+  AND ingest_xid >= b.loaded_from_xid
+  AND ingest_xid < b.loaded_before_xid
+ORDER BY message_id, ingestion_timestamp DESC;
+
+INSERT INTO silver.chat_author (author_name, first_seen_at, last_seen_at)
+SELECT author, MIN(created_at), MAX(created_at)
+FROM chat_changes
+WHERE author IS NOT NULL
+GROUP BY author
+ON CONFLICT (author_name) DO UPDATE SET
+    first_seen_at = LEAST(silver.chat_author.first_seen_at, EXCLUDED.first_seen_at),
+    last_seen_at = GREATEST(silver.chat_author.last_seen_at, EXCLUDED.last_seen_at),
+    updated_at = CURRENT_TIMESTAMP;
+
+-- A thread's newest message carries its current name
+INSERT INTO silver.chat_thread (thread_id, channel_id, thread_name)
+SELECT DISTINCT ON (thread_id)
+    thread_id,
+    channel_id,
+    thread_name
+FROM chat_changes
+WHERE thread_id IS NOT NULL
+ORDER BY thread_id, message_id DESC
+ON CONFLICT (thread_id) DO UPDATE SET
+    channel_id = EXCLUDED.channel_id,
+    thread_name = EXCLUDED.thread_name,
+    updated_at = CURRENT_TIMESTAMP;
+
+INSERT INTO silver.chat (message_id, guild_id, channel_id, channel_name, thread_id, author_id,
+                         chat_text, created_at, deleted_at, message_length, mentioned_user_ids,
+                         mention_count, link_count, emoji_count, is_reply, reply_to_id)
+SELECT
+    c.message_id,
+    c.guild_id,
+    c.channel_id,
+    c.channel_name,
+    c.thread_id,
+    a.author_id,
+    c.chat_text,
+    c.created_at,
+    c.deleted_at,
+    c.message_length,
+    c.mentioned_user_ids,
+    c.mention_count,
+    c.link_count,
+    c.emoji_count,
+    c.is_reply,
+    c.reply_to_id
+FROM chat_changes c
+LEFT JOIN silver.chat_author a ON a.author_name = c.author
+ON CONFLICT (message_id) DO UPDATE SET
+    guild_id = COALESCE(EXCLUDED.guild_id, silver.chat.guild_id),
+    channel_id = EXCLUDED.channel_id,
+    channel_name = EXCLUDED.channel_name,
+    thread_id = EXCLUDED.thread_id,
+    author_id = EXCLUDED.author_id,
+    chat_text = EXCLUDED.chat_text,
+    deleted_at = EXCLUDED.deleted_at,
+    message_length = EXCLUDED.message_length,
+    mentioned_user_ids = EXCLUDED.mentioned_user_ids,
+    mention_count = EXCLUDED.mention_count,
+    link_count = EXCLUDED.link_count,
+    emoji_count = EXCLUDED.emoji_count,
+    is_reply = EXCLUDED.is_reply,
+    reply_to_id = EXCLUDED.reply_to_id,
+    updated_at = CURRENT_TIMESTAMP,
+    change_xid = pg_current_xact_id();
+
+-- Advance to the bound this load read up to, even if it found nothing new
+INSERT INTO silver.load_watermark (source, loaded_from_xid, loaded_through)
+SELECT
+    'bronze.chat_raw',
+    b.loaded_before_xid,
+    COALESCE((SELECT MAX(ingestion_timestamp) FROM chat_changes), '-infinity')
+FROM chat_load_bounds b
+ON CONFLICT (source) DO UPDATE SET
+    loaded_from_xid = EXCLUDED.loaded_from_xid,
+    loaded_through = GREATEST(silver.load_watermark.loaded_through, EXCLUDED.loaded_through),
+    updated_at = CURRENT_TIMESTAMP;
+
+-- Keep the planner's view of the new rows current for bot queries
+ANALYZE silver.chat;
@@ -1,7 +0,0 @@
-TRUNCATE silver.chat;
-
-INSERT INTO silver.chat (channel_name, channel_id, chat_text)
-VALUES
-    ('general', 5, 'hello world'),
-    ('executives', 10, 'bruh')
-;
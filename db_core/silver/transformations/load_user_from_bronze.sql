@@ -1,9 +1,44 @@
-TRUNCATE TABLE silver.user;
+-- Merge users written to bronze since the last run; the latest bronze row per
+-- discord_id wins. Rows are picked by the transaction that wrote them, up to
+-- the oldest transaction still running (see silver/ddl/create_load_watermark.sql)
+CREATE TEMP TABLE user_load_bounds ON COMMIT DROP AS
+SELECT
+    COALESCE(
+        (SELECT loaded_from_xid FROM silver.load_watermark WHERE source = 'bronze.user_raw'),
+        '0'::xid8
+    ) AS loaded_from_xid,
+    pg_snapshot_xmin(pg_current_snapshot()) AS loaded_before_xid;
+
+CREATE TEMP TABLE user_changes ON COMMIT DROP AS
+SELECT DISTINCT ON (u.discord_id)
+    u.name,
+    u.role,
+    u.notion_id,
+    u.discord_id,
+    u.ingestion_timestamp
+FROM bronze.user_raw u, user_load_bounds b
+WHERE u.discord_id IS NOT NULL
+  AND u.ingest_xid >= b.loaded_from_xid
+  AND u.ingest_xid < b.loaded_before_xid
+ORDER BY u.discord_id, u.ingestion_timestamp DESC;
 
 INSERT INTO silver.user (name, role, notion_id, discord_id)
+SELECT name, role, notion_id, discord_id
+FROM user_changes
+ON CONFLICT (discord_id) DO UPDATE SET
+    name = EXCLUDED.name,
+    role = EXCLUDED.role,
+    notion_id = EXCLUDED.notion_id,
+    updated_at = CURRENT_TIMESTAMP;
+
+-- Advance to the bound this load read up to, even if it found nothing new
+INSERT INTO silver.load_watermark (source, loaded_from_xid, loaded_through)
 SELECT
-    name,
-    role,
-    notion_id,
-    discord_id
-FROM bronze.user_raw;
+    'bronze.user_raw',
+    b.loaded_before_xid,
+    COALESCE((SELECT MAX(ingestion_timestamp) FROM user_changes), '-infinity')
+FROM user_load_bounds b
+ON CONFLICT (source) DO UPDATE SET
+    loaded_from_xid = EXCLUDED.loaded_from_xid,
+    loaded_through = GREATEST(silver.load_watermark.loaded_through, EXCLUDED.loaded_through),
+    updated_at = CURRENT_TIMESTAMP;
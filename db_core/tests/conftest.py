@@ -0,0 +1,7 @@
+import os
+
+# Modules under test read these on import or init; nothing here connects
+# to Discord or a real database, or writes metrics to state/
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("DARCY_KEY", "offline")
+os.environ.setdefault("METRICS_LOG", "")
@@ -0,0 +1,103 @@
+"""
+Deployment planning: scripts run after what they depend on, and only the
+ones that changed (or depend on a change) run again.
+"""
+
+import os
+
+import pytest
+
+from utils.runner import build_graph, file_hash, plan_deployment, topological_order
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MANIFESTS = [os.path.join("manifests", f"{layer}_order.yml") for layer in ("bronze", "silver", "gold")]
+
+
+@pytest.fixture
+def scripts(tmp_path):
+    """A small graph: a schema, two tables on it, and a view over both."""
+    paths = {}
+    for name in ("schema", "users", "messages", "view"):
+        paths[name] = str(tmp_path / f"{name}.sql")
+        with open(paths[name], "w") as f:
+            f.write(f"-- {name}\n")
+    graph = {
+        paths["schema"]: set(),
+        paths["users"]: {paths["schema"]},
+        paths["messages"]: {paths["schema"]},
+        paths["view"]: {paths["users"], paths["messages"]},
+    }
+    return paths, graph
+
+
+def ledger_of(graph):
+    return {path: file_hash(path) for path in graph}
+
+
+def test_shipped_manifests_order_dependencies_first(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    graph, _ = build_graph(MANIFESTS)
+
+    position = {path: i for i, path in enumerate(plan_deployment(graph))}
+    for path, depends_on in graph.items():
+        assert all(position[dependency] < position[path] for dependency in depends_on), path
+
+
+def test_first_deploy_runs_everything_in_order(scripts):
+    paths, graph = scripts
+    plan = plan_deployment(graph)
+
+    assert list(plan) == topological_order(graph)
+    assert list(plan)[0] == paths["schema"] and list(plan)[-1] == paths["view"]
+    assert set(plan.values()) == {"new"}
+
+
+def test_unchanged_scripts_are_skipped(scripts):
+    _, graph = scripts
+    plan = plan_deployment(graph, ledger=ledger_of(graph))
+
+    assert set(plan.values()) == {None}
+
+
+def test_change_reruns_dependents_only(scripts):
+    paths, graph = scripts
+    ledger = ledger_of(graph)
+    with open(paths["users"], "a") as f:
+        f.write("-- add a column\n")
+
+    plan = plan_deployment(graph, ledger=ledger)
+
+    assert plan[paths["users"]] == "changed"
+    assert plan[paths["view"]] == "dependency changed"
+    assert plan[paths["schema"]] is None
+    assert plan[paths["messages"]] is None
+
+
+def test_always_run_does_not_cascade(scripts):
+    paths, graph = scripts
+    plan = plan_deployment(graph, always_run={paths["messages"]}, ledger=ledger_of(graph))
+
+    assert plan[paths["messages"]] == "always run"
+    assert plan[paths["view"]] is None
+
+
+def test_unannotated_manifest_keeps_list_order(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in ("a.sql", "b.sql", "c.sql"):
+        (tmp_path / name).write_text(f"-- {name}\n")
+    (tmp_path / "first.yml").write_text("- a.sql\n")
+    (tmp_path / "second.yml").write_text("- b.sql\n- c.sql\n")
+
+    graph, _ = build_graph(["first.yml", "second.yml"])
+
+    assert graph == {"a.sql": set(), "b.sql": {"a.sql"}, "c.sql": {"b.sql"}}
+    assert list(plan_deployment(graph)) == ["a.sql", "b.sql", "c.sql"]
+
+
+def test_unknown_dependency_is_an_error(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.sql").write_text("-- a\n")
+    (tmp_path / "layer.yml").write_text("- path: a.sql\n  depends_on: [missing.sql]\n")
+
+    with pytest.raises(ValueError, match="missing.sql"):
+        build_graph(["layer.yml"])
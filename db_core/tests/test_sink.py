@@ -0,0 +1,78 @@
+"""
+A retried or resumed channel must continue after the newest message it
+already wrote, so a failed fetch never duplicates or loses rows.
+"""
+
+import asyncio
+
+import pandas as pd
+import pytest
+
+from benchmarks.fake_discord import FakeHTTP, build_guild
+from utils.extractor import DiscordExtractor
+
+
+def fail_once(source, after_messages):
+    """Make `source.history()` raise once, after yielding `after_messages` messages."""
+    history = source.history
+    calls = 0
+
+    async def flaky_history(*args, **kwargs):
+        nonlocal calls
+        calls += 1
+        yielded = 0
+        async for msg in history(*args, **kwargs):
+            if calls == 1 and yielded == after_messages:
+                raise ConnectionResetError("connection lost mid-history")
+            yielded += 1
+            yield msg
+
+    source.history = flaky_history
+
+
+def read_back(path):
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_feather(path)
+
+
+@pytest.mark.parametrize("output_format", ["csv", "parquet", "arrow"])
+def test_retried_unit_writes_no_duplicates(tmp_path, monkeypatch, output_format):
+    if output_format != "csv":
+        pytest.importorskip("pyarrow")
+    monkeypatch.setattr(DiscordExtractor, "RETRY_BASE", 0.0)
+
+    guild = build_guild(FakeHTTP(latency=0, bucket_limit=1000, global_limit=1000), channel_sizes=[2500])
+    fail_once(guild.text_channels[0], after_messages=1500)
+    extractor = DiscordExtractor(
+        incremental=False, output_format=output_format, max_retries=1, guild_id=guild.id,
+        output_dir=str(tmp_path / "out"), state_dir=str(tmp_path / "state"),
+    )
+
+    path = asyncio.run(extractor.export_guild_history(guild))
+
+    df = read_back(path)
+    assert len(df) == 2500
+    assert df["message_id"].is_unique
+
+
+def test_failed_csv_export_resumes_from_journal(tmp_path, monkeypatch):
+    monkeypatch.setattr(DiscordExtractor, "RETRY_BASE", 0.0)
+    guild = build_guild(FakeHTTP(latency=0, bucket_limit=1000, global_limit=1000), channel_sizes=[2500, 300])
+    options = dict(incremental=False, output_format="csv", max_retries=0, guild_id=guild.id,
+                   output_dir=str(tmp_path / "out"), state_dir=str(tmp_path / "state"))
+
+    # The first run loses the large channel after its first batch
+    fail_once(guild.text_channels[0], after_messages=1500)
+    assert asyncio.run(DiscordExtractor(**options).export_guild_history(guild)) is None
+
+    # The second run skips the finished channel and fetches only the rest
+    extractor = DiscordExtractor(**options)
+    path = asyncio.run(extractor.export_guild_history(guild))
+    assert [extractor.exported_counts[channel.id] for channel in guild.text_channels] == [1500, 0]
+
+    df = read_back(path)
+    assert len(df) == 2800
+    assert df["message_id"].is_unique
@@ -0,0 +1,62 @@
+"""
+enrich_messages derives the same columns from a chunk as it would from each
+message on its own.
+"""
+
+import pandas as pd
+
+from utils.transform import ENRICHED_FIELDS, enrich_messages
+
+
+def values(column):
+    return column.astype(object).where(column.notna(), None).tolist()
+
+
+def messages(**columns):
+    frame = {
+        "author": ["Alice#1234", "  bob#0 ", "Carol", "dave"],
+        "chat_text": [
+            "<@1> hi <@!2>, and <@1> again https://example.com/a",
+            "see http://x.io and https://y.io <:pog:123> 💀💀",
+            None,
+            "<@&3> is a role and <#4> a channel",
+        ],
+        "thread_id": pd.array([None, 10, None, 11], dtype="Int64"),
+    }
+    frame.update(columns)
+    return pd.DataFrame(frame)
+
+
+def test_adds_every_derived_column_in_order():
+    df = enrich_messages(messages(reply_to_id=pd.array([None, None, 5, None], dtype="Int64")))
+
+    assert tuple(df.columns[-len(ENRICHED_FIELDS):]) == ENRICHED_FIELDS
+    assert values(df["author_normalized"]) == ["alice", "bob", "carol", "dave"]
+    assert values(df["message_length"]) == [51, 46, 0, 34]
+    assert values(df["mention_count"]) == [3, 0, 0, 0]
+    assert values(df["link_count"]) == [1, 2, 0, 0]
+    assert values(df["emoji_count"]) == [0, 3, 0, 0]
+    assert values(df["is_thread"]) == [False, True, False, True]
+    assert values(df["is_reply"]) == [False, False, True, False]
+
+
+def test_mentioned_user_ids_are_distinct_and_in_order():
+    df = enrich_messages(messages(chat_text=["<@2> <@!1> <@2>", "<@5><@5><@6>", "nobody", "<@&3>"]))
+
+    assert values(df["mentioned_user_ids"]) == ["{2,1}", "{5,6}", None, None]
+
+
+def test_mentions_follow_the_frame_index():
+    # Streamed chunks keep their row numbers from the file
+    chunk = messages()
+    chunk.index = [50_000, 50_001, 50_002, 50_003]
+
+    df = enrich_messages(chunk)
+
+    assert values(df["mentioned_user_ids"]) == ["{1,2}", None, None, None]
+
+
+def test_is_reply_is_unknown_without_reply_to_id():
+    df = enrich_messages(messages())
+
+    assert values(df["is_reply"]) == [None, None, None, None]
@@ -0,0 +1,48 @@
+import os
+import json
+from typing import Dict, Optional
+
+class CheckpointStore:
+    """
+    A small JSON store of the newest exported message ID per channel and thread.
+
+    Discord message IDs are snowflakes that increase over time, so the newest
+    ID seen for a channel is a high-water mark: the next run only needs
+    messages with a larger ID (`history(after=...)`).
+
+    Threads are channels in Discord, so channel and thread IDs share one
+    namespace and are stored side by side.
+    """
+
+    def __init__(self, path: str = os.path.join("state", "checkpoints.json")):
+        self.path = path
+        self.checkpoints: Dict[str, int] = {}
+        self.load()
+
+    def load(self) -> None:
+        """Load checkpoints from disk, starting empty if the file doesn't exist."""
+        if not os.path.exists(self.path):
+            self.checkpoints = {}
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            self.checkpoints = {key: int(value) for key, value in json.load(f).items()}
+
+    def get(self, channel_id: int) -> Optional[int]:
+        """Return the newest exported message ID for a channel or thread."""
+        return self.checkpoints.get(str(channel_id))
+
+    def update(self, channel_id: int, message_id: Optional[int]) -> None:
+        """Raise a channel's high-water mark (never lowers it)."""
+        if message_id is None:
+            return
+        current = self.get(channel_id)
+        if current is None or message_id > current:
+            self.checkpoints[str(channel_id)] = message_id
+
+    def save(self) -> None:
+        """Write checkpoints atomically so a crash never leaves a half-written file."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.checkpoints, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
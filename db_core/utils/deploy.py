@@ -1,7 +1,15 @@
-from utils.runner import run_scripts_in_order
+from utils.runner import run_scripts_in_order, run_manifests
 
-def deploy_layer(layer_name):
+def deploy_layer(layer_name, force=False, dry_run=False):
     manifest_path = f"manifests/{layer_name}_order.yml"
     print(f"🚀 Deploying {layer_name.capitalize()} Layer...")
-    run_scripts_in_order(manifest_path)
+    run_scripts_in_order(manifest_path, force=force, dry_run=dry_run)
     print(f"🎯 Finished deploying {layer_name.capitalize()} Layer.\n")
+
+def deploy_layers(layer_names, max_workers=None, force=False, dry_run=False):
+    # One dependency graph across every layer, so files whose `depends_on`
+    # allows it can start before the earlier layers have finished
+    manifest_paths = [f"manifests/{layer_name}_order.yml" for layer_name in layer_names]
+    print(f"🚀 Deploying {', '.join(name.capitalize() for name in layer_names)} Layers...")
+    run_manifests(manifest_paths, max_workers, force=force, dry_run=dry_run)
+    print(f"🎯 Finished deploying {', '.join(name.capitalize() for name in layer_names)} Layers.\n")
@@ -1,10 +1,19 @@
 import os
 import csv
+import random
+import asyncio
 import discord
 import ssl
+import time
 from dotenv import load_dotenv
 from discord import TextChannel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Awaitable, Callable, Optional
+from utils.checkpoint import CheckpointStore
+from utils.journal import ProgressJournal
+from utils.thread_index import ThreadIndex, as_datetime
+from utils.sink import CsvMessageSink, open_sink
+from utils.records import MessageRecord
+from utils.metrics import metrics
 
 class DiscordExtractor:
     """
@@ -15,12 +24,27 @@ class DiscordExtractor:
     - Export channel information to CSV
     - Run the complete ETL pipeline
     
-    The data is exported in a single format:
-    - CSV file containing all messages with channel and thread information
+    The data is exported as:
+    - A file containing all messages with channel and thread information,
+      as CSV (default), Parquet or Arrow IPC
     - CSV file containing channel information
     """
+
+    # Number of messages buffered per channel/thread before they're written
+    BATCH_SIZE = 1000
+
+    # Messages a backfill window may fetch ahead of the window being written
+    WINDOW_BUFFER = 50_000
+
+    # Backoff between retries of a failed fetch: doubles from RETRY_BASE up
+    # to RETRY_MAX seconds, with jitter
+    RETRY_BASE = 2.0
+    RETRY_MAX = 60.0
     
-    def __init__(self):
+    def __init__(self, max_concurrency: Optional[int] = None, incremental: Optional[bool] = None,
+                 output_format: Optional[str] = None, backend: Optional[str] = None,
+                 backfill_windows: Optional[int] = None, max_retries: Optional[int] = None,
+                 guild_id: Optional[int] = None, output_dir: str = "csv_files", state_dir: str = "state"):
         """
         Initialize the Discord extractor with required environment variables.
         
@@ -29,9 +53,44 @@ class DiscordExtractor:
         - SSL verification settings
         - Discord bot token and server ID from environment variables
         - Discord client intents (permissions)
+        - The number of channel/thread histories fetched at the same time
+        - Incremental mode and its per-channel checkpoints
+        - The output format for exported messages
+        - The backend used to reach Discord
+        - The number of time windows each history is split into for backfills
+        - How often a failed channel or thread fetch is retried
+        - The guild to export, and where its files and state are kept
+
+        Args:
+            max_concurrency: Maximum number of history fetches in flight at once.
+                Defaults to the EXTRACT_CONCURRENCY environment variable, or 8.
+            incremental: Only fetch messages newer than the previous run.
+                Defaults to the EXTRACT_INCREMENTAL environment variable.
+            output_format: "csv", "parquet" or "arrow". Defaults to the
+                EXTRACT_FORMAT environment variable, or "csv". The columnar
+                formats need pyarrow.
+            backend: "gateway" logs in with a discord.py client; "rest" calls
+                the REST API directly without a gateway connection (see
+                utils.rest_client). Defaults to the EXTRACT_BACKEND
+                environment variable, or "gateway".
+            backfill_windows: Split every channel and thread with more than one
+                page of messages to fetch into this many windows, fetched
+                concurrently (see _backfill). Defaults to the
+                EXTRACT_BACKFILL_WINDOWS environment variable, or 1 (off).
+            max_retries: Retries for a failed channel or thread fetch, with
+                exponential backoff. Defaults to the EXTRACT_RETRIES
+                environment variable, or 3.
+            guild_id: The guild to export. Defaults to the TEST_SERVER_ID
+                environment variable.
+            output_dir: Directory for channels.csv and chat_history.<format>.
+            state_dir: Directory for checkpoints, the progress journal and
+                the thread index. Extractors for different guilds need
+                their own output and state directories.
         """
         # Ensure output directories exist
-        os.makedirs("csv_files", exist_ok=True)
+        self.output_dir = output_dir
+        self.state_dir = state_dir
+        os.makedirs(output_dir, exist_ok=True)
         
         # Disable SSL verification globally
         ssl._create_default_https_context = ssl._create_unverified_context
@@ -39,7 +98,7 @@ class DiscordExtractor:
         # Loads Discord Token and Server ID environment variables
         load_dotenv()
         self.token = os.getenv("DARCY_KEY")
-        self.guild_id = int(os.getenv("TEST_SERVER_ID"))
+        self.guild_id = guild_id if guild_id is not None else int(os.getenv("TEST_SERVER_ID"))
         
         # Set up Discord permissions (intents) to:
         # - Read message content
@@ -50,6 +109,37 @@ class DiscordExtractor:
         self.intents.guilds = True
         self.intents.guild_messages = True
 
+        # Bound the number of concurrent history fetches.
+        # Message history is rate limited per channel (GET /channels/{id}/messages),
+        # so different channels and threads never share a bucket and discord.py
+        # handles each bucket's limits itself. A single channel is still paged
+        # sequentially; the limit only keeps us well under the global rate limit.
+        self.max_concurrency = max_concurrency or int(os.getenv("EXTRACT_CONCURRENCY", "8"))
+
+        # In incremental mode each channel and thread resumes from the newest
+        # message ID exported by the previous run (its checkpoint)
+        if incremental is None:
+            incremental = os.getenv("EXTRACT_INCREMENTAL", "").lower() in ("1", "true", "yes")
+        self.incremental = incremental
+        self.checkpoints = CheckpointStore(os.path.join(state_dir, "checkpoints.json")) if incremental else None
+
+        # Messages are written to <output_dir>/chat_history.<format>
+        self.output_format = output_format or os.getenv("EXTRACT_FORMAT", "csv")
+
+        self.backend = backend or os.getenv("EXTRACT_BACKEND", "gateway")
+        if self.backend not in ("gateway", "rest"):
+            raise ValueError(f"Unknown extraction backend {self.backend!r}; expected 'gateway' or 'rest'")
+
+        # Sharded backfill for initial loads of very large channels
+        self.backfill_windows = backfill_windows or int(os.getenv("EXTRACT_BACKFILL_WINDOWS", "1"))
+
+        if max_retries is None:
+            max_retries = int(os.getenv("EXTRACT_RETRIES", "3"))
+        self.max_retries = max_retries
+
+        # Messages exported per channel (threads included) by the last export
+        self.exported_counts: Dict[int, int] = {}
+
     def create_client(self) -> discord.Client:
         """
         Create a new Discord client with the configured intents.
@@ -58,12 +148,91 @@ class DiscordExtractor:
         """
         return discord.Client(intents=self.intents)
 
+    async def with_guild(self, action: Callable[[Any], Awaitable[Any]]) -> Any:
+        """
+        Connect to Discord, run `action(guild)` once, then disconnect.
+        
+        With the gateway backend this logs in a discord.py client and runs the
+        action from `on_ready`, once the guild cache is populated. With the
+        REST backend it fetches the guild's channels and threads over HTTP
+        and runs the action straight away, with no websocket or cache.
+        
+        Args:
+            action: Coroutine function called with the guild.
+        Returns:
+            The action's result, or None if the guild wasn't found.
+        """
+        async def run(guilds):
+            guild = guilds[self.guild_id]
+            if guild is None:
+                print(f"❌ Guild ID {self.guild_id} not found.")
+                return None
+            return await action(guild)
+
+        return await self.with_guilds([self.guild_id], run)
+
+    async def with_guilds(self, guild_ids: List[int],
+                          action: Callable[[Dict[int, Any]], Awaitable[Any]]) -> Any:
+        """
+        Connect to Discord once, run `action(guilds)`, then disconnect.
+        
+        Every guild is reached over the same connection: one gateway client,
+        whose cache holds every guild the bot is in, or one REST session. So
+        all requests share the bot token's rate-limit accounting.
+        
+        Args:
+            guild_ids: The guilds to look up.
+            action: Coroutine function called with {guild ID: guild, or
+                None if the bot can't see it}. Over REST, a guild whose
+                requests fail (e.g. 403 for a guild the bot was removed
+                from) is None too, so it doesn't stop the others.
+        Returns:
+            The action's result.
+        """
+        if self.backend == "rest":
+            from utils.rest_client import RestClient, RestError
+            async with RestClient(self.token) as rest:
+                async def fetch(guild_id):
+                    try:
+                        return await rest.fetch_guild(guild_id)
+                    except RestError as e:
+                        # A rejected token fails every guild alike
+                        if e.status == 401:
+                            raise
+                        if e.status != 404:
+                            print(f"❌ Couldn't fetch guild {guild_id}: {e}")
+                        return None
+                guilds = await asyncio.gather(*(fetch(guild_id) for guild_id in guild_ids))
+                return await action(dict(zip(guild_ids, guilds)))
+
+        client = self.create_client()
+        result = {}
+
+        @client.event
+        async def on_ready():
+            # on_ready fires again after a reconnect; only run once
+            if result:
+                return
+            result["started"] = True
+
+            try:
+                result["value"] = await action({guild_id: client.get_guild(guild_id) for guild_id in guild_ids})
+            except Exception as e:
+                result["error"] = e
+            finally:
+                await client.close()
+
+        await client.start(self.token)
+        if "error" in result:
+            raise result["error"]
+        return result.get("value")
+
     async def export_channels(self) -> None:
         """
         Export channel information from Discord server to CSV.
         
         This method:
-        1. Connects to Discord using the bot token
+        1. Connects to Discord using the bot token (see with_guild)
         2. Gets the guild (server) structure directly from Discord
         3. Extracts channel information (name and ID)
         4. Saves channel data to a CSV file
@@ -72,144 +241,473 @@ class DiscordExtractor:
         - Channel name
         - Channel ID
         """
-        client = self.create_client()
+        async def export(guild):
+            self.export_guild_channels(guild)
 
-        @client.event
-        async def on_ready():
-            guild = client.get_guild(self.guild_id)
-            if guild is None:
-                print(f"❌ Guild ID {self.guild_id} not found.")
-                await client.close()
-                return
+        await self.with_guild(export)
 
-            channels = []
-            
-            # Process all text channels in the guild
-            for channel in guild.text_channels:
-                channels.append({
-                    "channel_name": channel.name,
-                    "channel_id": channel.id
-                })
-                print(f"✅ Extracted channel: {channel.name}")
-
-            # Write channels to CSV
-            csv_path = os.path.join("csv_files", "channels.csv")
-            try:
-                with open(csv_path, "w", encoding="utf-8", newline='') as f:
-                    writer = csv.DictWriter(f, fieldnames=["channel_name", "channel_id"])
-                    writer.writeheader()
-                    writer.writerows(channels)
-                
-                print(f"✅ Wrote {csv_path} ({len(channels)} channels)")
-            except Exception as e:
-                print(f"❌ Error writing CSV file: {str(e)}")
+    def export_guild_channels(self, guild) -> List[Dict[str, Any]]:
+        """
+        Extract a guild's text channels and save them to CSV.
+        
+        Args:
+            guild: The guild to read channels from.
+        Returns:
+            The extracted channels, as {"channel_name", "channel_id"} dicts.
+        """
+        channels = []
+        
+        # Process all text channels in the guild
+        for channel in guild.text_channels:
+            channels.append({
+                "channel_name": channel.name,
+                "channel_id": channel.id
+            })
+            print(f"✅ Extracted channel: {channel.name}")
 
-            await client.close()
+        # Write channels to CSV
+        csv_path = os.path.join(self.output_dir, "channels.csv")
+        try:
+            with open(csv_path, "w", encoding="utf-8", newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=["channel_name", "channel_id"])
+                writer.writeheader()
+                writer.writerows(channels)
+            
+            print(f"✅ Wrote {csv_path} ({len(channels)} channels)")
+        except Exception as e:
+            print(f"❌ Error writing CSV file: {str(e)}")
 
-        await client.start(self.token)
+        return channels
 
     async def export_chat_history(self) -> None:
         """
         Export chat history from all channels and threads directly to CSV.
         
         This method:
-        1. Connects to Discord using the bot token
+        1. Connects to Discord using the bot token (see with_guild)
         2. Gets the guild (server) structure directly from Discord
-        3. For each channel:
-           - Exports all messages from the main channel
-           - Exports all messages from each thread in the channel
-        4. Saves all messages to a CSV file
+        3. Exports the guild's history (see export_guild_history)
         
         The output CSV contains:
         - Channel information (ID, name)
         - Thread information (ID, name) if applicable
         - Message details (ID, author, content, timestamp)
         """
-        # creates a Discord client with the configured permissions
-        client = self.create_client()
+        await self.with_guild(self.export_guild_history)
 
-        # event handler for when the client is ready
-        @client.event
-        async def on_ready():
-            # gets the guild (server) structure directly from Discord   
-            guild = client.get_guild(self.guild_id)
-            if guild is None:
-                print(f"❌ Guild ID {self.guild_id} not found.")
-                await client.close()
-                return
+    async def export_guild_history(self, guild, channel_ids: Optional[List[int]] = None) -> Optional[str]:
+        """
+        Export the history of every text channel and thread in a guild.
+        
+        This method:
+        1. Starts one export task per text channel
+        2. Within each channel, fetches the main channel and each of its
+           threads (active and archived) as separate tasks
+        3. Runs at most `max_concurrency` history fetches at a time
+        4. Streams messages to the output file in batches as they arrive
+           (oldest first)
+        5. Once every channel succeeded, moves the file into place and, in
+           incremental mode, advances each channel's and thread's checkpoint
+        
+        In incremental mode the file only contains messages posted since the
+        previous run.
+        
+        A failed channel or thread fetch is retried up to `max_retries` times
+        with backoff, continuing after the newest message already written.
+        
+        If any channel still fails, checkpoints are left alone. For CSV output
+        the partial `chat_history.csv.part` file is kept along with a progress
+        journal (`state/progress.sqlite`, see ProgressJournal), and running the
+        export again skips every channel and thread that finished and resumes
+        the rest from their journaled cursors. Columnar output is rewritten
+        from scratch.
+        
+        Args:
+            guild: The guild to export. Anything exposing `text_channels`
+                works, which lets the export run against a fake guild offline.
+            channel_ids: Only export these channels (default: every text channel).
+        Returns:
+            The path of the written file, or None if the export didn't complete.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        channels = [
+            channel for channel in guild.text_channels
+            if channel_ids is None or channel.id in channel_ids
+        ]
+        self.exported_counts = {}
+        journal = ProgressJournal(os.path.join(self.state_dir, "progress.sqlite")) if self.output_format == "csv" else None
+        # Skipping unchanged threads is only safe when the file holds just
+        # the new messages, so the thread index is used in incremental mode
+        thread_index = ThreadIndex(os.path.join(self.state_dir, "threads.sqlite")) if self.incremental else None
+        try:
+            sink = open_sink(os.path.join(self.output_dir, "chat_history"), self.output_format, journal=journal)
 
-            all_messages = []
-            total_messages = 0
-            
-            # Process all channels in the guild
-            # - Loops through each text channel in the server
-            # - Fetches all messages from each channel
-            # - Stores message details  
-            for channel in guild.text_channels:
+            # Process all channels in the guild concurrently
+            # - Each channel fetches its main history and threads in parallel
+            # - Each fetch writes its messages to the sink in batches
+            start = time.perf_counter()
+            with metrics.span("export_history", channels=len(channels), format=self.output_format) as span:
                 try:
-                    print(f"🔄 Exporting {channel.name}...")
-                    channel_messages = []
-                    
-                    # Export messages from the main channel
-                    async for msg in channel.history(limit=None):
-                        channel_messages.append({
-                            "channel_name": channel.name,
-                            "channel_id": channel.id,
-                            "thread_name": None,
-                            "thread_id": None,
-                            "message_id": msg.id,
-                            "author": msg.author.name,
-                            "chat_text": msg.content,
-                            "created_at": msg.created_at.isoformat()
-                        })
-                    
-                    # Export messages from threads
-                    # Get both active and archived threads
-                    active_threads = channel.threads
-                    archived_threads = []
-                    async for thread in channel.archived_threads():
-                        archived_threads.append(thread)
-                    threads = active_threads + archived_threads
-                    for thread in threads:
-                        print(f"  🔄 Exporting thread: {thread.name}")
-                        async for msg in thread.history(limit=None):
-                            channel_messages.append({
-                                "channel_name": channel.name,
-                                "channel_id": channel.id,
-                                "thread_name": thread.name,
-                                "thread_id": thread.id,
-                                "message_id": msg.id,
-                                "author": msg.author.name,
-                                "chat_text": msg.content,
-                                "created_at": msg.created_at.isoformat()
-                            })
-                    
-                    all_messages.extend(channel_messages)
-                    total_messages += len(channel_messages)
-                    print(f"✅ Exported {len(channel_messages)} messages from {channel.name} (including threads)")
-                    
-                except Exception as e:
-                    print(f"❌ Error exporting {channel.name}: {str(e)}")
-                    continue
-
-            # Write all messages to a single CSV file
-            csv_path = os.path.join("csv_files", "chat_history.csv")
+                    results = await asyncio.gather(*(
+                        self._export_channel(channel, semaphore, sink, thread_index) for channel in channels
+                    ))
+                except BaseException:
+                    sink.abort()
+                    raise
+                span["messages"] = sink.rows_written
+                span["messages_per_second"] = round(sink.rows_written / max(time.perf_counter() - start, 1e-9), 1)
+
+            failed = [channel.name for channel, threads in zip(channels, results) if threads is None]
+            if failed:
+                sink.abort()
+                action = "resume" if isinstance(sink, CsvMessageSink) else "retry"
+                print(f"⚠️ {len(failed)} channel(s) failed ({', '.join(failed)}); "
+                      f"kept {sink.part_path} ({sink.resumed_rows + sink.rows_written} messages), "
+                      f"re-run to {action}")
+                if journal is not None:
+                    units = ", ".join(f"{count} {status}" for status, count in sorted(journal.summary().items()))
+                    print(f"📒 Progress journal {journal.path}: {units}")
+                return None
+
+            sink.commit()
+            print(f"✅ Wrote {sink.path} ({sink.resumed_rows + sink.rows_written} messages total)")
+
+            # Only advance checkpoints once the messages are safely on disk
+            if self.incremental:
+                for unit_id, message_id in sink.high_water.items():
+                    self.checkpoints.update(unit_id, message_id)
+                self.checkpoints.save()
+                print(f"✅ Saved checkpoints to {self.checkpoints.path}")
+
+            if thread_index is not None:
+                for threads in results:
+                    for thread, count in threads:
+                        thread_index.update(thread, count, sink.high_water.get(thread.id))
+                print(f"✅ Updated thread index {thread_index.path}")
+        finally:
+            if journal is not None:
+                journal.close()
+            if thread_index is not None:
+                thread_index.close()
+
+        return sink.path
+
+    async def _export_channel(self, channel: TextChannel, semaphore: asyncio.Semaphore,
+                              sink, thread_index: Optional[ThreadIndex] = None) -> Optional[List[Any]]:
+        """
+        Export all messages from a channel and its threads.
+        
+        Args:
+            channel: The text channel to export.
+            semaphore: Shared limit on concurrent history fetches.
+            sink: Where message batches are written.
+            thread_index: Index of threads seen by earlier incremental runs;
+                archived threads it shows unchanged are skipped.
+        Returns:
+            (thread, messages exported) for every thread read, or None if
+            the channel or any of its threads failed.
+        """
+        try:
+            print(f"🔄 Exporting {channel.name}...")
+            start = time.perf_counter()
+            with metrics.span("export_channel", labels={"channel": channel.name}) as span:
+                # Get both active and archived threads
+                async def list_archived():
+                    async with semaphore:
+                        return await self._list_archived_threads(channel, thread_index)
+                archived_threads = await self._with_retries(f"archived threads of {channel.name}", list_archived)
+                threads = list(channel.threads) + archived_threads
+
+                # Export messages from the main channel and every thread in parallel
+                # (wait for all of them even if one fails, so none outlives the sink)
+                counts = await asyncio.gather(
+                    self._fetch_unit(channel, None, semaphore, sink),
+                    *(self._fetch_unit(channel, thread, semaphore, sink) for thread in threads),
+                    return_exceptions=True
+                )
+                errors = [count for count in counts if isinstance(count, BaseException)]
+                if errors:
+                    raise errors[0]
+
+                span["threads"] = len(threads)
+                span["messages"] = sum(counts)
+                span["messages_per_second"] = round(sum(counts) / max(time.perf_counter() - start, 1e-9), 1)
+            metrics.count("messages_exported", sum(counts), channel=channel.name)
+            self.exported_counts[channel.id] = sum(counts)
+
+            print(f"✅ Exported {sum(counts)} messages from {channel.name} (including threads)")
+            return list(zip(threads, counts[1:]))
+
+        except Exception as e:
+            print(f"❌ Error exporting {channel.name}: {str(e)}")
+            return None
+
+    async def _list_archived_threads(self, channel: TextChannel,
+                                     thread_index: Optional[ThreadIndex] = None) -> List[Any]:
+        """
+        List a channel's archived threads that may have messages to export.
+        
+        Without a thread index every archived thread is listed. With one,
+        listing (most recently archived first) stops at the first thread
+        archived before the newest one already indexed, and indexed threads
+        whose archive timestamp and last message haven't changed are left out.
+        
+        Args:
+            channel: The text channel whose threads to list.
+            thread_index: Index of threads seen by earlier runs.
+        Returns:
+            The archived threads to fetch.
+        """
+        if thread_index is None:
+            return [thread async for thread in channel.archived_threads(limit=None)]
+
+        newest = thread_index.newest_archive(channel.id)
+        threads, skipped = [], 0
+        async for thread in channel.archived_threads(limit=None):
+            archived_at = as_datetime(thread.archive_timestamp)
+            if newest is not None and archived_at is not None and archived_at < newest:
+                break
+            if thread_index.unchanged(thread):
+                skipped += 1
+                continue
+            threads.append(thread)
+        metrics.count("archived_threads_skipped", skipped, channel=channel.name)
+        if newest is not None:
+            print(f"  📇 {channel.name}: {len(threads)} new or changed archived threads, "
+                  f"{skipped} unchanged, stopped at threads archived before {newest.isoformat()}")
+        return threads
+
+    async def _with_retries(self, label: str, operation: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run `operation()`, retrying failures with exponential backoff and jitter.
+        
+        Errors that a retry can't fix (missing access, unknown channel) are
+        raised straight away.
+        
+        Args:
+            label: What is being fetched, for log messages.
+            operation: Coroutine function to (re-)run.
+        Returns:
+            The operation's result.
+        """
+        for attempt in range(self.max_retries + 1):
             try:
-                with open(csv_path, "w", encoding="utf-8", newline='') as f:
-                    writer = csv.DictWriter(f, fieldnames=[
-                        "channel_name", "channel_id", "thread_name","thread_id",
-                        "message_id", "author", "chat_text", "created_at"
-                    ])
-                    writer.writeheader()
-                    writer.writerows(all_messages)
-                
-                print(f"✅ Wrote {csv_path} ({total_messages} messages total)")
+                return await operation()
             except Exception as e:
-                print(f"❌ Error writing CSV file: {str(e)}")
+                if attempt == self.max_retries or getattr(e, "status", None) in (401, 403, 404):
+                    raise
+                delay = min(self.RETRY_BASE * 2 ** attempt, self.RETRY_MAX) * random.uniform(0.5, 1.5)
+                print(f"  ⚠️ {label} failed ({e}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                metrics.count("fetch_retries", error=type(e).__name__)
+                metrics.event("fetch_retry", unit=label, attempt=attempt + 1, error=str(e), delay=delay)
+                await asyncio.sleep(delay)
+                metrics.observe("retry_wait", delay)
 
-            await client.close()
+    async def _fetch_unit(self, channel: TextChannel, thread, semaphore: asyncio.Semaphore,
+                          sink) -> int:
+        """
+        Fetch one channel's or thread's history, with retries and journaling.
+        
+        Units the progress journal already marks as done are skipped. Each
+        retry continues after the newest message already written, so only
+        the lost part is fetched again.
+        
+        Args:
+            channel: The parent text channel.
+            thread: The thread to read, or None for the channel itself.
+            semaphore: Shared limit on concurrent history fetches.
+            sink: Where message batches are written.
+        Returns:
+            The number of messages written.
+        """
+        source = channel if thread is None else thread
+        journal = sink.journal
+        if journal is not None and journal.is_done(source.id):
+            return 0
 
-        await client.start(self.token)
+        try:
+            with metrics.span("fetch_unit", labels={"channel": channel.name},
+                              unit=source.name, thread=thread is not None) as span:
+                count = await self._with_retries(
+                    f"history of {source.name}",
+                    lambda: self._fetch_history(channel, thread, semaphore, sink)
+                )
+                span["messages"] = count
+        except Exception as e:
+            if journal is not None:
+                journal.mark_failed(source.id, str(e), source.name)
+            raise
+        if journal is not None:
+            journal.mark_done(source.id, source.name)
+        return count
+
+    async def _fetch_history(self, channel: TextChannel, thread, semaphore: asyncio.Semaphore,
+                             sink) -> int:
+        """
+        Stream the history of a channel, or of one of its threads, to the sink.
+        
+        Messages are read oldest first and written every `BATCH_SIZE` messages,
+        so the fetch can resume after the newest message already written.
+        In incremental mode it also starts after the channel's checkpoint, and
+        isn't fetched at all when the channel's last message is no newer.
+        With `backfill_windows` > 1 the history is fetched in concurrent
+        windows instead (see _backfill).
+        
+        Args:
+            channel: The parent text channel.
+            thread: The thread to read, or None for the channel itself.
+            semaphore: Shared limit on concurrent history fetches.
+            sink: Where message batches are written.
+        Returns:
+            The number of messages written.
+        """
+        source = channel if thread is None else thread
+        checkpoint = self.checkpoints.get(source.id) if self.incremental else None
+        after = max(filter(None, (checkpoint, sink.resume_point(source.id))), default=None)
+        # Nothing was posted since the last export: skip the history request
+        last_message_id = getattr(source, "last_message_id", None)
+        if self.incremental and after and last_message_id and last_message_id <= after:
+            return 0
+
+        batch = []
+        count = 0
+        async with semaphore:
+            if thread is not None:
+                print(f"  🔄 Exporting thread: {thread.name}")
+            if self.backfill_windows > 1:
+                return await self._backfill(channel, thread, source, after, sink)
+            history = source.history(
+                limit=None,
+                after=discord.Object(id=after) if after else None,
+                oldest_first=True
+            )
+            async for msg in history:
+                batch.append(MessageRecord.from_message(channel, thread, msg))
+                if len(batch) >= self.BATCH_SIZE:
+                    sink.write_batch(batch)
+                    count += len(batch)
+                    batch = []
+            sink.write_batch(batch)
+        return count + len(batch)
+
+    async def _backfill(self, channel: TextChannel, thread, source, after: Optional[int], sink) -> int:
+        """
+        Stream a channel's or thread's history by fetching time windows concurrently.
+        
+        A single history() iterator pages through a channel one request at a
+        time, so one huge channel sets the run time of the whole export.
+        Message IDs are snowflakes, which grow with time, so the history can
+        be split by ID into windows fetched in parallel:
+        1. Fetches the first page; if that's everything, it's done
+        2. Fetches the newest message, to bound the range to split
+        3. Splits the IDs between them into up to `backfill_windows` windows
+           (fewer when the first page's message rate suggests only a few
+           batches are left) and
+           fetches each with history(after=..., before=...); the last window
+           is open-ended, so messages posted meanwhile are still read
+        4. Writes the windows to the sink in order, dropping any message
+           already written, so the file stays oldest first and resumable
+        
+        Later windows may only run `WINDOW_BUFFER` messages ahead of the one
+        being written, which bounds memory. The unit still takes one slot of
+        `max_concurrency`; its windows' requests all count against the
+        channel's own rate-limit bucket.
+        
+        Args:
+            channel: The parent text channel.
+            thread: The thread being read, or None for the channel itself.
+            source: The channel or thread to read.
+            after: Only read messages newer than this ID.
+            sink: Where message batches are written.
+        Returns:
+            The number of messages written.
+        """
+        first_page = [
+            MessageRecord.from_message(channel, thread, msg)
+            async for msg in source.history(
+                limit=100, after=discord.Object(id=after) if after else None, oldest_first=True
+            )
+        ]
+        sink.write_batch(first_page)
+        if len(first_page) < 100:
+            return len(first_page)
+
+        newest = [msg async for msg in source.history(limit=1)]
+        lower, upper = first_page[-1].message_id, newest[0].id if newest else 0
+
+        # Estimate what's left from the first page's message rate, and give
+        # every window at least a batch of messages so small histories
+        # aren't split into mostly empty requests
+        first_span = max(lower - first_page[0].message_id, 1)
+        estimate = len(first_page) * max(upper - lower, 0) // first_span
+        windows = max(min(self.backfill_windows, estimate // self.BATCH_SIZE), 1)
+        step = (upper - lower) // windows
+        bounds = [lower + i * step for i in range(windows)] if step > 0 else [lower]
+
+        # Window i holds IDs in (bounds[i], bounds[i + 1]]; the last one is open-ended
+        windows = [(start, end + 1) for start, end in zip(bounds, bounds[1:])] + [(bounds[-1], None)]
+        if len(windows) > 1:
+            print(f"  ⚡ Backfilling {source.name} in {len(windows)} windows")
+        return len(first_page) + await self._fetch_windows(channel, thread, source, windows, lower, sink)
+
+    async def _fetch_windows(self, channel: TextChannel, thread, source, windows, written_through: int,
+                             sink) -> int:
+        """
+        Fetch `windows` of a history concurrently and write them to the sink in order.
+        
+        Args:
+            channel: The parent text channel.
+            thread: The thread being read, or None for the channel itself.
+            source: The channel or thread to read.
+            windows: (after, before) message ID bounds, oldest window first.
+            written_through: Newest message ID already written for `source`.
+            sink: Where message batches are written.
+        Returns:
+            The number of messages written.
+        """
+        queues = [asyncio.Queue(maxsize=max(self.WINDOW_BUFFER // self.BATCH_SIZE, 1)) for _ in windows]
+
+        async def fetch(window, queue):
+            after, before = window
+            batch = []
+            try:
+                history = source.history(
+                    limit=None,
+                    after=discord.Object(id=after),
+                    before=discord.Object(id=before) if before else None,
+                    oldest_first=True
+                )
+                async for msg in history:
+                    batch.append(MessageRecord.from_message(channel, thread, msg))
+                    if len(batch) >= self.BATCH_SIZE:
+                        await queue.put(batch)
+                        batch = []
+                await queue.put(batch)
+                await queue.put(None)
+            except Exception as e:
+                await queue.put(e)
+
+        tasks = [asyncio.create_task(fetch(window, queue)) for window, queue in zip(windows, queues)]
+        count = 0
+        try:
+            for queue in queues:
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    # Windows don't overlap, but never write a message twice
+                    batch = [record for record in item if record.message_id > written_through]
+                    if batch:
+                        sink.write_batch(batch)
+                        written_through = batch[-1].message_id
+                        count += len(batch)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return count
 
     async def run_etl_pipeline(self) -> None:
         """
@@ -1,40 +1,309 @@
+import io
+import os
+import csv
+import time
 import pandas as pd
 from sqlalchemy import text
 from config.db_config import engine
+from utils.records import MessageRecord
+from utils.metrics import metrics
 
 class BronzeIngestor:
-    def __init__(self, csv_path, table_name, schema="bronze", truncate=True):
+    # Marks NULLs in COPY payloads, so empty strings stay empty strings
+    COPY_NULL = "\\N"
+    # Characters COPY's text format reads specially, and their escapes;
+    # backslash goes first, so a literal "\N" in a message isn't read as NULL
+    COPY_ESCAPES = (("\\", "\\\\"), ("\t", "\\t"), ("\n", "\\n"), ("\r", "\\r"))
+
+    def __init__(self, csv_path, table_name, schema="bronze", truncate=True,
+                 method="copy", chunksize=50_000, progress=None,
+                 stream=False, resumable=False, merge_key=None, quiet=False,
+                 transform=None, keep_on_null=()):
         self.csv_path = csv_path
         self.schema = schema
         self.table_name = table_name
         self.truncate = truncate
+        # "copy" streams rows through PostgreSQL's COPY FROM STDIN and falls
+        # back to to_sql on other databases; "insert" always uses to_sql
+        self.method = method
+        self.chunksize = chunksize
+        # Optional callback, called as progress(rows_done, rows_total);
+        # rows_total is None when streaming, since it isn't known up front
+        self.progress = progress
+        # Read the CSV `chunksize` rows at a time and insert each chunk as it
+        # is read, so memory is bounded by the chunk size, not the file size
+        self.stream = stream
+        # When streaming, all chunks commit in one transaction by default.
+        # With resumable=True each chunk commits on its own and the number of
+        # rows loaded is kept in <csv_path>.ingest, so an interrupted load
+        # resumes after the last committed chunk
+        self.resumable = resumable
+        self.progress_path = f"{csv_path}.ingest" if csv_path else None
+        # With a merge key (e.g. "message_id"), rows are loaded into a staging
+        # table and upserted with INSERT ... ON CONFLICT (merge_key) instead of
+        # being appended, and the target is never truncated. Rows that actually
+        # change get a fresh ingestion_timestamp and ingest_xid (the writing
+        # transaction's ID), which silver loads use as their watermark. Needs
+        # PostgreSQL, a unique index on merge_key and an ingest_xid column.
+        self.merge_key = merge_key
+        if merge_key:
+            self.truncate = False
+        # Columns a merge never overwrites with NULL, for sources that may not
+        # know them (e.g. channel names of edits to uncached channels)
+        self.keep_on_null = tuple(keep_on_null)
+        # Suppresses progress messages, for callers loading many small batches
+        self.quiet = quiet
+        # Optional function applied to every frame before it is loaded, e.g.
+        # utils.transform.enrich_messages; chunk by chunk when streaming
+        self.transform = transform
         self.df = None
 
+    def log(self, message):
+        if not self.quiet:
+            print(message)
+
+    @property
+    def full_table(self):
+        return f"{self.schema}.{self.table_name}"
+
+    @property
+    def stage_table(self):
+        return f"{self.table_name}_stage"
+
+    def csv_dtypes(self):
+        # Snowflake IDs don't fit in a float64, so never let pandas infer them
+        header = pd.read_csv(self.csv_path, nrows=0).columns
+        return {col: "Int64" for col in header if col.lower() in MessageRecord.ID_FIELDS}
+
     def load_csv(self):
-        self.df = pd.read_csv(self.csv_path)
+        self.df = pd.read_csv(self.csv_path, dtype=self.csv_dtypes())
         self.df.columns = [col.lower() for col in self.df.columns]
-        print(f"📄 Loaded {len(self.df)} rows from {self.csv_path}")
+        self.log(f"📄 Loaded {len(self.df)} rows from {self.csv_path}")
 
-    def truncate_table(self):
-        full_table = f"{self.schema}.{self.table_name}"
-        with engine.begin() as connection:
-            connection.execute(text(f"TRUNCATE TABLE {full_table};"))
-            print(f"🧹 Truncated table {full_table}")
+    def load_columnar(self):
+        # Parquet and Arrow IPC (Feather v2) files carry their own types, so
+        # int64 snowflake IDs come back exactly, as nullable Int64 columns
+        if self.csv_path.endswith(".parquet"):
+            self.df = pd.read_parquet(self.csv_path, dtype_backend="numpy_nullable")
+        else:
+            self.df = pd.read_feather(self.csv_path, dtype_backend="numpy_nullable")
+        self.df.columns = [col.lower() for col in self.df.columns]
+        self.log(f"📄 Loaded {len(self.df)} rows from {self.csv_path}")
 
-    def insert_into_table(self):
-        full_table = f"{self.schema}.{self.table_name}"
-        with engine.begin() as connection:
-            self.df.to_sql(
-                self.table_name,
+    def is_columnar(self):
+        return self.csv_path.endswith((".parquet", ".arrow", ".feather"))
+
+    def load_file(self):
+        if self.is_columnar():
+            self.load_columnar()
+        else:
+            self.load_csv()
+
+    def load_records(self, records):
+        # Build the frame column-wise straight from MessageRecords, skipping
+        # the CSV round trip. Snowflake IDs go into nullable Int64 columns so
+        # missing thread IDs don't turn the column into lossy floats.
+        columns = list(zip(*(record.as_row() for record in records))) or [()] * len(MessageRecord.FIELDS)
+        self.df = pd.DataFrame({
+            field: pd.array(values, dtype="Int64") if field in MessageRecord.ID_FIELDS else list(values)
+            for field, values in zip(MessageRecord.FIELDS, columns)
+        })
+        self.log(f"📄 Loaded {len(self.df)} rows from message records")
+
+    def truncate_table(self, connection=None):
+        if connection is None:
+            with engine.begin() as connection:
+                return self.truncate_table(connection)
+        connection.execute(text(f"TRUNCATE TABLE {self.full_table};"))
+        self.log(f"🧹 Truncated table {self.full_table}")
+
+    def transform_frame(self, df):
+        if self.transform is None:
+            return df
+        start = time.perf_counter()
+        df = self.transform(df)
+        metrics.observe("transform", time.perf_counter() - start, table=self.full_table)
+        return df
+
+    def load_frame(self, connection, df, offset=0, total=None):
+        df = self.transform_frame(df)
+        start = time.perf_counter()
+        if self.merge_key:
+            self.merge_frame(connection, df, offset, total)
+        else:
+            self.write_frame(connection, df, offset, total)
+        # Per chunk (or per file when not streaming), with the method that wrote it
+        method = "copy" if self.method == "copy" and connection.dialect.name == "postgresql" else "to_sql"
+        metrics.count("rows_loaded", len(df), table=self.full_table)
+        metrics.observe("bronze_load", time.perf_counter() - start, table=self.full_table, method=method)
+
+    def write_frame(self, connection, df, offset=0, total=None, table_name=None):
+        table_name = table_name or self.table_name
+        if self.method == "copy" and connection.dialect.name == "postgresql":
+            # COPY needs the raw psycopg2 cursor; it still runs inside the
+            # SQLAlchemy transaction, so a failed chunk rolls back every chunk
+            cursor = connection.connection.cursor()
+            try:
+                self.copy_chunks(cursor, df, offset, total, table_name)
+            finally:
+                cursor.close()
+        else:
+            df.to_sql(
+                table_name,
                 con=connection,
                 schema=self.schema,
                 if_exists='append',
-                index=False
+                index=False,
+                chunksize=self.chunksize
             )
-            print(f"🚀 Inserted {len(self.df)} rows into {full_table}")
+            if self.progress:
+                self.progress(offset + len(df), total)
+
+    def merge_frame(self, connection, df, offset=0, total=None):
+        # Keep one copy of each key, the last one in the batch, since rows
+        # arrive in the order they were exported or received (e.g. an edit
+        # after the create of the same message)
+        df = df[df[self.merge_key].notna()].drop_duplicates(self.merge_key, keep="last")
+        stage = f"{self.schema}.{self.stage_table}"
+        columns = [f'"{col}"' for col in df.columns]
+        updates = {
+            f'"{col}"': f'COALESCE(EXCLUDED."{col}", {self.table_name}."{col}")'
+            if col in self.keep_on_null else f'EXCLUDED."{col}"'
+            for col in df.columns if col != self.merge_key
+        }
+
+        # An unlogged copy of the target: cheap to fill, emptied every batch
+        connection.execute(text(
+            f"CREATE UNLOGGED TABLE IF NOT EXISTS {stage} "
+            f"(LIKE {self.full_table} INCLUDING DEFAULTS);"
+        ))
+        connection.execute(text(f"TRUNCATE TABLE {stage};"))
+        self.write_frame(connection, df, offset, total, table_name=self.stage_table)
+
+        # Only touch rows whose values changed, so unchanged rows keep their
+        # timestamp and aren't picked up by the next silver load
+        result = connection.execute(text(f"""
+            INSERT INTO {self.full_table} ({", ".join(columns)})
+            SELECT {", ".join(columns)}
+            FROM {stage}
+            ON CONFLICT ("{self.merge_key}") DO UPDATE SET
+                {", ".join(f"{col} = {value}" for col, value in updates.items())},
+                ingestion_timestamp = CURRENT_TIMESTAMP,
+                ingest_xid = pg_current_xact_id()
+            WHERE ({", ".join(f"{self.table_name}.{col}" for col in updates)})
+                IS DISTINCT FROM ({", ".join(updates.values())});
+        """))
+        metrics.count("rows_merged", result.rowcount, table=self.full_table)
+        self.log(f"🔀 Merged {result.rowcount} new or changed rows into {self.full_table}")
+        return result.rowcount
+
+    def insert_into_table(self):
+        with engine.begin() as connection:
+            self.load_frame(connection, self.df, total=len(self.df))
+            self.log(f"🚀 Inserted {len(self.df)} rows into {self.full_table}")
+
+    def copy_chunks(self, cursor, df=None, offset=0, total=None, table_name=None):
+        df = self.df if df is None else df
+        total = len(df) if total is None and offset == 0 else total
+        full_table = f"{self.schema}.{table_name or self.table_name}"
+        columns = ", ".join(f'"{col}"' for col in df.columns)
+        sql = f"COPY {full_table} ({columns}) FROM STDIN WITH (NULL '{self.COPY_NULL}')"
+
+        for start in range(0, len(df), self.chunksize):
+            chunk = self.copy_escape(df.iloc[start:start + self.chunksize])
+            buffer = io.StringIO()
+            chunk.to_csv(buffer, sep="\t", index=False, header=False, na_rep=self.COPY_NULL,
+                         quoting=csv.QUOTE_NONE)
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+            if self.progress:
+                self.progress(offset + start + len(chunk), total)
+
+    def copy_escape(self, df):
+        # COPY's text format unescapes every value, so escape the text
+        # columns; other columns never hold these characters
+        text_columns = [col for col in df.columns if pd.api.types.is_string_dtype(df[col])]
+        if not text_columns:
+            return df
+        df = df.copy()
+        for col in text_columns:
+            # Few values need it, so only those are rewritten
+            special = df[col].str.contains(r"[\\\t\n\r]", regex=True, na=False)
+            if not special.any():
+                continue
+            values = df.loc[special, col]
+            for char, escape in self.COPY_ESCAPES:
+                values = values.str.replace(char, escape, regex=False)
+            df.loc[special, col] = values
+        return df
+
+    def read_csv_chunks(self, skip=0):
+        reader = pd.read_csv(
+            self.csv_path,
+            dtype=self.csv_dtypes(),
+            chunksize=self.chunksize,
+            skiprows=range(1, skip + 1)
+        )
+        for chunk in reader:
+            chunk.columns = [col.lower() for col in chunk.columns]
+            yield chunk
+
+    def read_ingest_progress(self):
+        if not os.path.exists(self.progress_path):
+            return 0
+        with open(self.progress_path, "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+
+    def write_ingest_progress(self, rows):
+        tmp_path = f"{self.progress_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(rows))
+        os.replace(tmp_path, self.progress_path)
+
+    def stream_into_table(self):
+        if self.resumable:
+            self.stream_resumable()
+            return
+
+        rows = 0
+        with engine.begin() as connection:
+            if self.truncate:
+                self.truncate_table(connection)
+            for chunk in self.read_csv_chunks():
+                self.load_frame(connection, chunk, offset=rows)
+                rows += len(chunk)
+                self.log(f"📦 Streamed {rows} rows from {self.csv_path}")
+        self.log(f"🚀 Inserted {rows} rows into {self.full_table}")
+
+    def stream_resumable(self):
+        rows = self.read_ingest_progress()
+        if rows:
+            self.log(f"♻️ Resuming {self.csv_path} after {rows} committed rows")
+        elif self.truncate:
+            self.truncate_table()
+
+        # Progress is recorded right after each commit; if the process dies
+        # in between, at most one chunk is loaded twice on resume
+        for chunk in self.read_csv_chunks(skip=rows):
+            with engine.begin() as connection:
+                self.load_frame(connection, chunk, offset=rows)
+            rows += len(chunk)
+            self.write_ingest_progress(rows)
+            self.log(f"📦 Committed {rows} rows from {self.csv_path}")
+
+        if os.path.exists(self.progress_path):
+            os.remove(self.progress_path)
+        self.log(f"🚀 Inserted {rows} rows into {self.full_table}")
+
+    def run(self, records=None):
+        if records is None and self.stream and not self.is_columnar():
+            self.stream_into_table()
+            return
 
-    def run(self):
-        self.load_csv()
+        if records is not None:
+            self.load_records(records)
+        else:
+            self.load_file()
         if self.truncate:
             self.truncate_table()
         self.insert_into_table()
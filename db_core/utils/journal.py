@@ -0,0 +1,152 @@
+import os
+import sqlite3
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS export_run (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    output_path TEXT NOT NULL,
+    committed_offset INTEGER NOT NULL,
+    committed_rows INTEGER NOT NULL,
+    started_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS export_unit (
+    unit_id INTEGER PRIMARY KEY,
+    name TEXT,
+    status TEXT NOT NULL DEFAULT 'running',
+    cursor INTEGER,
+    rows INTEGER NOT NULL DEFAULT 0,
+    batches INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at TEXT
+);
+"""
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+class ProgressJournal:
+    """
+    A crash-safe SQLite journal of an in-progress export.
+
+    For the export file being written it records how many bytes and rows are
+    committed, and for every channel and thread:
+    - its pagination cursor (the newest message ID written)
+    - how many rows and batches it has written
+    - whether it finished, or failed and how often
+
+    CsvMessageSink records each batch here right after the batch is on disk,
+    and the file offset, row count and cursor all change in one SQLite
+    transaction. A restarted run truncates the `.part` file back to the
+    journal's offset, so file and journal always agree, then continues every
+    unit from its cursor and skips units that already finished. Recovery
+    only re-fetches what was lost, without re-reading the partial file.
+
+    The journal belongs to one export and is cleared once it's committed.
+    """
+
+    def __init__(self, path: str = os.path.join("state", "progress.sqlite")):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def run(self) -> Optional[Tuple[str, int, int]]:
+        """Return (output_path, committed_offset, committed_rows) of the open export, if any."""
+        return self.db.execute(
+            "SELECT output_path, committed_offset, committed_rows FROM export_run WHERE id = 1"
+        ).fetchone()
+
+    def start(self, output_path: str, offset: int, rows: int = 0,
+              cursors: Optional[Dict[int, int]] = None) -> None:
+        """Start journaling a new export (forgetting any previous one)."""
+        with self.db:
+            self.db.execute("DELETE FROM export_unit")
+            self.db.execute("DELETE FROM export_run")
+            self.db.execute(
+                "INSERT INTO export_run (id, output_path, committed_offset, committed_rows, started_at) "
+                "VALUES (1, ?, ?, ?, ?)",
+                (output_path, offset, rows, _now())
+            )
+            self.db.executemany(
+                "INSERT INTO export_unit (unit_id, cursor, updated_at) VALUES (?, ?, ?)",
+                [(unit_id, cursor, _now()) for unit_id, cursor in (cursors or {}).items()]
+            )
+
+    def cursors(self) -> Dict[int, int]:
+        """Newest message ID written per channel and thread."""
+        rows = self.db.execute("SELECT unit_id, cursor FROM export_unit WHERE cursor IS NOT NULL")
+        return {unit_id: cursor for unit_id, cursor in rows}
+
+    def record_batch(self, offset: int, rows: int, units: Dict[int, Tuple[int, int]]) -> None:
+        """
+        Record a batch that is now on disk.
+
+        Args:
+            offset: The file's committed size in bytes.
+            rows: Total rows in the file.
+            units: {unit_id: (newest message ID, rows in this batch)}.
+        """
+        now = _now()
+        with self.db:
+            self.db.execute(
+                "UPDATE export_run SET committed_offset = ?, committed_rows = ? WHERE id = 1",
+                (offset, rows)
+            )
+            for unit_id, (cursor, unit_rows) in units.items():
+                self.db.execute(
+                    """
+                    INSERT INTO export_unit (unit_id, cursor, rows, batches, updated_at)
+                    VALUES (?, ?, ?, 1, ?)
+                    ON CONFLICT (unit_id) DO UPDATE SET
+                        cursor = MAX(COALESCE(cursor, 0), excluded.cursor),
+                        rows = rows + excluded.rows,
+                        batches = batches + 1,
+                        updated_at = excluded.updated_at
+                    """,
+                    (unit_id, cursor, unit_rows, now)
+                )
+
+    def is_done(self, unit_id: int) -> bool:
+        row = self.db.execute("SELECT status FROM export_unit WHERE unit_id = ?", (unit_id,)).fetchone()
+        return row is not None and row[0] == "done"
+
+    def mark_done(self, unit_id: int, name: Optional[str] = None) -> None:
+        self._set_status(unit_id, "done", name)
+
+    def mark_failed(self, unit_id: int, error: str, name: Optional[str] = None) -> None:
+        self._set_status(unit_id, "failed", name, error)
+
+    def _set_status(self, unit_id: int, status: str, name: Optional[str], error: Optional[str] = None) -> None:
+        with self.db:
+            self.db.execute(
+                """
+                INSERT INTO export_unit (unit_id, name, status, attempts, last_error, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (unit_id) DO UPDATE SET
+                    name = COALESCE(excluded.name, name),
+                    status = excluded.status,
+                    attempts = attempts + excluded.attempts,
+                    last_error = excluded.last_error,
+                    updated_at = excluded.updated_at
+                """,
+                (unit_id, name, status, 1 if status == "failed" else 0, error, _now())
+            )
+
+    def summary(self) -> Dict[str, int]:
+        """Number of units per status."""
+        return dict(self.db.execute("SELECT status, COUNT(*) FROM export_unit GROUP BY status"))
+
+    def clear(self) -> None:
+        """Forget the export once it has been committed."""
+        with self.db:
+            self.db.execute("DELETE FROM export_unit")
+            self.db.execute("DELETE FROM export_run")
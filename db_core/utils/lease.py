@@ -0,0 +1,119 @@
+import os
+import socket
+import sqlite3
+import asyncio
+from contextlib import closing
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lease (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+class LeaseHeld(Exception):
+    """Another scheduler (or a run started by hand) holds the pipeline lease."""
+
+class LeaseLost(LeaseHeld):
+    """The lease expired during a run and another process took it; the run was cancelled."""
+
+class Lease:
+    """
+    A lease on the pipeline, so two runs never overlap.
+
+    The lease is a row in a SQLite file, taken in an IMMEDIATE transaction so
+    only one process can check and claim it at a time. It expires `ttl`
+    seconds after it was last renewed, so a crashed holder can't block runs
+    forever; a live holder renews it in the background (see `hold()`).
+    Every process sharing the `state/` directory, and so the export files,
+    sees the same lease.
+    """
+
+    def __init__(self, path: str = os.path.join("state", "scheduler.sqlite"), name: str = "pipeline",
+                 ttl: float = 600.0):
+        self.path = path
+        self.name = name
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        # Set while hold() runs, so a nested hold() doesn't take (and release) the lease again
+        self.held = False
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as db:
+            db.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def acquire(self) -> bool:
+        """Take (or renew) the lease; returns False if someone else holds it."""
+        now = _now().timestamp()
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT owner, expires_at FROM lease WHERE name = ?", (self.name,)).fetchone()
+            if row is not None and row[0] != self.owner and row[1] > now:
+                db.execute("ROLLBACK")
+                return False
+            db.execute(
+                "INSERT INTO lease (name, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at",
+                (self.name, self.owner, now + self.ttl)
+            )
+            db.execute("COMMIT")
+            return True
+
+    def release(self) -> None:
+        with closing(self._connect()) as db:
+            db.execute("DELETE FROM lease WHERE name = ? AND owner = ?", (self.name, self.owner))
+
+    def holder(self) -> Optional[str]:
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT owner, expires_at FROM lease WHERE name = ?", (self.name,)).fetchone()
+        return row[0] if row is not None and row[1] > _now().timestamp() else None
+
+    async def hold(self, action: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run `action()` while holding the lease, renewing it every third of its TTL.
+
+        Raises LeaseHeld without running anything if the lease is taken. If
+        a renewal finds the lease taken by another process (ours expired,
+        e.g. while the event loop was blocked), `action()` is cancelled and
+        LeaseLost is raised, so the two runs don't go on side by side.
+        Inside `action()`, holding the same lease again just runs the inner
+        action.
+        """
+        if self.held:
+            return await action()
+        if not await asyncio.to_thread(self.acquire):
+            raise LeaseHeld(f"{self.name} is held by {self.holder()}")
+
+        self.held = True
+        task = asyncio.ensure_future(action())
+        lost = asyncio.Event()
+
+        async def renew():
+            while True:
+                await asyncio.sleep(self.ttl / 3)
+                if not await asyncio.to_thread(self.acquire):
+                    print(f"⚠️ Lost the {self.name} lease to {self.holder()}; cancelling the run")
+                    lost.set()
+                    task.cancel()
+                    return
+
+        renewer = asyncio.create_task(renew())
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if not lost.is_set():
+                raise
+            raise LeaseLost(f"{self.name} was taken by another run") from None
+        finally:
+            self.held = False
+            renewer.cancel()
+            await asyncio.gather(renewer, return_exceptions=True)
+            await asyncio.to_thread(self.release)
@@ -3,4 +3,34 @@ import yaml
 def load_manifest(manifest_path):
     with open(manifest_path, 'r') as file:
         scripts = yaml.safe_load(file)
-    return scripts
+    return scripts or []
+
+def load_manifest_entries(manifest_path):
+    """
+    Load a manifest as a list of {"path", "depends_on", "always_run",
+    "materialized", "sources"} entries.
+
+    Entries can be plain paths or mappings with an optional `depends_on`
+    list and `always_run` flag. `depends_on` is None when it isn't given,
+    meaning "after the previous entry" (the original list-order behaviour).
+    `always_run` scripts are executed on every deploy even when unchanged.
+    `materialized` names the materialized view a script creates, and
+    `sources` the tables it reads, which decide when it's refreshed.
+    """
+    entries = []
+    for script in load_manifest(manifest_path):
+        if isinstance(script, str):
+            entries.append({"path": script, "depends_on": None, "always_run": False,
+                            "materialized": None, "sources": []})
+        else:
+            depends_on = script.get("depends_on")
+            if script.get("materialized") and not script.get("sources"):
+                raise ValueError(f"{script['path']}: materialized views must list their `sources`")
+            entries.append({
+                "path": script["path"],
+                "depends_on": list(depends_on) if depends_on is not None else None,
+                "always_run": bool(script.get("always_run", False)),
+                "materialized": script.get("materialized"),
+                "sources": list(script.get("sources") or []),
+            })
+    return entries
@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# The span code runs in, so spans opened in tasks and worker threads started
+# from it (asyncio tasks and to_thread copy the context) record it as parent
+_current_span: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_span", default=None)
+
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+def _key(name: str, labels: Dict[str, Any]) -> Key:
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+def _escape(label_value: str) -> str:
+    return label_value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Metrics:
+    """
+    Counters, timings and trace spans for a pipeline run.
+
+    - `count(name, value, **labels)` adds to a counter, e.g. API requests or
+      rows loaded per table
+    - `observe(name, seconds, **labels)` adds a duration to a timing, which
+      keeps its count, total and maximum
+    - `span(name, **attributes)` times a block of work as an `observe()`
+      under the same name, and writes it to the log as one JSON line with
+      its trace, span and parent span IDs, duration and status
+    - `event(name, **fields)` writes any other JSON line to the log
+
+    The log (`log_path`, default METRICS_LOG or state/metrics.jsonl; empty
+    to turn it off) is appended to, one run after another, so runs can be
+    compared. `flush()` logs a summary of every counter and timing and, with
+    `prometheus_path` (METRICS_PROMETHEUS) set, writes them in Prometheus'
+    text format, e.g. for node_exporter's textfile collector.
+
+    Labels should have few values (a stage, a channel, a SQL file), since
+    every combination is kept until `reset()`.
+    """
+
+    PREFIX = "discord_etl"
+
+    def __init__(self, log_path: Optional[str] = None, prometheus_path: Optional[str] = None):
+        self.log_path = log_path if log_path is not None else os.getenv(
+            "METRICS_LOG", os.path.join("state", "metrics.jsonl"))
+        self.prometheus_path = prometheus_path if prometheus_path is not None else os.getenv(
+            "METRICS_PROMETHEUS", "")
+        self.lock = threading.Lock()
+        self._log_file = None
+        self.reset()
+
+    def reset(self) -> None:
+        """Start a new run: a new trace ID and empty counters and timings."""
+        with self.lock:
+            self.trace_id = uuid.uuid4().hex
+            self.counters: Dict[Key, float] = {}
+            # [count, total seconds, max seconds]
+            self.timings: Dict[Key, list] = {}
+
+    def count(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        key = _key(name, labels)
+        with self.lock:
+            timing = self.timings.setdefault(key, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Time the enclosed block and log it as a span.
+
+        Yields the span's attributes, so the block can add results such as
+        a message count. Only `labels` (a dict) are used as labels of the
+        timing; everything else is only logged.
+        """
+        labels = attributes.pop("labels", {})
+        span_id = uuid.uuid4().hex[:16]
+        parent_id = _current_span.get()
+        token = _current_span.set(span_id)
+        status = "ok"
+        start_time = time.time()
+        start = time.perf_counter()
+        try:
+            yield attributes
+        except BaseException as e:
+            status = "error"
+            attributes["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_span.reset(token)
+            self.observe(name, elapsed, **labels)
+            self._write({
+                "type": "span", "name": name, "trace_id": self.trace_id, "span_id": span_id,
+                "parent_id": parent_id, "start": start_time, "seconds": round(elapsed, 6),
+                "status": status, **labels, **attributes,
+            })
+
+    def event(self, name: str, **fields: Any) -> None:
+        self._write({"type": "event", "name": name, "trace_id": self.trace_id,
+                     "span_id": _current_span.get(), "time": time.time(), **fields})
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        if not self.log_path:
+            return
+        line = json.dumps(record, default=str)
+        with self.lock:
+            if self._log_file is None:
+                os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+                self._log_file = open(self.log_path, "a", encoding="utf-8", buffering=1)
+            self._log_file.write(line + "\n")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Every counter and timing, as JSON-friendly lists."""
+        with self.lock:
+            return {
+                "counters": [{"name": name, **dict(labels), "value": value}
+                             for (name, labels), value in sorted(self.counters.items())],
+                "timings": [{"name": name, **dict(labels), "count": count,
+                             "seconds": round(total, 6), "max_seconds": round(longest, 6)}
+                            for (name, labels), (count, total, longest) in sorted(self.timings.items())],
+            }
+
+    def flush(self) -> None:
+        """Log a summary of the run and write the Prometheus file, if configured."""
+        self.event("summary", **self.snapshot())
+        if self.prometheus_path:
+            self.write_prometheus(self.prometheus_path)
+
+    def write_prometheus(self, path: str) -> None:
+        """Write counters and timings atomically in Prometheus' text exposition format."""
+        def series(name: str, labels: Tuple[Tuple[str, str], ...], value: float) -> str:
+            if not labels:
+                return f"{name} {value}"
+            pairs = ",".join(f'{label}="{_escape(label_value)}"' for label, label_value in labels)
+            return f"{name}{{{pairs}}} {value}"
+
+        lines = []
+        with self.lock:
+            for name in sorted({name for name, _ in self.counters}):
+                metric = f"{self.PREFIX}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines += [series(metric, labels, value)
+                          for (name_, labels), value in sorted(self.counters.items()) if name_ == name]
+            for name in sorted({name for name, _ in self.timings}):
+                metric = f"{self.PREFIX}_{name}_seconds"
+                lines.append(f"# TYPE {metric} summary")
+                for (name_, labels), (count, total, longest) in sorted(self.timings.items()):
+                    if name_ == name:
+                        lines.append(series(f"{metric}_count", labels, count))
+                        lines.append(series(f"{metric}_sum", labels, round(total, 6)))
+                lines.append(f"# TYPE {metric}_max gauge")
+                lines += [series(f"{metric}_max", labels, round(longest, 6))
+                          for (name_, labels), (_, _, longest) in sorted(self.timings.items()) if name_ == name]
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+
+# Shared by every module in the process
+metrics = Metrics()
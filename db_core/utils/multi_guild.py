@@ -0,0 +1,94 @@
+import os
+import asyncio
+from typing import Any, Dict, List, Optional
+from utils.extractor import DiscordExtractor
+from utils.metrics import metrics
+
+def guild_ids_from_env() -> List[int]:
+    """The guilds listed in EXTRACT_GUILD_IDS (comma separated), or TEST_SERVER_ID."""
+    value = os.getenv("EXTRACT_GUILD_IDS") or os.getenv("TEST_SERVER_ID", "")
+    return [int(guild_id) for guild_id in value.replace(" ", "").split(",") if guild_id]
+
+class MultiGuildExtractor:
+    """
+    Exports the history of several guilds at once, on one bot connection.
+
+    Every guild gets its own DiscordExtractor, writing to
+    `<output_dir>/guild_<id>/` with its state (checkpoints, journal, thread
+    index) in `<state_dir>/guild_<id>/`, so guilds resume and advance
+    independently. Their exports run as concurrent tasks on one gateway
+    client or REST session (see DiscordExtractor.with_guilds):
+    - Message history is rate limited per channel, and channels never
+      belong to two guilds, so guilds never wait on each other's buckets
+    - The bot token's global limit is shared: discord.py's HTTP client and
+      RestClient both account for it across every request they send
+
+    So aggregate throughput grows with the number of guilds until the
+    token's global limit is reached, instead of guilds running back to back.
+    Exports are I/O bound, so tasks are enough; separate processes would
+    each need a login and would have to share the global limit across
+    process boundaries.
+
+    A guild that fails doesn't stop the others; its result is None, and
+    running again resumes it from its journal.
+    """
+
+    def __init__(self, guild_ids: List[int], max_guilds: Optional[int] = None, output_dir: str = "csv_files",
+                 state_dir: str = "state", **extractor_options: Any):
+        """
+        Args:
+            guild_ids: The guilds to export.
+            max_guilds: Guilds exported at the same time. Defaults to the
+                EXTRACT_GUILD_CONCURRENCY environment variable, or all of them.
+            output_dir: Parent directory of the per-guild output directories.
+            state_dir: Parent directory of the per-guild state directories.
+            extractor_options: Passed to every guild's DiscordExtractor
+                (backend, max_concurrency, incremental, ...).
+        """
+        if not guild_ids:
+            raise ValueError("No guilds to export; set EXTRACT_GUILD_IDS or pass guild IDs")
+        self.guild_ids = list(dict.fromkeys(guild_ids))
+        self.max_guilds = max_guilds or int(os.getenv("EXTRACT_GUILD_CONCURRENCY", "0")) or len(self.guild_ids)
+        self.extractors: Dict[int, DiscordExtractor] = {
+            guild_id: DiscordExtractor(
+                guild_id=guild_id,
+                output_dir=os.path.join(output_dir, f"guild_{guild_id}"),
+                state_dir=os.path.join(state_dir, f"guild_{guild_id}"),
+                **extractor_options
+            )
+            for guild_id in self.guild_ids
+        }
+
+    async def export_guilds(self, guilds: Dict[int, Any]) -> Dict[int, Optional[str]]:
+        """
+        Export every guild in `guilds` ({guild ID: guild, or None if not found}) concurrently.
+
+        Returns:
+            Each guild's written file, or None if it wasn't found or didn't complete.
+        """
+        limit = asyncio.Semaphore(self.max_guilds)
+
+        async def export(guild_id):
+            guild = guilds.get(guild_id)
+            if guild is None:
+                print(f"❌ Guild ID {guild_id} not found.")
+                return None
+            async with limit:
+                print(f"🏰 Exporting guild {guild.name} ({guild_id})...")
+                try:
+                    with metrics.span("export_guild", labels={"guild": guild_id}):
+                        return await self.extractors[guild_id].export_guild_history(guild)
+                except Exception as e:
+                    print(f"❌ Error exporting guild {guild_id}: {e}")
+                    return None
+
+        paths = await asyncio.gather(*(export(guild_id) for guild_id in self.guild_ids))
+        return dict(zip(self.guild_ids, paths))
+
+    async def run(self) -> Dict[int, Optional[str]]:
+        """Connect to Discord once, export every guild, then disconnect."""
+        connection = self.extractors[self.guild_ids[0]]
+        results = await connection.with_guilds(self.guild_ids, self.export_guilds)
+        done = sum(path is not None for path in results.values())
+        print(f"✅ Exported {done} of {len(results)} guilds")
+        return results
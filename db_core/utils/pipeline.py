@@ -0,0 +1,180 @@
+import time
+import asyncio
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from utils.extractor import DiscordExtractor
+from utils.lease import Lease
+from utils.metrics import metrics
+from utils.transform import enrich_messages
+
+@dataclass
+class PipelineContext:
+    """
+    State shared by the stages of one pipeline run.
+
+    Stages hand data to each other through the context instead of through
+    files and separate processes: channel discovery fills `channel_ids`, the
+    history export sets `export_path`, and so on. Every database stage uses
+    the process-wide engine from `config.db_config`, so connections are pooled
+    across stages.
+    """
+    extractor: DiscordExtractor
+    guild: Any
+    channel_ids: Optional[List[int]] = None
+    export_path: Optional[str] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+class Stage(ABC):
+    """One step of the pipeline."""
+    name = "stage"
+
+    @abstractmethod
+    async def run(self, context: PipelineContext) -> None:
+        """Do the stage's work, reading and handing on data through `context`."""
+
+@dataclass
+class ChannelDiscoveryStage(Stage):
+    """List the guild's text channels (and write channels.csv)."""
+    name: str = "channel discovery"
+
+    async def run(self, context: PipelineContext) -> None:
+        channels = context.extractor.export_guild_channels(context.guild)
+        context.channel_ids = [channel["channel_id"] for channel in channels]
+
+@dataclass
+class HistoryExportStage(Stage):
+    """Export the history of the discovered channels."""
+    name: str = "history export"
+
+    async def run(self, context: PipelineContext) -> None:
+        context.export_path = await context.extractor.export_guild_history(context.guild, context.channel_ids)
+        if context.export_path is None:
+            raise RuntimeError("History export did not complete; re-run to resume it")
+
+@dataclass
+class BronzeIngestStage(Stage):
+    """
+    Load the exported messages into bronze, merging on `merge_key`.
+
+    Each chunk goes through `transform` on its way in, enrich_messages by
+    default, so mentions, links, emoji and lengths are derived once here
+    instead of in every downstream query. None loads the export as is.
+    """
+    table_name: str = "chat_raw"
+    schema: str = "bronze"
+    merge_key: Optional[str] = "message_id"
+    transform: Optional[Callable[[Any], Any]] = enrich_messages
+    name: str = "bronze ingest"
+
+    async def run(self, context: PipelineContext) -> None:
+        from utils.ingestor import BronzeIngestor
+        ingestor = BronzeIngestor(
+            context.export_path,
+            self.table_name,
+            schema=self.schema,
+            stream=True,
+            merge_key=self.merge_key,
+            transform=self.transform
+        )
+        # Database work blocks, so run it off the event loop to keep the
+        # Discord gateway heartbeat alive
+        await asyncio.to_thread(ingestor.run)
+
+@dataclass
+class DeployLayersStage(Stage):
+    """Deploy SQL layers; unchanged scripts are skipped by the runner."""
+    layers: List[str] = field(default_factory=lambda: ["bronze", "silver", "gold"])
+    name: str = "layer deploy"
+
+    async def run(self, context: PipelineContext) -> None:
+        from utils.deploy import deploy_layers
+        await asyncio.to_thread(deploy_layers, self.layers)
+
+@dataclass
+class SearchIndexStage(Stage):
+    """Add the messages the silver load changed to the local similarity index."""
+    name: str = "search index"
+
+    async def run(self, context: PipelineContext) -> None:
+        from database.search import ChatSearch
+        await asyncio.to_thread(lambda: ChatSearch().sync())
+
+def default_stages() -> List[Stage]:
+    """The weekly job: discover, export, create bronze, ingest, build silver and gold, then index."""
+    return [
+        ChannelDiscoveryStage(),
+        HistoryExportStage(),
+        DeployLayersStage(layers=["bronze"], name="bronze deploy"),
+        BronzeIngestStage(),
+        DeployLayersStage(layers=["silver", "gold"], name="silver/gold deploy"),
+        SearchIndexStage(),
+    ]
+
+class Pipeline:
+    """
+    Runs every stage in one process, on one Discord connection.
+
+    The extractor connects once (gateway or REST backend) and every stage
+    works on the same guild object, so there's no interpreter start-up,
+    re-import or second login between stages.
+
+    Each run is traced with utils.metrics: one span for the run and one per
+    stage, with the stages' own spans and counters nested inside.
+
+    `run()` holds the pipeline Lease, so it never overlaps a scheduled run or
+    another run started by hand on the same `state/` directory.
+    """
+
+    def __init__(self, stages: Optional[List[Stage]] = None, extractor: Optional[DiscordExtractor] = None,
+                 lease: Optional[Lease] = None):
+        self.stages = stages if stages is not None else default_stages()
+        self.extractor = extractor or DiscordExtractor()
+        self.lease = lease or Lease()
+        self.context: Optional[PipelineContext] = None
+
+    async def run_on_guild(self, guild, context: Optional[PipelineContext] = None) -> PipelineContext:
+        """
+        Run every stage against an already available guild.
+
+        Given the context of a run that failed part-way, only the stages that
+        didn't finish are run, picking up the data the earlier ones handed on.
+        """
+        if context is None:
+            context = PipelineContext(extractor=self.extractor, guild=guild)
+            metrics.reset()
+        context.guild = guild
+        # Kept so a caller can resume the run if a stage fails
+        self.context = context
+        started = time.perf_counter()
+
+        try:
+            with metrics.span("pipeline", backend=self.extractor.backend):
+                for stage in self.stages:
+                    if stage.name in context.timings:
+                        print(f"⏭️ {stage.name} already done")
+                        continue
+                    print(f"▶️ {stage.name}…")
+                    start = time.perf_counter()
+                    with metrics.span("stage", labels={"stage": stage.name}):
+                        await stage.run(context)
+                    context.timings[stage.name] = time.perf_counter() - start
+                    print(f"✅ {stage.name} done ({context.timings[stage.name]:.2f}s)")
+        finally:
+            # Also after a failure, so the stages that ran are still on record
+            metrics.flush()
+
+        print(f"⏱️ Pipeline finished in {time.perf_counter() - started:.2f}s:")
+        for name, elapsed in context.timings.items():
+            print(f"   {elapsed:7.2f}s  {name}")
+        return context
+
+    async def run(self, context: Optional[PipelineContext] = None) -> Optional[PipelineContext]:
+        """
+        Connect to Discord, run every stage (or those `context` hasn't finished), then disconnect.
+
+        Raises LeaseHeld if another run holds the lease, and LeaseLost if it
+        is taken over while this run is going.
+        """
+        return await self.lease.hold(
+            lambda: self.extractor.with_guild(lambda guild: self.run_on_guild(guild, context)))
@@ -0,0 +1,88 @@
+import sys
+from datetime import datetime, timezone
+from typing import Any, Optional, Tuple
+
+# Discord's epoch (2015-01-01) in milliseconds
+DISCORD_EPOCH = 1420070400000
+
+# Discord's message type for replies; pins, crossposts and thread starters
+# also carry a message reference, but aren't replies
+REPLY_MESSAGE_TYPE = 19
+
+def snowflake_time(snowflake: int) -> datetime:
+    """Return the UTC creation time encoded in a Discord snowflake ID."""
+    return datetime.fromtimestamp(((snowflake >> 22) + DISCORD_EPOCH) / 1000, tz=timezone.utc)
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+def reply_to_id(msg: Any) -> Optional[int]:
+    """ID of the message `msg` replies to, or None if it isn't a reply."""
+    # discord.py's message type is an enum, the REST backend's a plain int
+    if msg.reference is None or int(getattr(msg.type, "value", msg.type)) != REPLY_MESSAGE_TYPE:
+        return None
+    return msg.reference.message_id
+
+class MessageRecord:
+    """
+    A compact record for one exported Discord message.
+
+    Replaces the per-message dict used by the extractor:
+    - `__slots__` removes the per-instance `__dict__`
+    - Channel, thread and author names are interned, so every message in a
+      channel points at one shared string instead of its own copy
+    - `created_at` isn't stored: Discord encodes a message's creation time in
+      its snowflake ID, so it is derived from `message_id` on demand
+    """
+
+    __slots__ = ("guild_id", "channel_name", "channel_id", "thread_name", "thread_id",
+                 "message_id", "reply_to_id", "author", "chat_text")
+
+    # Column order used by the CSV sink and BronzeIngestor
+    FIELDS = ("guild_id", "channel_name", "channel_id", "thread_name", "thread_id",
+              "message_id", "reply_to_id", "author", "chat_text", "created_at")
+
+    # 64-bit snowflake columns, which must never be read back as floats
+    ID_FIELDS = ("guild_id", "channel_id", "thread_id", "message_id", "reply_to_id")
+
+    def __init__(self, channel_name: str, channel_id: int, thread_name: Optional[str],
+                 thread_id: Optional[int], message_id: int, author: str, chat_text: str,
+                 guild_id: Optional[int] = None, reply_to_id: Optional[int] = None):
+        self.guild_id = guild_id
+        self.reply_to_id = reply_to_id
+        self.channel_name = _intern(channel_name)
+        self.channel_id = channel_id
+        self.thread_name = _intern(thread_name)
+        self.thread_id = thread_id
+        self.message_id = message_id
+        self.author = _intern(author)
+        self.chat_text = chat_text
+
+    @classmethod
+    def from_message(cls, channel: Any, thread: Any, msg: Any) -> "MessageRecord":
+        """Build a record from a discord.py message, its channel and (optional) thread."""
+        return cls(
+            channel.name,
+            channel.id,
+            thread.name if thread is not None else None,
+            thread.id if thread is not None else None,
+            msg.id,
+            msg.author.name,
+            msg.content,
+            channel.guild.id,
+            reply_to_id(msg),
+        )
+
+    @property
+    def unit_id(self) -> int:
+        """ID of the channel or thread the message was read from."""
+        return self.thread_id or self.channel_id
+
+    @property
+    def created_at(self) -> str:
+        return snowflake_time(self.message_id).isoformat()
+
+    def as_row(self) -> Tuple[Any, ...]:
+        """Return the record's values in `FIELDS` order."""
+        return (self.guild_id, self.channel_name, self.channel_id, self.thread_name, self.thread_id,
+                self.message_id, self.reply_to_id, self.author, self.chat_text, self.created_at)
@@ -0,0 +1,190 @@
+import json
+import time
+from config.db_config import engine
+from sqlalchemy import text
+from utils.metrics import metrics
+
+# Change tracking for the tables materialized views read: a statement trigger
+# bumps a table's version whenever a statement actually changes rows in it,
+# and every refresh records the versions it saw
+CHANGE_TRACKING_DDL = """
+CREATE SCHEMA IF NOT EXISTS meta;
+
+CREATE TABLE IF NOT EXISTS meta.table_versions (
+    table_name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS meta.refreshed_views (
+    view_name TEXT PRIMARY KEY,
+    source_versions JSONB NOT NULL,
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE OR REPLACE FUNCTION meta.bump_table_version() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- Statement triggers also fire for statements that changed nothing
+    -- (e.g. a load with no new rows), so look at the transition table first
+    IF TG_OP = 'TRUNCATE' THEN
+        NULL;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM 1 FROM changed_old LIMIT 1;
+        IF NOT FOUND THEN
+            RETURN NULL;
+        END IF;
+    ELSE
+        PERFORM 1 FROM changed_new LIMIT 1;
+        IF NOT FOUND THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+
+    INSERT INTO meta.table_versions (table_name, version)
+    VALUES (TG_TABLE_SCHEMA || '.' || TG_TABLE_NAME, 1)
+    ON CONFLICT (table_name) DO UPDATE SET
+        version = meta.table_versions.version + 1,
+        changed_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END $$;
+"""
+
+# (trigger name suffix, event, transition table)
+TRIGGERS = (
+    ("insert", "INSERT", "NEW TABLE AS changed_new"),
+    ("update", "UPDATE", "NEW TABLE AS changed_new"),
+    ("delete", "DELETE", "OLD TABLE AS changed_old"),
+    ("truncate", "TRUNCATE", None),
+)
+
+def materialized_views(manifest_paths):
+    """Return [(path, view, sources)] for every materialized entry in the manifests, in order."""
+    from utils.manifest_loader import load_manifest_entries
+
+    views = []
+    for manifest_path in manifest_paths:
+        for entry in load_manifest_entries(manifest_path):
+            if entry["materialized"]:
+                views.append((entry["path"], entry["materialized"], entry["sources"]))
+    return views
+
+def ensure_change_tracking(conn, sources):
+    """
+    Create the version table and install the version triggers on each source table.
+
+    Sources that don't exist (yet) are skipped with a warning; their views'
+    scripts fail in that case anyway, and the triggers are installed by the
+    first deploy after the table is created.
+    """
+    conn.execute(text(CHANGE_TRACKING_DDL))
+    for source in sources:
+        if conn.execute(text("SELECT to_regclass(:source)"), {"source": source}).scalar() is None:
+            print(f"⚠️ Not tracking changes to {source}: table doesn't exist")
+            continue
+        table_name = source.split(".")[-1]
+        for suffix, event, transition in TRIGGERS:
+            trigger = f"{table_name}_version_{suffix}"
+            exists = conn.execute(text(
+                "SELECT 1 FROM pg_trigger WHERE tgrelid = to_regclass(:source) AND tgname = :trigger"
+            ), {"source": source, "trigger": trigger}).first()
+            if exists:
+                continue
+            referencing = f"REFERENCING {transition}" if transition else ""
+            conn.execute(text(f"""
+                CREATE TRIGGER {trigger}
+                AFTER {event} ON {source} {referencing}
+                FOR EACH STATEMENT EXECUTE FUNCTION meta.bump_table_version()
+            """))
+
+def source_versions(conn, sources):
+    """Return {source: version} (0 for sources that haven't changed since tracking began)."""
+    rows = conn.execute(text(
+        "SELECT table_name, version FROM meta.table_versions WHERE table_name = ANY(:sources)"
+    ), {"sources": list(sources)})
+    versions = {source: 0 for source in sources}
+    versions.update({table_name: version for table_name, version in rows})
+    return versions
+
+def refreshed_versions(conn, view):
+    row = conn.execute(text(
+        "SELECT source_versions FROM meta.refreshed_views WHERE view_name = :view"
+    ), {"view": view}).first()
+    if row is None:
+        return None
+    return row[0] if isinstance(row[0], dict) else json.loads(row[0])
+
+def is_populated(conn, view):
+    """Whether the materialized view holds data (False once created WITH NO DATA, until refreshed)."""
+    schema, name = view.split(".")
+    return bool(conn.execute(text(
+        "SELECT ispopulated FROM pg_matviews WHERE schemaname = :schema AND matviewname = :name"
+    ), {"schema": schema, "name": name}).scalar())
+
+def refresh_materialized_views(views, dry_run=False):
+    """
+    Refresh the materialized views whose source tables changed since their last refresh.
+
+    Views are created WITH NO DATA, so a view rebuilt by this deploy is
+    populated here exactly once, after the silver loads, with a plain
+    REFRESH MATERIALIZED VIEW. Other views are refreshed when they have
+    never been refreshed by this tool, when the version of any of their
+    source tables differs from the one recorded at their last refresh, or
+    when one of their sources is a view refreshed earlier in this pass.
+    Those refreshes use REFRESH MATERIALIZED VIEW CONCURRENTLY, so bots can
+    keep reading the old contents meanwhile; every materialized view needs
+    a unique index.
+
+    Args:
+        views: [(path, view, sources)] in dependency order (see materialized_views).
+        dry_run: Only print which views would be refreshed.
+    Returns:
+        Each refreshed view's refresh time in seconds.
+    """
+    if not views:
+        return {}
+
+    timings, refreshed = {}, set()
+    if dry_run:
+        print("📋 Materialized views are refreshed after the deploy if their sources changed:")
+        for _, view, sources in views:
+            print(f"   {view} (sources: {', '.join(sources)})")
+        return timings
+
+    tables = sorted({source for _, _, sources in views for source in sources} - {view for _, view, _ in views})
+    with engine.begin() as conn:
+        ensure_change_tracking(conn, tables)
+
+    for _, view, sources in views:
+        with engine.begin() as conn:
+            current = source_versions(conn, [s for s in sources if s in tables])
+            previous = refreshed_versions(conn, view)
+            # CONCURRENTLY needs existing contents to diff against
+            concurrently = is_populated(conn, view)
+            if not concurrently:
+                reason = "created"
+            elif previous is None:
+                reason = "never refreshed"
+            elif refreshed & set(sources):
+                reason = "source view refreshed"
+            elif previous != current:
+                reason = "sources changed"
+            else:
+                print(f"⏭️ Skipped refresh: {view} (sources unchanged)")
+                metrics.count("view_refreshes_skipped")
+                continue
+
+            start = time.perf_counter()
+            with metrics.span("view_refresh", labels={"view": view}, reason=reason):
+                conn.execute(text(f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if concurrently else ''}{view}"))
+            conn.execute(text("""
+                INSERT INTO meta.refreshed_views (view_name, source_versions, refreshed_at)
+                VALUES (:view, CAST(:versions AS JSONB), CURRENT_TIMESTAMP)
+                ON CONFLICT (view_name) DO UPDATE SET
+                    source_versions = EXCLUDED.source_versions,
+                    refreshed_at = EXCLUDED.refreshed_at
+            """), {"view": view, "versions": json.dumps(current)})
+            timings[view] = time.perf_counter() - start
+            refreshed.add(view)
+            print(f"🔄 Refreshed {view} ({reason}, {timings[view]:.2f}s)")
+    return timings
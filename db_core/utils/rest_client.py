@@ -0,0 +1,347 @@
+import os
+import re
+import time
+import asyncio
+import aiohttp
+from collections import deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+from utils.records import snowflake_time
+from utils.metrics import metrics
+
+API_BASE = "https://discord.com/api/v10"
+
+# Discord returns at most 100 messages (or archived threads) per request
+PAGE_SIZE = 100
+
+# Channel types exported as text channels: GUILD_TEXT and GUILD_ANNOUNCEMENT,
+# the two types discord.py exposes as TextChannel
+TEXT_CHANNEL_TYPES = (0, 5)
+
+# Snowflake IDs in a path, replaced to label metrics by endpoint rather than by channel
+SNOWFLAKE = re.compile(r"/\d+")
+
+class RestError(Exception):
+    """A Discord REST request that failed with a non-retryable status."""
+
+    def __init__(self, status: int, path: str, message: str):
+        super().__init__(f"{status} on {path}: {message}")
+        self.status = status
+        self.path = path
+
+class RestClient:
+    """
+    A minimal Discord REST client for exports, without a gateway connection.
+
+    The gateway client has to open a websocket, identify, and wait for the
+    guild cache before the first history request. Exports only need a handful
+    of REST endpoints, so this client calls them directly over one pooled
+    keep-alive `aiohttp` session.
+
+    Rate limits follow Discord's headers:
+    - `X-RateLimit-Remaining` / `X-RateLimit-Reset-After` are tracked per
+      route (history routes include the channel ID, so each channel and
+      thread has its own limit). Every request takes one of the route's
+      remaining requests; once none are left, requests wait for the reset
+      instead of being sent and rejected
+    - A 429 waits for `retry_after` and retries; a global 429 pauses every
+      route
+    - At most `global_rate` requests are sent per second across all routes,
+      Discord's global limit per bot token, so exports of several guilds
+      sharing one client stay under it together
+    - 5xx responses and connection errors are retried with backoff
+
+    Requests (by endpoint and status), their latency, 429s, retries and
+    time spent waiting for rate limits are recorded in utils.metrics.
+
+    Use it as an async context manager:
+
+        async with RestClient(token) as rest:
+            guild = await rest.fetch_guild(guild_id)
+    """
+
+    def __init__(self, token: str, base_url: Optional[str] = None, max_connections: int = 16,
+                 max_retries: int = 5, global_rate: Optional[int] = None):
+        self.token = token
+        # DISCORD_API_BASE points the client at another server, e.g. the mock
+        # server in benchmarks/fake_discord.py
+        self.base_url = (base_url or os.getenv("DISCORD_API_BASE", API_BASE)).rstrip("/")
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.requests = 0
+        self.rate_limited = 0
+        # Per route: [requests remaining, monotonic time the window resets]
+        self._limits: Dict[str, List[float]] = {}
+        self._global_reset = 0.0
+        self.global_rate = global_rate or int(os.getenv("DISCORD_GLOBAL_RATE", "50"))
+        # Monotonic send times of the requests made in the last second
+        self._sent: deque = deque()
+
+    async def __aenter__(self) -> "RestClient":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        connector = aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers={
+                "Authorization": f"Bot {self.token}",
+                "User-Agent": "DiscordBot (db_core, 0.1.0)",
+            },
+        )
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _acquire(self, route: str) -> None:
+        """Wait for the global limit and take one of the route's remaining requests."""
+        while True:
+            now = time.monotonic()
+            while self._sent and self._sent[0] <= now - 1.0:
+                self._sent.popleft()
+            wait = self._global_reset - now
+            if wait <= 0 and len(self._sent) >= self.global_rate:
+                wait = self._sent[0] + 1.0 - now
+            elif wait <= 0:
+                limit = self._limits.get(route)
+                if limit is None or limit[1] <= now:
+                    # Unknown, or the window has reset: the response will tell
+                    self._limits.pop(route, None)
+                    self._sent.append(now)
+                    return
+                if limit[0] > 0:
+                    limit[0] -= 1
+                    self._sent.append(now)
+                    return
+                wait = limit[1] - now
+            await asyncio.sleep(wait)
+            metrics.observe("rate_limit_wait", wait)
+
+    async def request(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        GET `path` and return the decoded JSON body.
+
+        The route is the path itself, so every channel and thread is limited
+        separately, as Discord does for the endpoints used here.
+        """
+        route = path
+        endpoint = SNOWFLAKE.sub("/{id}", path)
+        params = {key: value for key, value in (params or {}).items() if value is not None}
+
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(route)
+            try:
+                start = time.perf_counter()
+                async with self.session.get(f"{self.base_url}{path}", params=params) as response:
+                    self.requests += 1
+                    metrics.count("api_requests", endpoint=endpoint, status=response.status)
+                    metrics.observe("api_request", time.perf_counter() - start, endpoint=endpoint)
+                    self._track_limits(route, response.headers)
+
+                    if response.status == 429:
+                        body = await response.json(content_type=None)
+                        retry_after = float(body.get("retry_after", 1.0))
+                        self.rate_limited += 1
+                        if body.get("global") or response.headers.get("X-RateLimit-Global"):
+                            metrics.count("api_rate_limited", scope="global")
+                            self._global_reset = time.monotonic() + retry_after
+                        else:
+                            metrics.count("api_rate_limited", scope="route")
+                            self._limits[route] = [0, time.monotonic() + retry_after]
+                        continue
+
+                    if response.status >= 500:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history,
+                            status=response.status, message=response.reason or ""
+                        )
+
+                    if response.status >= 400:
+                        body = await response.text()
+                        raise RestError(response.status, path, body)
+
+                    return await response.json()
+
+            except (aiohttp.ClientConnectionError, aiohttp.ClientResponseError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    raise
+                metrics.count("api_retries", endpoint=endpoint, error=type(e).__name__)
+                await asyncio.sleep(min(2 ** attempt, 30))
+
+        raise RestError(429, path, f"still rate limited after {self.max_retries} retries")
+
+    def _track_limits(self, route: str, headers) -> None:
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_after = headers.get("X-RateLimit-Reset-After")
+        if remaining is not None and reset_after is not None:
+            self._limits[route] = [int(remaining), time.monotonic() + float(reset_after)]
+
+    async def fetch_guild(self, guild_id: int) -> "RestGuild":
+        """
+        Fetch a guild, its text channels and their active threads.
+
+        Three requests replace the gateway's guild cache. Archived threads
+        and messages are fetched lazily, like discord.py does.
+        """
+        guild, channels, active = await asyncio.gather(
+            self.request(f"/guilds/{guild_id}"),
+            self.request(f"/guilds/{guild_id}/channels"),
+            self.request(f"/guilds/{guild_id}/threads/active"),
+        )
+
+        text_channels = [
+            RestTextChannel(self, data)
+            for data in sorted(channels, key=lambda c: (c.get("position", 0), int(c["id"])))
+            if data["type"] in TEXT_CHANNEL_TYPES
+        ]
+        by_id = {channel.id: channel for channel in text_channels}
+        for data in active.get("threads", []):
+            parent = by_id.get(int(data["parent_id"]))
+            if parent is not None:
+                parent.threads.append(RestThread(self, data))
+
+        return RestGuild(int(guild["id"]), guild["name"], text_channels)
+
+class RestUser:
+    __slots__ = ("id", "name")
+
+    def __init__(self, data: Dict[str, Any]):
+        self.id = int(data["id"])
+        self.name = data["username"]
+
+class RestMessageReference:
+    __slots__ = ("message_id",)
+
+    def __init__(self, data: Dict[str, Any]):
+        message_id = data.get("message_id")
+        self.message_id = int(message_id) if message_id else None
+
+class RestMessage:
+    __slots__ = ("id", "type", "author", "content", "reference")
+
+    def __init__(self, data: Dict[str, Any]):
+        self.id = int(data["id"])
+        self.type = data.get("type", 0)
+        self.author = RestUser(data["author"])
+        self.content = data.get("content", "")
+        reference = data.get("message_reference")
+        self.reference = RestMessageReference(reference) if reference else None
+
+    @property
+    def created_at(self) -> datetime:
+        return snowflake_time(self.id)
+
+class RestMessageable:
+    """Shared history() implementation for REST channels and threads."""
+
+    def __init__(self, rest: RestClient, data: Dict[str, Any]):
+        self._rest = rest
+        self.id = int(data["id"])
+        self.name = data.get("name")
+        last_message_id = data.get("last_message_id")
+        self.last_message_id = int(last_message_id) if last_message_id else None
+
+    async def history(self, limit: Optional[int] = 100, before=None, after=None,
+                      oldest_first: Optional[bool] = None) -> AsyncIterator[RestMessage]:
+        """
+        Yield messages 100 per request, following discord.py's semantics.
+
+        Newest first by default, oldest first when `after` is given or
+        `oldest_first` is set. `before`/`after` take objects with an `id`.
+        Each page's last message becomes the next page's cursor.
+        """
+        if oldest_first is None:
+            oldest_first = after is not None
+        before_id = before.id if before is not None else None
+        # Reading oldest first means paging forwards from the start of the channel
+        after_id = after.id if after is not None else (0 if oldest_first else None)
+
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page_size = PAGE_SIZE if remaining is None else min(remaining, PAGE_SIZE)
+            params = {"limit": page_size}
+            if oldest_first:
+                params["after"] = after_id
+            else:
+                params["before"] = before_id
+            page = await self._rest.request(f"/channels/{self.id}/messages", params)
+
+            # Discord returns every page newest first
+            messages = [RestMessage(data) for data in page]
+            if oldest_first:
+                messages.reverse()
+                if before_id is not None:
+                    messages = [msg for msg in messages if msg.id < before_id]
+            elif after_id is not None:
+                messages = [msg for msg in messages if msg.id > after_id]
+
+            for msg in messages:
+                yield msg
+            if remaining is not None:
+                remaining -= len(messages)
+            if len(page) < page_size or len(messages) < len(page):
+                return
+
+            if oldest_first:
+                after_id = messages[-1].id
+            else:
+                before_id = messages[-1].id
+
+class RestThread(RestMessageable):
+    def __init__(self, rest: RestClient, data: Dict[str, Any]):
+        super().__init__(rest, data)
+        metadata = data.get("thread_metadata", {})
+        self.parent_id = int(data["parent_id"])
+        self.archived = metadata.get("archived", False)
+        archive_timestamp = metadata.get("archive_timestamp")
+        # A datetime, like discord.py's Thread.archive_timestamp
+        self.archive_timestamp = (
+            datetime.fromisoformat(archive_timestamp.replace("Z", "+00:00")) if archive_timestamp else None
+        )
+
+class RestTextChannel(RestMessageable):
+    def __init__(self, rest: RestClient, data: Dict[str, Any]):
+        super().__init__(rest, data)
+        self.threads: List[RestThread] = []
+        self.guild: Optional["RestGuild"] = None
+
+    async def archived_threads(self, limit: Optional[int] = 100, before=None) -> AsyncIterator[RestThread]:
+        """Yield public archived threads, most recently archived first."""
+        # Archived threads are paged by archive time, not by ID
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page_size = PAGE_SIZE if remaining is None else min(remaining, PAGE_SIZE)
+            params = {"limit": page_size}
+            if before is not None:
+                params["before"] = before.isoformat() if isinstance(before, datetime) else before
+            page = await self._rest.request(f"/channels/{self.id}/threads/archived/public", params)
+            threads = [RestThread(self._rest, data) for data in page.get("threads", [])]
+            for thread in threads:
+                yield thread
+            if remaining is not None:
+                remaining -= len(threads)
+            if not page.get("has_more") or not threads:
+                return
+            before = threads[-1].archive_timestamp
+
+class RestGuild:
+    def __init__(self, guild_id: int, name: str, text_channels: List[RestTextChannel]):
+        self.id = guild_id
+        self.name = name
+        self.text_channels = text_channels
+        # Like discord.py's TextChannel.guild
+        for channel in text_channels:
+            channel.guild = self
+
+    def get_channel(self, channel_id: int) -> Optional[RestTextChannel]:
+        for channel in self.text_channels:
+            if channel.id == channel_id:
+                return channel
+        return None
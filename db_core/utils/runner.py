@@ -1,16 +1,269 @@
+import os
+import time
+import hashlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from config.db_config import engine
 from sqlalchemy import text
+from utils.metrics import metrics
+
+# Deployment ledger: the content hash of every script as it was last run
+LEDGER_DDL = """
+CREATE SCHEMA IF NOT EXISTS meta;
+
+CREATE TABLE IF NOT EXISTS meta.deployed_scripts (
+    path TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    last_run_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+RECORD_DEPLOYMENT = text("""
+INSERT INTO meta.deployed_scripts (path, content_hash, last_run_at)
+VALUES (:path, :content_hash, CURRENT_TIMESTAMP)
+ON CONFLICT (path) DO UPDATE SET
+    content_hash = EXCLUDED.content_hash,
+    last_run_at = EXCLUDED.last_run_at;
+""")
+
+def file_hash(filepath):
+    with open(filepath, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
 
 def execute_sql_file(filepath):
+    with metrics.span("sql_file", labels={"path": filepath}):
         with engine.begin() as conn:
             with open(filepath, 'r') as file:
                 print(f"Executing {filepath}...")
+                start = time.perf_counter()
                 conn.execute(text(file.read()))
-                print(f"✅ Done: {filepath}")
+                # Recorded in the same transaction, so the ledger only ever
+                # holds hashes of scripts that actually committed
+                conn.execute(RECORD_DEPLOYMENT, {
+                    "path": filepath,
+                    "content_hash": file_hash(filepath),
+                })
+                elapsed = time.perf_counter() - start
+                print(f"✅ Done: {filepath} ({elapsed:.2f}s)")
+        return elapsed
+
+def ensure_ledger():
+    with engine.begin() as conn:
+        conn.execute(text(LEDGER_DDL))
+
+def load_ledger():
+    """Return {path: content_hash} for every deployed script (empty if there's no ledger yet)."""
+    with engine.connect() as conn:
+        exists = conn.execute(text("SELECT to_regclass('meta.deployed_scripts')")).scalar()
+        if exists is None:
+            return {}
+        rows = conn.execute(text("SELECT path, content_hash FROM meta.deployed_scripts"))
+        return {path: content_hash for path, content_hash in rows}
+
+def build_graph(manifest_paths):
+    """
+    Build the dependency graph for one or more manifests, in order.
+
+    Entries with `depends_on` depend on exactly those files, which may be in
+    an earlier manifest. Entries without it run after the previous entry of
+    their manifest, and a manifest's first such entry runs after every file of
+    the manifests before it, so unannotated manifests keep their serial order.
+    A dependency on a script of a layer that isn't part of this deploy (e.g.
+    a silver load on a bronze table, when deploying silver and gold) is taken
+    to be deployed already and left out of the graph; one that doesn't exist
+    at all is an error.
+
+    Returns a dict mapping each path to the set of paths it depends on, in
+    manifest order, and the set of paths marked `always_run`.
+    """
+    from utils.manifest_loader import load_manifest_entries
+
+    graph = {}
+    always_run = set()
+    previous_layer = []
+    for manifest_path in manifest_paths:
+        layer = []
+        for entry in load_manifest_entries(manifest_path):
+            path = entry["path"]
+            if path in graph:
+                raise ValueError(f"{path} is listed more than once")
+            if entry["depends_on"] is not None:
+                depends_on = entry["depends_on"]
+            elif layer:
+                depends_on = [layer[-1]]
+            else:
+                depends_on = previous_layer
+            graph[path] = set(depends_on)
+            if entry["always_run"]:
+                always_run.add(path)
+            layer.append(path)
+        previous_layer = layer or previous_layer
+
+    for path, depends_on in graph.items():
+        elsewhere = depends_on - graph.keys()
+        unknown = {dependency for dependency in elsewhere if not os.path.exists(dependency)}
+        if unknown:
+            raise ValueError(f"{path} depends on unknown script(s): {', '.join(sorted(unknown))}")
+        depends_on -= elsewhere
+    return graph, always_run
+
+def topological_order(graph):
+    order, done, visiting = [], set(), set()
+
+    def visit(path):
+        if path in done:
+            return
+        if path in visiting:
+            raise ValueError(f"Dependency cycle involving {path}")
+        visiting.add(path)
+        for dependency in sorted(graph[path]):
+            visit(dependency)
+        visiting.discard(path)
+        done.add(path)
+        order.append(path)
+
+    for path in graph:
+        visit(path)
+    return order
+
+def plan_deployment(graph, always_run=(), ledger=None, force=False):
+    """
+    Decide which scripts need to run.
+
+    A script runs when it is new or its content hash differs from the ledger,
+    when it is marked `always_run`, when `force` is set, or when a script it
+    depends on changed. Returns {path: reason}, with reason None for scripts
+    that can be skipped.
+    """
+    ledger = ledger or {}
+    plan, changed = {}, set()
+    for path in topological_order(graph):
+        if force:
+            plan[path] = "forced"
+        elif path not in ledger:
+            plan[path] = "new"
+        elif ledger[path] != file_hash(path):
+            plan[path] = "changed"
+        elif graph[path] & changed:
+            plan[path] = "dependency changed"
+        elif path in always_run:
+            plan[path] = "always run"
+        else:
+            plan[path] = None
+
+        # Scripts that always run don't force their dependents to re-run
+        if plan[path] not in (None, "always run"):
+            changed.add(path)
+    return plan
+
+def print_plan(plan):
+    print("📋 Deployment plan:")
+    for path, reason in plan.items():
+        print(f"   {'run ' if reason else 'skip'}  {path} ({reason or 'unchanged'})")
+
+def critical_path(graph, timings):
+    """Return the chain of dependent scripts with the largest total run time."""
+    cost, previous = {}, {}
+    for path in topological_order(graph):
+        slowest = max(graph[path], key=lambda dep: cost[dep], default=None)
+        cost[path] = timings.get(path, 0.0) + (cost[slowest] if slowest else 0.0)
+        previous[path] = slowest
+
+    path = max(cost, key=cost.get, default=None)
+    chain = []
+    while path is not None:
+        chain.append(path)
+        path = previous[path]
+    return list(reversed(chain))
+
+def run_graph(graph, max_workers=None, skip=()):
+    """
+    Execute every script in the graph, running independent scripts in parallel.
+
+    Each script runs in its own transaction on a pooled connection. Scripts in
+    `skip` count as done without being executed. If a script fails, nothing
+    new is started; scripts already running finish and the first error is
+    raised. Returns each executed script's run time in seconds.
+    """
+    max_workers = max_workers or int(os.getenv("DEPLOY_WORKERS", "4"))
+    topological_order(graph)  # fail fast on cycles
+
+    remaining = {path: set(depends_on) for path, depends_on in graph.items()}
+    timings, running, error = {}, {}, None
+    start = time.perf_counter()
+
+    def release(path):
+        for depends_on in remaining.values():
+            depends_on.discard(path)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while remaining or running:
+            if error is None:
+                ready = [path for path, depends_on in remaining.items() if not depends_on]
+                for path in ready:
+                    del remaining[path]
+                    if path in skip:
+                        print(f"⏭️ Skipped: {path} (unchanged)")
+                        metrics.count("sql_files_skipped")
+                        release(path)
+                    else:
+                        # Run in a copy of this context, so the script's span
+                        # is traced under the deploy that started it
+                        context = contextvars.copy_context()
+                        running[pool.submit(context.run, execute_sql_file, path)] = path
+                if ready and not running:
+                    continue
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                path = running.pop(future)
+                try:
+                    timings[path] = future.result()
+                except Exception as e:
+                    print(f"❌ Failed: {path}: {e}")
+                    metrics.count("sql_files_failed")
+                    error = error or e
+                    continue
+                release(path)
+
+    if error is not None:
+        raise error
+
+    wall_time = time.perf_counter() - start
+    report_timings(graph, timings, wall_time)
+    return timings
+
+def report_timings(graph, timings, wall_time):
+    if not timings:
+        return
+    print("⏱️ Script timings:")
+    for path, elapsed in sorted(timings.items(), key=lambda item: item[1], reverse=True):
+        print(f"   {elapsed:7.2f}s  {path}")
+    chain = [path for path in critical_path(graph, timings) if path in timings]
+    print(f"⏱️ Critical path ({sum(timings[p] for p in chain):.2f}s): {' -> '.join(chain)}")
+    print(f"⏱️ Wall time {wall_time:.2f}s vs {sum(timings.values()):.2f}s run serially")
+
+def run_manifests(manifest_paths, max_workers=None, force=False, dry_run=False):
+    from utils.refresh import materialized_views, refresh_materialized_views
+
+    graph, always_run = build_graph(manifest_paths)
+    plan = plan_deployment(graph, always_run, load_ledger(), force)
+    views = materialized_views(manifest_paths)
+
+    if dry_run:
+        print_plan(plan)
+        refresh_materialized_views(views, dry_run=True)
+        return {}
+
+    ensure_ledger()
+    skip = {path for path, reason in plan.items() if reason is None}
+    timings = run_graph(graph, max_workers, skip=skip)
 
-def run_scripts_in_order(manifest_path):
-    from utils.manifest_loader import load_manifest
-    scripts = load_manifest(manifest_path)
+    # Populated or refreshed once everything (including the silver loads) has run
+    refresh_materialized_views(views)
+    return timings
 
-    for script_path in scripts:
-        execute_sql_file(script_path)
+def run_scripts_in_order(manifest_path, max_workers=None, force=False, dry_run=False):
+    return run_manifests([manifest_path], max_workers, force, dry_run)
@@ -0,0 +1,242 @@
+import os
+import random
+import sqlite3
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterable, List, Optional
+from utils.lease import Lease, LeaseHeld
+from utils.pipeline import (
+    Pipeline, PipelineContext, Stage, ChannelDiscoveryStage, HistoryExportStage, default_stages
+)
+from utils.records import snowflake_time
+from utils.metrics import metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channel_cadence (
+    channel_id INTEGER PRIMARY KEY,
+    messages_per_day REAL,
+    interval_seconds REAL,
+    last_synced_at TEXT,
+    next_due_at TEXT
+);
+"""
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+@dataclass
+class Cadence:
+    channel_id: int
+    messages_per_day: Optional[float]
+    interval_seconds: Optional[float]
+    last_synced_at: Optional[datetime]
+    next_due_at: Optional[datetime]
+
+class CadenceStore:
+    """
+    How often each channel is synced, from the message rates of past runs.
+
+    After every sync a channel's rate (messages per day, threads included)
+    is folded into an exponentially weighted average, and its next sync is
+    due once it's expected to have about `target_messages` new messages:
+    busy channels come round hourly (`min_interval`), quiet ones weekly
+    (`max_interval`). The first sync of a channel exports its whole
+    history, so its rate is taken over the channel's lifetime, which the
+    channel's snowflake ID dates. Due times get ±`jitter` of the interval,
+    so channels with the same rate don't all fall due together.
+
+    Channels that have never been synced are always due.
+    """
+
+    def __init__(self, path: str = os.path.join("state", "scheduler.sqlite"),
+                 target_messages: Optional[float] = None, min_interval: Optional[float] = None,
+                 max_interval: Optional[float] = None, smoothing: float = 0.5, jitter: float = 0.1):
+        self.path = path
+        self.target_messages = target_messages or float(os.getenv("SCHEDULE_TARGET_MESSAGES", "100"))
+        self.min_interval = min_interval or float(os.getenv("SCHEDULE_MIN_INTERVAL", "3600"))
+        self.max_interval = max_interval or float(os.getenv("SCHEDULE_MAX_INTERVAL", str(7 * 86400)))
+        self.smoothing = smoothing
+        self.jitter = jitter
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def get(self, channel_id: int) -> Optional[Cadence]:
+        row = self.db.execute(
+            "SELECT channel_id, messages_per_day, interval_seconds, last_synced_at, next_due_at "
+            "FROM channel_cadence WHERE channel_id = ?", (channel_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        parse = lambda value: datetime.fromisoformat(value) if value else None
+        return Cadence(row[0], row[1], row[2], parse(row[3]), parse(row[4]))
+
+    def due(self, channel_ids: Iterable[int], now: Optional[datetime] = None) -> List[int]:
+        """The channels whose next sync is due, in the order given."""
+        now = now or _now()
+        due = []
+        for channel_id in channel_ids:
+            cadence = self.get(channel_id)
+            if cadence is None or cadence.next_due_at is None or cadence.next_due_at <= now:
+                due.append(channel_id)
+        return due
+
+    def forget_missing(self, channel_ids: Iterable[int]) -> int:
+        """Drop the cadences of channels that no longer exist; returns how many."""
+        keep = set(channel_ids)
+        missing = [(channel_id,) for (channel_id,) in self.db.execute("SELECT channel_id FROM channel_cadence")
+                   if channel_id not in keep]
+        with self.db:
+            self.db.executemany("DELETE FROM channel_cadence WHERE channel_id = ?", missing)
+        return len(missing)
+
+    def next_due(self) -> Optional[datetime]:
+        """When the next channel falls due, or None if no channel is known yet."""
+        row = self.db.execute("SELECT MIN(next_due_at) FROM channel_cadence").fetchone()
+        return datetime.fromisoformat(row[0]) if row[0] else None
+
+    def interval(self, messages_per_day: float) -> float:
+        if messages_per_day <= 0:
+            return self.max_interval
+        interval = self.target_messages / messages_per_day * 86400
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def record_sync(self, channel_id: int, messages: int, now: Optional[datetime] = None) -> Cadence:
+        """Update a channel's rate and cadence after `messages` were exported for it."""
+        now = now or _now()
+        cadence = self.get(channel_id)
+        since = cadence.last_synced_at if cadence and cadence.last_synced_at else snowflake_time(channel_id)
+        rate = messages / max((now - since).total_seconds() / 86400, 1 / 24)
+        if cadence is not None and cadence.messages_per_day is not None:
+            rate = self.smoothing * rate + (1 - self.smoothing) * cadence.messages_per_day
+
+        interval = self.interval(rate)
+        next_due_at = now + timedelta(seconds=interval * random.uniform(1 - self.jitter, 1 + self.jitter))
+        with self.db:
+            self.db.execute(
+                "INSERT INTO channel_cadence (channel_id, messages_per_day, interval_seconds, "
+                "last_synced_at, next_due_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (channel_id) DO UPDATE SET messages_per_day = excluded.messages_per_day, "
+                "interval_seconds = excluded.interval_seconds, last_synced_at = excluded.last_synced_at, "
+                "next_due_at = excluded.next_due_at",
+                (channel_id, rate, interval, now.isoformat(), next_due_at.isoformat())
+            )
+        return Cadence(channel_id, rate, interval, now, next_due_at)
+
+@dataclass
+class DueChannelsStage(Stage):
+    """Narrow the discovered channels down to those whose sync is due."""
+    cadences: CadenceStore = None
+    name: str = "due channels"
+
+    async def run(self, context: PipelineContext) -> None:
+        discovered = context.channel_ids or []
+        # A deleted channel would otherwise stay due forever
+        self.cadences.forget_missing(discovered)
+        context.channel_ids = self.cadences.due(discovered)
+        print(f"🗓️ {len(context.channel_ids)} of {len(discovered)} channels due")
+
+@dataclass
+class RecordCadenceStage(Stage):
+    """Fold the channels' exported message counts into their cadences."""
+    cadences: CadenceStore = None
+    name: str = "record cadences"
+
+    async def run(self, context: PipelineContext) -> None:
+        counts = context.extractor.exported_counts
+        for channel_id in context.channel_ids or []:
+            cadence = self.cadences.record_sync(channel_id, counts.get(channel_id, 0))
+            metrics.count("channels_synced")
+            metrics.event("cadence", channel_id=channel_id, messages=counts.get(channel_id, 0),
+                          messages_per_day=round(cadence.messages_per_day, 2),
+                          interval_hours=round(cadence.interval_seconds / 3600, 2))
+
+def scheduled_stages(cadences: CadenceStore) -> List[Stage]:
+    """The pipeline's stages, syncing only the due channels and then recording their cadences."""
+    stages = default_stages()
+    export = next(i for i, stage in enumerate(stages) if isinstance(stage, HistoryExportStage))
+    discovery = next(i for i, stage in enumerate(stages) if isinstance(stage, ChannelDiscoveryStage))
+    stages.insert(export + 1, RecordCadenceStage(cadences=cadences))
+    stages.insert(discovery + 1, DueChannelsStage(cadences=cadences))
+    return stages
+
+class Scheduler:
+    """
+    Runs the pipeline whenever a channel falls due, one run at a time.
+
+    Rather than polling a clock, the scheduler sleeps until the earliest
+    channel's next sync (see CadenceStore), with at most `max_sleep` between
+    runs so new channels are discovered. Each run only exports the due
+    channels, incrementally from their checkpoints, which spreads API load
+    over the week instead of re-reading everything at once.
+
+    - Runs hold the Lease, so a slow run is never overlapped by the next one
+      or by a run started by hand; a run that finds the lease taken, or
+      loses it part-way, waits for the next wake-up
+    - A failed run is retried up to `max_retries` times with exponential
+      backoff and jitter, resuming from the stage that failed (a finished
+      export isn't redone, so its file isn't overwritten before it's loaded)
+    """
+
+    RETRY_BASE = 60.0
+    RETRY_MAX = 3600.0
+
+    def __init__(self, extractor_factory: Callable[[], Any], cadences: Optional[CadenceStore] = None,
+                 lease: Optional[Lease] = None, max_retries: Optional[int] = None,
+                 max_sleep: Optional[float] = None):
+        self.extractor_factory = extractor_factory
+        self.cadences = cadences or CadenceStore()
+        self.lease = lease or Lease()
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("SCHEDULE_RETRIES", "3"))
+        self.max_sleep = max_sleep or self.cadences.max_interval
+
+    def seconds_until_due(self) -> float:
+        next_due = self.cadences.next_due()
+        if next_due is None:
+            return 0.0
+        return min(max((next_due - _now()).total_seconds(), 0.0), self.max_sleep)
+
+    async def run_once(self) -> Optional[PipelineContext]:
+        """Run the pipeline for the due channels under the lease, with retries."""
+        # The pipeline holds the same lease, so retries stay under this hold
+        pipeline = Pipeline(scheduled_stages(self.cadences), self.extractor_factory(), lease=self.lease)
+
+        async def attempt_all():
+            context = None
+            for attempt in range(self.max_retries + 1):
+                try:
+                    return await pipeline.run(context)
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        raise
+                    context = pipeline.context
+                    delay = min(self.RETRY_BASE * 2 ** attempt, self.RETRY_MAX) * random.uniform(0.5, 1.5)
+                    print(f"⚠️ Pipeline run failed ({e}); retry {attempt + 1}/{self.max_retries} in {delay:.0f}s")
+                    metrics.count("pipeline_retries")
+                    await asyncio.sleep(delay)
+
+        return await self.lease.hold(attempt_all)
+
+    async def serve(self) -> None:
+        """Run forever: sleep until channels fall due, then sync them."""
+        while True:
+            wait = self.seconds_until_due()
+            if wait > 0:
+                print(f"💤 Next sync at {(_now() + timedelta(seconds=wait)).isoformat(timespec='minutes')}")
+                await asyncio.sleep(wait)
+            try:
+                await self.run_once()
+            except LeaseHeld as e:
+                print(f"⏭️ Skipping this run: {e}")
+                await asyncio.sleep(min(self.lease.ttl, self.max_sleep))
+            except Exception as e:
+                print(f"❌ Pipeline run failed after {self.max_retries} retries: {e}")
+                await asyncio.sleep(min(self.RETRY_MAX, self.max_sleep))
+            else:
+                # Nothing was recorded (e.g. the guild wasn't found): don't spin
+                if self.seconds_until_due() == 0:
+                    await asyncio.sleep(self.cadences.min_interval)
@@ -0,0 +1,297 @@
+import os
+import csv
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Optional, Tuple
+from utils.records import MessageRecord, DISCORD_EPOCH
+from utils.metrics import metrics
+
+class CsvMessageSink:
+    """
+    A streaming CSV writer for exported MessageRecords.
+
+    Rows are written in batches to `<path>.part` while the export runs, so
+    memory use doesn't grow with the size of the guild. After every batch the
+    file is flushed and its committed size is recorded in `<path>.part.offset`.
+    `commit()` renames the finished file into place atomically.
+
+    If a run dies part-way, the `.part` file is kept. The next sink for the
+    same path trims it back to the last committed batch and reports, per
+    channel/thread, the newest message ID already written, so the export can
+    carry on from there instead of starting over. A `.part` file whose header
+    isn't the current `MessageRecord.FIELDS` (written by an older version)
+    can't be appended to, so the export starts over.
+
+    With a ProgressJournal every batch is also recorded there, and resuming
+    uses the journal's offset and cursors instead of scanning the file.
+    """
+
+    def __init__(self, path: str, resume: bool = True, journal=None):
+        self.path = path
+        self.part_path = f"{path}.part"
+        self.offset_path = f"{path}.part.offset"
+        self.journal = journal
+        self.rows_written = 0
+        self.resumed_rows = 0
+        # Newest message ID written per channel/thread, including resumed rows
+        self.high_water: Dict[int, int] = {}
+
+        journaled = journal.run() if journal is not None else None
+        resume = resume and os.path.exists(self.part_path) and self._same_layout()
+        if resume and journaled and journaled[0] == path:
+            self._resume_from_journal(journaled[1], journaled[2])
+        elif resume and os.path.exists(self.offset_path):
+            self._resume()
+            if journal is not None:
+                journal.start(path, self.file.tell(), self.resumed_rows, self.high_water)
+        else:
+            self.file = open(self.part_path, "w", encoding="utf-8", newline='')
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(MessageRecord.FIELDS)
+            self._commit_offset()
+            if journal is not None:
+                journal.start(path, self.file.tell())
+
+    def _same_layout(self) -> bool:
+        """Whether the partial file has the current columns."""
+        with open(self.part_path, "r", encoding="utf-8", newline='') as f:
+            header = next(csv.reader(f), None)
+        if header == list(MessageRecord.FIELDS):
+            return True
+        print(f"⚠️ {self.part_path} has an older column layout; starting over")
+        return False
+
+    def _resume_from_journal(self, offset: int, rows: int) -> None:
+        """Trim the partial file to the journal's last batch and take its cursors."""
+        with open(self.part_path, "r+b") as f:
+            f.truncate(offset)
+        self.high_water = self.journal.cursors()
+        self.resumed_rows = rows
+
+        self.file = open(self.part_path, "a", encoding="utf-8", newline='')
+        self.writer = csv.writer(self.file)
+        print(f"♻️ Resuming {self.part_path} from the progress journal ({rows} rows already written)")
+
+    def _resume(self) -> None:
+        """Trim the partial file to its last committed batch and scan what it holds."""
+        with open(self.offset_path, "r", encoding="utf-8") as f:
+            offset = int(f.read().strip() or 0)
+
+        with open(self.part_path, "r+b") as f:
+            f.truncate(offset)
+
+        channel_col = MessageRecord.FIELDS.index("channel_id")
+        thread_col = MessageRecord.FIELDS.index("thread_id")
+        message_col = MessageRecord.FIELDS.index("message_id")
+        with open(self.part_path, "r", encoding="utf-8", newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                self._track(int(row[thread_col] or row[channel_col]), int(row[message_col]))
+                self.resumed_rows += 1
+
+        self.file = open(self.part_path, "a", encoding="utf-8", newline='')
+        self.writer = csv.writer(self.file)
+        print(f"♻️ Resuming {self.part_path} ({self.resumed_rows} rows already written)")
+
+    def _track(self, unit_id: int, message_id: int) -> None:
+        if message_id > self.high_water.get(unit_id, 0):
+            self.high_water[unit_id] = message_id
+
+    def _commit_offset(self) -> None:
+        """Flush the batch to disk, then record how much of the file is complete."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        tmp_path = f"{self.offset_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(self.file.tell()))
+        os.replace(tmp_path, self.offset_path)
+
+    def resume_point(self, unit_id: int) -> Optional[int]:
+        """Newest message ID already written for a channel or thread, if any."""
+        return self.high_water.get(unit_id)
+
+    def write_batch(self, records: Iterable[MessageRecord]) -> None:
+        """Append a batch of records and make it durable."""
+        start = time.perf_counter()
+        units: Dict[int, Tuple[int, int]] = {}
+        count = 0
+        for record in records:
+            self.writer.writerow(record.as_row())
+            self._track(record.unit_id, record.message_id)
+            newest, rows = units.get(record.unit_id, (0, 0))
+            units[record.unit_id] = (max(newest, record.message_id), rows + 1)
+            count += 1
+        if count:
+            self._commit_offset()
+            self.rows_written += count
+            if self.journal is not None:
+                self.journal.record_batch(self.file.tell(), self.resumed_rows + self.rows_written, units)
+            metrics.count("rows_written", count, format="csv")
+            metrics.observe("sink_write", time.perf_counter() - start, format="csv")
+
+    def commit(self) -> None:
+        """Finish the export: move the completed file into place."""
+        self.file.close()
+        os.replace(self.part_path, self.path)
+        os.remove(self.offset_path)
+        if self.journal is not None:
+            self.journal.clear()
+
+    def abort(self) -> None:
+        """Stop writing but keep the partial file so the next run can resume it."""
+        self.file.close()
+
+class _ColumnarMessageSink(ABC):
+    """
+    Shared buffering for the Arrow-based sinks.
+
+    Records are buffered per channel and written one channel at a time as a
+    chunk (a Parquet row group or an Arrow record batch), so every chunk holds
+    a single channel's messages. At most `chunk_size` records are buffered in
+    total, across all channels: once the buffers hold that many, the largest
+    is written out. So memory stays bounded however many channels are
+    exported at once. Snowflake IDs are stored as
+    int64 and `created_at` as a UTC timestamp, so nothing has to be re-inferred
+    when the file is read back.
+
+    Columnar files can't be appended to after a crash, so unlike
+    CsvMessageSink a leftover `.part` file is discarded rather than resumed.
+    Within a run, a retried channel or thread still continues after the
+    newest message it handed to the sink, buffered or written.
+    """
+
+    def __init__(self, path: str, resume: bool = True, chunk_size: int = 50_000):
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError(
+                f"{type(self).__name__} needs pyarrow; install it with `uv pip install pyarrow`"
+            ) from e
+
+        self.pa = pa
+        self.path = path
+        self.part_path = f"{path}.part"
+        # Columnar files are only durable once committed, so there's nothing to journal
+        self.journal = None
+        self.chunk_size = chunk_size
+        self.rows_written = 0
+        self.resumed_rows = 0
+        self.high_water: Dict[int, int] = {}
+        self.buffers: Dict[int, list] = {}
+        # Records across all buffers
+        self.buffered = 0
+        self.schema = pa.schema([
+            ("guild_id", pa.int64()),
+            ("channel_name", pa.string()),
+            ("channel_id", pa.int64()),
+            ("thread_name", pa.string()),
+            ("thread_id", pa.int64()),
+            ("message_id", pa.int64()),
+            ("reply_to_id", pa.int64()),
+            ("author", pa.string()),
+            ("chat_text", pa.string()),
+            ("created_at", pa.timestamp("ms", tz="UTC")),
+        ])
+        self.writer = self._open_writer()
+
+    @abstractmethod
+    def _open_writer(self):
+        """Open the format's writer on `part_path`."""
+
+    @abstractmethod
+    def _write_table(self, table) -> None:
+        """Append one chunk to the file."""
+
+    def resume_point(self, unit_id: int) -> Optional[int]:
+        """Newest message ID written for a channel or thread during this run, if any."""
+        return self.high_water.get(unit_id)
+
+    def _flush_channel(self, channel_id: int) -> None:
+        records = self.buffers.pop(channel_id, [])
+        if not records:
+            return
+        self.buffered -= len(records)
+        start = time.perf_counter()
+        pa = self.pa
+        table = pa.Table.from_arrays([
+            pa.array([r.guild_id for r in records], pa.int64()),
+            pa.array([r.channel_name for r in records], pa.string()),
+            pa.array([r.channel_id for r in records], pa.int64()),
+            pa.array([r.thread_name for r in records], pa.string()),
+            pa.array([r.thread_id for r in records], pa.int64()),
+            pa.array([r.message_id for r in records], pa.int64()),
+            pa.array([r.reply_to_id for r in records], pa.int64()),
+            pa.array([r.author for r in records], pa.string()),
+            pa.array([r.chat_text for r in records], pa.string()),
+            # Creation time comes straight from the snowflake, in milliseconds
+            pa.array([(r.message_id >> 22) + DISCORD_EPOCH for r in records], pa.timestamp("ms", tz="UTC")),
+        ], schema=self.schema)
+        self._write_table(table)
+        self.rows_written += len(records)
+        output_format = os.path.splitext(self.path)[1].lstrip(".")
+        metrics.count("rows_written", len(records), format=output_format)
+        metrics.observe("sink_write", time.perf_counter() - start, format=output_format)
+
+    def write_batch(self, records: Iterable[MessageRecord]) -> None:
+        """Buffer records by channel, writing the largest buffer whenever `chunk_size` records are held."""
+        for record in records:
+            self.buffers.setdefault(record.channel_id, []).append(record)
+            self.buffered += 1
+            if record.message_id > self.high_water.get(record.unit_id, 0):
+                self.high_water[record.unit_id] = record.message_id
+            if self.buffered >= self.chunk_size:
+                self._flush_channel(max(self.buffers, key=lambda channel_id: len(self.buffers[channel_id])))
+
+    def commit(self) -> None:
+        """Write the remaining buffers and move the finished file into place."""
+        for channel_id in list(self.buffers):
+            self._flush_channel(channel_id)
+        self.writer.close()
+        os.replace(self.part_path, self.path)
+
+    def abort(self) -> None:
+        self.buffers.clear()
+        self.buffered = 0
+        self.writer.close()
+
+class ParquetMessageSink(_ColumnarMessageSink):
+    """Writes messages to a zstd-compressed Parquet file, one row group per channel chunk."""
+
+    def _open_writer(self):
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(self.part_path, self.schema, compression="zstd")
+
+    def _write_table(self, table) -> None:
+        self.writer.write_table(table, row_group_size=self.chunk_size)
+
+class ArrowMessageSink(_ColumnarMessageSink):
+    """Writes messages to a zstd-compressed Arrow IPC (Feather v2) file."""
+
+    def _open_writer(self):
+        import pyarrow.ipc as ipc
+        options = ipc.IpcWriteOptions(compression="zstd")
+        return ipc.new_file(self.part_path, self.schema, options=options)
+
+    def _write_table(self, table) -> None:
+        self.writer.write_table(table, max_chunksize=self.chunk_size)
+
+# Output formats supported by DiscordExtractor, keyed by file extension
+SINKS = {
+    "csv": CsvMessageSink,
+    "parquet": ParquetMessageSink,
+    "arrow": ArrowMessageSink,
+}
+
+def open_sink(path_stem: str, output_format: str = "csv", resume: bool = True, journal=None):
+    """
+    Open the sink for an output format, writing to `<path_stem>.<format>`.
+
+    Only CSV output is durable batch by batch, so a progress journal is only
+    used for CSV.
+    """
+    if output_format not in SINKS:
+        raise ValueError(f"Unknown output format {output_format!r}; expected one of {', '.join(SINKS)}")
+    if output_format == "csv":
+        return CsvMessageSink(f"{path_stem}.csv", resume=resume, journal=journal)
+    return SINKS[output_format](f"{path_stem}.{output_format}", resume=resume)
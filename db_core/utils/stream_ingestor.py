@@ -0,0 +1,351 @@
+import os
+import json
+import time
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from utils.records import MessageRecord
+
+class ChatEvent:
+    """
+    A message created, edited or deleted on Discord, as seen by the gateway.
+
+    Creates and edits carry the message's full MessageRecord; deletes only
+    carry its ID. `received_at` (epoch seconds) is when the event arrived.
+    """
+
+    __slots__ = ("kind", "message_id", "record", "received_at")
+
+    KINDS = ("create", "edit", "delete")
+
+    def __init__(self, kind: str, message_id: int, record: Optional[MessageRecord] = None,
+                 received_at: Optional[float] = None):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown chat event {kind!r}; expected one of {', '.join(self.KINDS)}")
+        self.kind = kind
+        self.message_id = message_id
+        self.record = record
+        self.received_at = received_at if received_at is not None else time.time()
+
+    @classmethod
+    def from_message(cls, kind: str, message: Any) -> "ChatEvent":
+        """Build a create or edit event from a discord.py message."""
+        channel, thread = message.channel, None
+        # Messages posted in a thread report the thread as their channel
+        if getattr(channel, "parent", None) is not None:
+            channel, thread = channel.parent, channel
+        return cls(kind, message.id, MessageRecord.from_message(channel, thread, message))
+
+    def to_json(self) -> str:
+        record = dict(zip(MessageRecord.FIELDS[:-1], self.record.as_row()[:-1])) if self.record else None
+        return json.dumps({
+            "kind": self.kind,
+            "message_id": self.message_id,
+            "record": record,
+            "received_at": self.received_at,
+        }, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, line: str) -> "ChatEvent":
+        data = json.loads(line)
+        record = MessageRecord(**data["record"]) if data["record"] else None
+        return cls(data["kind"], data["message_id"], record, data["received_at"])
+
+class SpillFile:
+    """
+    An append-only JSON lines file of ChatEvents that didn't fit in the queue.
+
+    Events are read back in the order they were written. How far they've
+    been written to the database is kept in `<path>.offset`, so after a
+    restart replay continues from there; the file is emptied once every
+    event in it has been written.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offset_path = f"{path}.offset"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.offset = 0
+        if os.path.exists(self.offset_path):
+            with open(self.offset_path, "r", encoding="utf-8") as f:
+                self.offset = int(f.read().strip() or 0)
+        self._next_offset = self.offset
+
+    def pending(self) -> bool:
+        """True if the file holds events that haven't been written yet."""
+        return os.path.exists(self.path) and os.path.getsize(self.path) > self.offset
+
+    def append(self, events: Sequence[ChatEvent]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for event in events:
+                f.write(event.to_json() + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read(self, limit: int) -> List[ChatEvent]:
+        """Return up to `limit` events after the committed offset (see advance)."""
+        events = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            f.seek(self.offset)
+            while len(events) < limit:
+                line = f.readline()
+                if not line.endswith("\n"):
+                    break
+                events.append(ChatEvent.from_json(line))
+            self._next_offset = f.tell() if events else self.offset
+        return events
+
+    def advance(self) -> None:
+        """Mark the events returned by the last read() as written."""
+        self.offset = self._next_offset
+        tmp_path = f"{self.offset_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(self.offset))
+        os.replace(tmp_path, self.offset_path)
+
+    def clear(self) -> None:
+        for path in (self.path, self.offset_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.offset = self._next_offset = 0
+
+class BronzeChatWriter:
+    """
+    Applies a batch of ChatEvents to bronze.chat_raw in one transaction.
+
+    Creates and edits are upserted on message_id through BronzeIngestor's
+    merge (the last version of each message in the batch wins, and changed
+    rows get a fresh ingestion_timestamp for silver loads). Deletes set
+    `deleted_at` instead of removing the row. Messages get the same derived
+    columns as batch loads (utils.transform). Edits to channels missing
+    from the client's cache arrive without channel and thread names, so
+    the merge keeps the stored names rather than clearing them.
+    """
+
+    def __init__(self, table_name: str = "chat_raw", schema: str = "bronze"):
+        from utils.ingestor import BronzeIngestor
+        from utils.transform import enrich_messages
+        self.ingestor = BronzeIngestor(
+            csv_path=None,
+            table_name=table_name,
+            schema=schema,
+            merge_key="message_id",
+            quiet=True,
+            transform=enrich_messages,
+            keep_on_null=("channel_name", "thread_name")
+        )
+
+    def __call__(self, events: Sequence[ChatEvent]) -> None:
+        from sqlalchemy import text
+        from config.db_config import engine
+
+        upserts: Dict[int, MessageRecord] = {}
+        deletes: Dict[int, float] = {}
+        for event in events:
+            if event.kind == "delete":
+                deletes[event.message_id] = event.received_at
+            else:
+                upserts[event.message_id] = event.record
+
+        with engine.begin() as connection:
+            # Upserts go first, so a message created and deleted within one
+            # batch still lands, marked as deleted
+            if upserts:
+                self.ingestor.load_records(list(upserts.values()))
+                self.ingestor.merge_frame(connection, self.ingestor.transform_frame(self.ingestor.df))
+            if deletes:
+                connection.execute(text(f"""
+                    UPDATE {self.ingestor.full_table} AS t
+                    SET deleted_at = d.deleted_at, ingestion_timestamp = CURRENT_TIMESTAMP,
+                        ingest_xid = pg_current_xact_id()
+                    FROM (
+                        SELECT unnest(CAST(:ids AS BIGINT[])) AS message_id,
+                               to_timestamp(unnest(CAST(:times AS DOUBLE PRECISION[]))) AS deleted_at
+                    ) AS d
+                    WHERE t.message_id = d.message_id AND t.deleted_at IS NULL
+                """), {"ids": list(deletes), "times": list(deletes.values())})
+
+class StreamIngestor:
+    """
+    Streams gateway chat events into bronze in micro-batches.
+
+    Event handlers call `submit()`, which never blocks the Discord event
+    loop. A background writer collects events from a bounded queue and
+    flushes them when `batch_size` events are waiting or `flush_interval`
+    seconds after the first one arrived, running the database write in a
+    thread.
+
+    Backpressure: when the database is slow or down the queue fills up, and
+    further events (along with everything still queued) are appended to an
+    on-disk spill file instead of piling up in memory. `submit()` only
+    buffers spilled events; a background task appends them to the file in a
+    thread, one write and fsync for everything that arrived during the
+    previous one, so a burst never waits on the disk. The writer drains the
+    spill file, in order, before returning to the queue. A failed write is
+    retried with exponential backoff and never dropped, so events are
+    written in the order they arrived.
+    """
+
+    def __init__(self, writer: Optional[Callable[[Sequence[ChatEvent]], None]] = None,
+                 max_queue: int = 10_000, batch_size: int = 500, flush_interval: float = 1.0,
+                 spill_path: str = os.path.join("state", "stream_spill.jsonl"),
+                 max_backoff: float = 60.0, report_interval: float = 60.0):
+        self.writer = writer or BronzeChatWriter()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill = SpillFile(spill_path)
+        self.max_backoff = max_backoff
+        self.report_interval = report_interval
+
+        # Events left in the spill file by a previous run go first
+        self.spilling = self.spill.pending()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+        # The queued batch being written, kept so stop() can spill it
+        self._in_flight: List[ChatEvent] = []
+        # Spilled events not yet in the spill file, and the task appending them
+        self._spill_buffer: List[ChatEvent] = []
+        self._spill_task: Optional[asyncio.Task] = None
+
+        self.stats = {
+            "received": 0, "written": 0, "batches": 0, "spilled": 0,
+            "failures": 0, "max_queue": 0, "flush_seconds": 0.0,
+        }
+
+    def submit(self, event: ChatEvent) -> None:
+        """Hand an event to the writer without waiting (safe to call from event handlers)."""
+        self.stats["received"] += 1
+        if not self.spilling and not self.queue.full():
+            self.queue.put_nowait(event)
+            self.stats["max_queue"] = max(self.stats["max_queue"], self.queue.qsize())
+            return
+
+        if not self.spilling:
+            # Queued events are older, so they go to the spill file first
+            print(f"⚠️ Queue full ({self.queue.qsize()} events); spilling to {self.spill.path}")
+            queued = [self.queue.get_nowait() for _ in range(self.queue.qsize())]
+            self._spill_buffer.extend(queued)
+            self.stats["spilled"] += len(queued)
+            self.spilling = True
+        self._spill_buffer.append(event)
+        self.stats["spilled"] += 1
+        if self._spill_task is None or self._spill_task.done():
+            self._spill_task = asyncio.get_running_loop().create_task(self._flush_spill())
+
+    async def _flush_spill(self) -> None:
+        """Append buffered spilled events to the spill file until none are left."""
+        while self._spill_buffer:
+            events, self._spill_buffer = self._spill_buffer, []
+            try:
+                await asyncio.to_thread(self.spill.append, events)
+            except OSError as e:
+                # Keep them (in order) and try again, rather than lose them
+                print(f"❌ Spilling {len(events)} events failed: {e}")
+                self._spill_buffer[:0] = events
+                await asyncio.sleep(1.0)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """
+        Flush everything and stop the writer.
+
+        If the database can't take the remaining events within `timeout`
+        seconds, they're left in the spill file for the next run.
+        """
+        if self._task is None:
+            return
+        self._stopping = True
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            if not self.spilling:
+                queued = [self.queue.get_nowait() for _ in range(self.queue.qsize())]
+                self.spill.append(self._in_flight + queued)
+            elif self._spill_task is not None:
+                await self._spill_task
+            print(f"⚠️ Stopped before every event was written; kept them in {self.spill.path}")
+        self._task = None
+        self.report()
+
+    async def _run(self) -> None:
+        backoff = min(1.0, self.max_backoff)
+        last_report = time.monotonic()
+        while not (self._stopping and self.queue.empty() and not self.spilling):
+            from_spill = self.spilling
+            if from_spill:
+                batch = self.spill.read(self.batch_size)
+                if not batch and self._spill_task is not None and not self._spill_task.done():
+                    # Events are still on their way to the file; shielded so
+                    # stop() cancelling the writer doesn't cut an append short
+                    await asyncio.shield(self._spill_task)
+                    continue
+                if not batch:
+                    # Nothing is awaited between the read and here, so no
+                    # event can have been spilled in between
+                    self.spill.clear()
+                    self.spilling = False
+                    print("✅ Spill file drained; back to the in-memory queue")
+                    continue
+            else:
+                batch = await self._collect()
+                if not batch:
+                    continue
+                self._in_flight = batch
+
+            # Retry the batch until it's written, so events stay in order
+            while not await self._write(batch):
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+            backoff = min(1.0, self.max_backoff)
+            self._in_flight = []
+            if from_spill:
+                self.spill.advance()
+
+            if time.monotonic() - last_report >= self.report_interval:
+                self.report()
+                last_report = time.monotonic()
+
+    async def _collect(self) -> List[ChatEvent]:
+        """Wait for events until the batch is full or `flush_interval` has passed."""
+        loop = asyncio.get_running_loop()
+        try:
+            batch = [await asyncio.wait_for(self.queue.get(), self.flush_interval)]
+        except asyncio.TimeoutError:
+            return []
+
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0 or self._stopping:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _write(self, batch: List[ChatEvent]) -> bool:
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(self.writer, batch)
+        except Exception as e:
+            self.stats["failures"] += 1
+            print(f"❌ Writing {len(batch)} events failed: {e}")
+            return False
+        self.stats["flush_seconds"] += time.perf_counter() - start
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+        return True
+
+    def report(self) -> None:
+        stats = self.stats
+        average = stats["flush_seconds"] / stats["batches"] * 1000 if stats["batches"] else 0.0
+        print(f"📊 Stream: {stats['received']} received, {stats['written']} written in "
+              f"{stats['batches']} batches ({average:.1f}ms avg), {stats['spilled']} spilled, "
+              f"{stats['failures']} failed writes, queue peak {stats['max_queue']}")
@@ -0,0 +1,98 @@
+import os
+import sqlite3
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS thread_index (
+    thread_id INTEGER PRIMARY KEY,
+    parent_id INTEGER NOT NULL,
+    name TEXT,
+    archived INTEGER NOT NULL,
+    archive_timestamp TEXT,
+    last_message_id INTEGER,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS thread_index_parent_idx ON thread_index (parent_id, archived, archive_timestamp);
+"""
+
+def as_datetime(value: Any) -> Optional[datetime]:
+    """Normalise an archive timestamp (datetime or ISO 8601 string) to an aware datetime."""
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+class ThreadIndex:
+    """
+    A persisted index of every thread the incremental export has seen.
+
+    For each thread it keeps the parent channel, whether it was archived and
+    when, the newest message ID exported, and how many messages have been
+    exported from it in total.
+
+    An archived thread can't receive messages without being unarchived, and
+    unarchiving it changes its `archive_timestamp` the next time it's
+    archived. So:
+    - A thread whose archive timestamp and last message ID match the index
+      has nothing new and is skipped
+    - Archived threads are listed most recently archived first, so listing
+      can stop at the first thread archived before the newest one indexed
+      for the channel: everything after it was already seen, unchanged
+    """
+
+    def __init__(self, path: str = os.path.join("state", "threads.sqlite")):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def newest_archive(self, channel_id: int) -> Optional[datetime]:
+        """Archive timestamp of the channel's most recently archived indexed thread."""
+        row = self.db.execute(
+            "SELECT MAX(archive_timestamp) FROM thread_index WHERE parent_id = ? AND archived = 1",
+            (channel_id,)
+        ).fetchone()
+        return as_datetime(row[0]) if row and row[0] else None
+
+    def unchanged(self, thread: Any) -> bool:
+        """True if an archived thread is indexed with the same archive timestamp and last message."""
+        row = self.db.execute(
+            "SELECT archive_timestamp, last_message_id FROM thread_index WHERE thread_id = ? AND archived = 1",
+            (thread.id,)
+        ).fetchone()
+        if row is None or as_datetime(row[0]) != as_datetime(thread.archive_timestamp):
+            return False
+        last_message_id = getattr(thread, "last_message_id", None)
+        return last_message_id is None or (row[1] is not None and last_message_id <= row[1])
+
+    def update(self, thread: Any, exported: int, last_message_id: Optional[int]) -> None:
+        """Record a thread after a successful export, adding `exported` to its message count."""
+        archive_timestamp = as_datetime(getattr(thread, "archive_timestamp", None))
+        # Stored in UTC so MAX() over the text orders them correctly
+        archive_timestamp = archive_timestamp.astimezone(timezone.utc).isoformat() if archive_timestamp else None
+        last_message_id = max(filter(None, (last_message_id, getattr(thread, "last_message_id", None))),
+                              default=None)
+        with self.db:
+            self.db.execute(
+                """
+                INSERT INTO thread_index (thread_id, parent_id, name, archived, archive_timestamp,
+                                          last_message_id, message_count, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (thread_id) DO UPDATE SET
+                    name = excluded.name,
+                    archived = excluded.archived,
+                    archive_timestamp = excluded.archive_timestamp,
+                    last_message_id = MAX(COALESCE(last_message_id, 0), COALESCE(excluded.last_message_id, 0)),
+                    message_count = message_count + excluded.message_count,
+                    updated_at = excluded.updated_at
+                """,
+                (thread.id, thread.parent_id, thread.name, int(bool(getattr(thread, "archived", False))),
+                 archive_timestamp, last_message_id, exported, datetime.now(timezone.utc).isoformat())
+            )
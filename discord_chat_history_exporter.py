@@ -4,24 +4,48 @@ Discord Chat History Exporter (Batch)
 This script:
   1. Loads `json_files/guild_channels_with_threads.json`.
   2. Fetches full message history for each text channel.
-  3. Serializes all messages into a single `chat_history.csv` file.
+  3. Streams all messages into a single `chat_history.csv` file.
+
+Streaming:
+  Messages are read oldest first and written in batches to
+  `chat_history.csv.part` by db_core's CsvMessageSink, which renames it to
+  `chat_history.csv` once every channel has been exported. If a run fails,
+  the `.part` file is kept and the next run resumes each channel after the
+  newest message already written. Rows use db_core's MessageRecord columns,
+  so the file loads straight into bronze.chat_raw.
+
+Incremental mode:
+  When EXTRACT_INCREMENTAL is set, the newest exported message ID of each
+  channel is kept in `state/checkpoints.json` (db_core's CheckpointStore, the
+  same switch and store as db_core's extractor) and the next run only fetches
+  messages posted after it, so `chat_history.csv` holds just the new messages.
 
 Environment Variables Required:
   • DARCY_KEY      — Your Discord bot token  
   • TEST_SERVER_ID — The integer ID of the target Discord guild
 
+Optional:
+  • EXTRACT_INCREMENTAL — Set to `true` to only export new messages
+
 Usage:
   $ uv run discord_chat_history_exporter.py
 """
 
 import os
+import sys
 import json
-import csv
 import discord
 import ssl
 from dotenv import load_dotenv
 from discord import TextChannel
 
+# db_core isn't installed as a package; import its utils the way its own
+# scripts do, with db_core on the path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "db_core"))
+from utils.checkpoint import CheckpointStore
+from utils.records import MessageRecord
+from utils.sink import CsvMessageSink
+
 # Ensure output directory exists
 os.makedirs("json_files", exist_ok=True)
 
@@ -31,35 +55,67 @@ ssl._create_default_https_context = ssl._create_unverified_context
 load_dotenv()
 TOKEN = os.getenv("DARCY_KEY")
 GUILD_ID = int(os.getenv("TEST_SERVER_ID"))
-
-# Load channels data
-with open(os.path.join("json_files", "guild_channels_with_threads.json"), "r", encoding="utf-8") as f:
-    guild_data = json.load(f)
-
-# Build list of (id, name)
-channel_info = []
-for category in guild_data.get("categories", []):
-    for ch in category.get("channels", []):
+INCREMENTAL = os.getenv("EXTRACT_INCREMENTAL", "").lower() in ("1", "true", "yes")
+CHECKPOINT_PATH = os.path.join("state", "checkpoints.json")
+# Where checkpoints were kept before they moved to CheckpointStore; same format
+LEGACY_CHECKPOINT_PATH = os.path.join("json_files", "chat_checkpoints.json")
+
+CSV_PATH = "chat_history.csv"
+PART_PATH = f"{CSV_PATH}.part"
+BATCH_SIZE = 1000
+
+def build_channel_info(guild_data):
+    """Return a list of (id, name) for every channel in a guild structure."""
+    channel_info = []
+    for category in guild_data.get("categories", []):
+        for ch in category.get("channels", []):
+            channel_info.append((int(ch["id"]), ch["name"]))
+    for ch in guild_data.get("ungrouped", []):
         channel_info.append((int(ch["id"]), ch["name"]))
-for ch in guild_data.get("ungrouped", []):
-    channel_info.append((int(ch["id"]), ch["name"]))
-
-intents = discord.Intents.default()
-intents.guilds = True
-intents.guild_messages = True
-intents.message_content = True
-client = discord.Client(intents=intents)
-
-@client.event
-async def on_ready():
-    guild = client.get_guild(GUILD_ID)
-    if guild is None:
-        print(f"❌ Guild ID {GUILD_ID} not found.")
-        await client.close()
-        return
-
-    all_messages = []
+    return channel_info
+
+def load_channel_info():
+    """Load channels from `json_files/guild_channels_with_threads.json`."""
+    with open(os.path.join("json_files", "guild_channels_with_threads.json"), "r", encoding="utf-8") as f:
+        return build_channel_info(json.load(f))
+
+def load_checkpoints():
+    """Open the checkpoint store (incremental mode only), picking up checkpoints from the old location."""
+    if not INCREMENTAL:
+        return None
+    if os.path.exists(LEGACY_CHECKPOINT_PATH) and not os.path.exists(CHECKPOINT_PATH):
+        os.makedirs(os.path.dirname(CHECKPOINT_PATH), exist_ok=True)
+        os.replace(LEGACY_CHECKPOINT_PATH, CHECKPOINT_PATH)
+        print(f"♻️ Moved {LEGACY_CHECKPOINT_PATH} to {CHECKPOINT_PATH}")
+    return CheckpointStore(CHECKPOINT_PATH)
+
+def open_sink():
+    """
+    Open the CSV sink for `chat_history.csv`; it resumes a `.part` file left by a failed run.
+
+    A `.part` file with other columns (e.g. written before the exporter used
+    CsvMessageSink) can't be resumed, so the sink starts it over.
+    """
+    return CsvMessageSink(CSV_PATH)
+
+def create_client():
+    intents = discord.Intents.default()
+    intents.guilds = True
+    intents.guild_messages = True
+    intents.message_content = True
+    return discord.Client(intents=intents)
+
+async def export_history(guild, channel_info):
+    """
+    Export the history of every channel in `channel_info` to `chat_history.csv`.
+
+    Returns True once the CSV has been written, False if any channel failed
+    (the `.part` file is then kept for the next run to resume).
+    """
+    checkpoints = load_checkpoints()
+    sink = open_sink()
     total_messages = 0
+    failed = []
     
     for channel_id, channel_name in channel_info:
         try:
@@ -69,41 +125,72 @@ async def on_ready():
                 continue
 
             print(f"🔄 Exporting {channel_name}...")
-            channel_messages = []
-            async for msg in channel.history(limit=None):
-                channel_messages.append({
-                    "channel_id": channel_id,
-                    "channel_name": channel_name,
-                    "message_id": msg.id,
-                    "author": msg.author.name,
-                    "content": msg.content,
-                    "timestamp": msg.created_at.isoformat()
-                })
-            
-            all_messages.extend(channel_messages)
-            total_messages += len(channel_messages)
-            print(f"✅ Exported {len(channel_messages)} messages from {channel_name}")
+            channel_total = 0
+            batch = []
+            # Resume after the newest message already written or checkpointed
+            after = max(filter(None, (checkpoints.get(channel_id) if checkpoints is not None else None,
+                                      sink.resume_point(channel_id))), default=None)
+            async for msg in channel.history(limit=None, after=discord.Object(id=after) if after else None,
+                                             oldest_first=True):
+                batch.append(MessageRecord.from_message(channel, None, msg))
+                if len(batch) >= BATCH_SIZE:
+                    sink.write_batch(batch)
+                    channel_total += len(batch)
+                    batch = []
+            if batch:
+                sink.write_batch(batch)
+                channel_total += len(batch)
+
+            total_messages += channel_total
+            print(f"✅ Exported {channel_total} messages from {channel_name}")
             
         except Exception as e:
             print(f"❌ Error exporting {channel_name}: {str(e)}")
+            failed.append(channel_name)
             continue
 
-    # Write all messages to a single CSV file
-    csv_path = "chat_history.csv"
-    try:
-        with open(csv_path, "w", encoding="utf-8", newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=["channel_id", "channel_name", "message_id", "author", "content", "timestamp"])
-            writer.writeheader()
-            writer.writerows(all_messages)
-        
-        print(f"✅ Wrote {csv_path} ({total_messages} messages total)")
-    except Exception as e:
-        print(f"❌ Error writing CSV file: {str(e)}")
+    # Keep the partial file if anything failed, so the next run can resume it
+    if failed:
+        sink.abort()
+        print(f"⚠️ {len(failed)} channel(s) failed; kept {PART_PATH}, re-run to resume")
+        return False
+    else:
+        try:
+            sink.commit()
+            print(f"✅ Wrote {CSV_PATH} ({total_messages} messages exported this run)")
+
+            # Only advance checkpoints once the messages are safely on disk
+            if checkpoints is not None:
+                for channel_id, message_id in sink.high_water.items():
+                    checkpoints.update(channel_id, message_id)
+                checkpoints.save()
+                print(f"✅ Saved checkpoints to {CHECKPOINT_PATH}")
+            return True
+        except Exception as e:
+            print(f"❌ Error writing CSV file: {str(e)}")
+            return False
 
-    await client.close()
+def main():
+    channel_info = load_channel_info()
+    client = create_client()
+
+    @client.event
+    async def on_ready():
+        guild = client.get_guild(GUILD_ID)
+        if guild is None:
+            print(f"❌ Guild ID {GUILD_ID} not found.")
+            await client.close()
+            return
+
+        try:
+            await export_history(guild, channel_info)
+        finally:
+            await client.close()
 
-if __name__ == "__main__":
     try:
         client.run(TOKEN)
     except Exception as e:
-        print(f"❌ Error running client: {str(e)}")
\ No newline at end of file
+        print(f"❌ Error running client: {str(e)}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
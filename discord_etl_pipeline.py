@@ -4,27 +4,50 @@ Discord ETL Pipeline
 1. Export guild structure
 2. Export all chat histories to a single CSV file
 
+Both steps run in this process on a single Discord connection: the guild
+structure is built in memory and handed straight to the history export
+(it is still written to `json_files/guild_channels_with_threads.json`).
+
+The run holds db_core's pipeline lease (`state/scheduler.sqlite`), so it
+never overlaps another run that writes the same files.
+
 Run:
   $ uv run discord_etl_pipeline.py
 """
 
 import os
-import subprocess
+import sys
+import time
+import inspect
 from dotenv import load_dotenv
 
+# db_core isn't installed as a package; import its utils the way its own
+# scripts do, with db_core on the path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "db_core"))
+from utils.lease import Lease, LeaseHeld
+
 # Ensure directories
 os.makedirs("csv_files", exist_ok=True)
 
 # -------------------------------------------------------------------------------*/
 
-def run_step(script):
+async def run_step(name, step, *args):
     """
-    Execute a sub-script using `uv run` and print progress.
+    Await one pipeline step and print its progress and run time.
     Args:
-        script (str): Python script to run
+        name (str): Step name shown in the log
+        step (coroutine function or function): The step to run
+    Returns:
+        tuple: The step's result and its run time in seconds
     """
-    print(f"▶️ {script}…")
-    subprocess.run(["uv", "run", script], check=True)
+    print(f"▶️ {name}…")
+    start = time.perf_counter()
+    result = step(*args)
+    if inspect.isawaitable(result):
+        result = await result
+    elapsed = time.perf_counter() - start
+    print(f"✅ {name} done ({elapsed:.2f}s)")
+    return result, elapsed
 
 # -------------------------------------------------------------------------------*/
 
@@ -32,19 +55,64 @@ def main():
     """
     Main workflow:
     1. Load environment variables
-    2. Export guild structure
-    3. Export all chat histories to a single CSV file
+    2. Log in to Discord once
+    3. Export guild structure
+    4. Export all chat histories to a single CSV file
+
+    Raises RuntimeError if the guild can't be found or the history export
+    doesn't complete, so callers (e.g. the scheduler) see the failure, and
+    LeaseHeld if another run holds the pipeline lease (or takes it over
+    part-way, which cancels this run).
     """
     # Load environment variables from .env file (e.g., API tokens)
     load_dotenv()
-    
-    # Retrieve and save guild/channel structure
-    run_step("discord_guild_channel_exporter.py")
-    
-    # Export all chat histories to a single CSV file
-    run_step("discord_chat_history_exporter.py")
-    
+
+    import discord_guild_channel_exporter as guild_exporter
+    import discord_chat_history_exporter as history_exporter
+
+    client = history_exporter.create_client()
+    result = {}
+
+    @client.event
+    async def on_ready():
+        # on_ready fires again after a reconnect; only run once
+        if result:
+            return
+        result["started"] = True
+
+        try:
+            await Lease().hold(run_export)
+        except Exception as e:
+            result["error"] = e
+        finally:
+            await client.close()
+
+    async def run_export():
+        guild = client.get_guild(history_exporter.GUILD_ID)
+        if guild is None:
+            raise RuntimeError(f"Guild ID {history_exporter.GUILD_ID} not found")
+
+        timings = {}
+        # Retrieve and save guild/channel structure
+        structure, timings["guild structure"] = await run_step(
+            "guild structure", guild_exporter.build_guild_structure, guild)
+        guild_exporter.write_guild_structure(structure)
+
+        # Export all chat histories to a single CSV file
+        channel_info = history_exporter.build_channel_info(structure)
+        completed, timings["chat history"] = await run_step(
+            "chat history", history_exporter.export_history, guild, channel_info)
+        if not completed:
+            raise RuntimeError("Chat history export did not complete; re-run to resume it")
+
+        for name, elapsed in timings.items():
+            print(f"⏱️ {elapsed:7.2f}s  {name}")
+
+    client.run(history_exporter.TOKEN)
+    if "error" in result:
+        raise result["error"]
+
     print("✅ ETL pipeline completed successfully")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -25,6 +25,36 @@ os.makedirs("json_files", exist_ok=True)
 # Disable SSL verification globally
 ssl._create_default_https_context = ssl._create_unverified_context
 
+GUILD_JSON_PATH = os.path.join("json_files", "guild_channels_with_threads.json")
+
+
+def build_guild_structure(guild):
+    """
+    Build the category/channel hierarchy of a guild.
+    Args:
+        guild (discord.Guild): The guild to describe
+    Returns:
+        dict: Guild ID and name, categories with their text channels, and
+        ungrouped text channels
+    """
+    out = {"guild_id": guild.id, "guild_name": guild.name, "categories": [], "ungrouped": []}
+    for category in guild.categories:
+        cat = {"id": category.id, "name": category.name, "channels": []}
+        for ch in category.text_channels:
+            cat["channels"].append({"id": ch.id, "name": ch.name, "type": str(ch.type)})
+        out["categories"].append(cat)
+    for ch in guild.text_channels:
+        if ch.category is None:
+            out["ungrouped"].append({"id": ch.id, "name": ch.name, "type": str(ch.type)})
+    return out
+
+
+def write_guild_structure(out):
+    """Save the guild structure to `json_files/guild_channels_with_threads.json`."""
+    with open(GUILD_JSON_PATH, "w", encoding="utf-8") as f:
+        json.dump(out, f, ensure_ascii=False, indent=2)
+    print(f"✅ Wrote {GUILD_JSON_PATH}")
+
 
 def main():
     load_dotenv()
@@ -45,20 +75,7 @@ def main():
             await client.close()
             return
 
-        out = {"guild_id": guild.id, "guild_name": guild.name, "categories": [], "ungrouped": []}
-        for category in guild.categories:
-            cat = {"id": category.id, "name": category.name, "channels": []}
-            for ch in category.text_channels:
-                cat["channels"].append({"id": ch.id, "name": ch.name, "type": str(ch.type)})
-            out["categories"].append(cat)
-        for ch in guild.text_channels:
-            if ch.category is None:
-                out["ungrouped"].append({"id": ch.id, "name": ch.name, "type": str(ch.type)})
-
-        path = os.path.join("json_files", "guild_channels_with_threads.json")
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(out, f, ensure_ascii=False, indent=2)
-        print(f"✅ Wrote {path}")
+        write_guild_structure(build_guild_structure(guild))
         await client.close()
 
     client.run(TOKEN)
@@ -11,7 +11,6 @@ Usage:
 """
 
 import os
-import subprocess
 import schedule
 import time
 from dotenv import load_dotenv
@@ -24,10 +23,15 @@ def load_env():
 def ingest_data():
     load_env()
     print("🔄 Starting weekly ingestion...")
+    # Runs in this process, so there's no interpreter start-up or re-import
+    # per run; the pipeline raises if any step fails
+    import discord_etl_pipeline
     try:
-        subprocess.run(["uv", "run", "discord_etl_pipeline.py"], check=True)
+        discord_etl_pipeline.main()
         print("✅ Weekly ingestion completed.")
-    except subprocess.CalledProcessError as e:
+    except discord_etl_pipeline.LeaseHeld as e:
+        print(f"⏭️ Skipping this week's ingestion: {e}")
+    except Exception as e:
         print(f"❌ Ingestion failed: {e}")
 
 # Schedule: every Monday at 02:00 AM